@@ -36,6 +36,8 @@ class PDFProcessor:
         
         self.llm_processor = LLMProcessor()
         self.mode = "快速"
+        # 远程处理的模式：只有显式调用 set_mode 后才传给服务端，未设置时使用服务端默认模式
+        self.remote_mode = None
         # 基础分辨率（可根据模式覆盖）
         self.target_resolution = IMAGE_CONFIG["target_resolution"]
         self.high_resolution = IMAGE_CONFIG["high_resolution"]
@@ -60,6 +62,7 @@ class PDFProcessor:
         if mode not in ("快速", "精细"):
             return
         self.mode = mode
+        self.remote_mode = mode
         # 调整页面渲染分辨率
         if mode == "快速":
             self.target_resolution = max(960, int(IMAGE_CONFIG["target_resolution"] * 0.75))
@@ -95,7 +98,7 @@ class PDFProcessor:
         if self.remote_client:
             try:
                 logger.info(f"使用远程GPU OCR处理PDF: {output_name}")
-                result = self.remote_client.process_pdf(pdf_path, f"{output_name}.pdf")
+                result = self.remote_client.process_pdf(pdf_path, f"{output_name}.pdf", mode=self.remote_mode)
                 if result.get('status') == 'success':
                     return result
                 else:
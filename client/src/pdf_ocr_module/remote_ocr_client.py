@@ -5,22 +5,49 @@
 
 import os
 import json
+import time
+import hashlib
 import requests
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from loguru import logger
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    # urllib3 2.x 在安装 zstandard 时可自动解压 zstd 响应
+    from urllib3.response import HTTPResponse
+    ZSTD_DECODE_AVAILABLE = 'zstd' in getattr(HTTPResponse, 'CONTENT_DECODERS', [])
+except ImportError:
+    ZSTD_DECODE_AVAILABLE = False
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
 class RemoteOCRClient:
     """远程OCR客户端"""
     
-    def __init__(self, server_url: str = "http://192.168.3.133:8888"):
+    def __init__(self, server_url: str = "http://192.168.3.133:8888", use_blobs: bool = True,
+                 busy_retries: int = 3, max_retry_wait: float = 120):
         """
         初始化远程OCR客户端
         
         Args:
             server_url: 远程OCR服务器地址
+            use_blobs: 先按内容哈希询问服务器，已有相同文件时不再上传
+            busy_retries: 服务器返回429时的重试次数
+            max_retry_wait: 单次重试的最长等待（秒）
         """
         self.server_url = server_url.rstrip('/')
+        self.use_blobs = use_blobs
+        self.busy_retries = busy_retries
+        self.max_retry_wait = max_retry_wait
+        # (路径, 大小, 修改时间) -> SHA-256，避免重复读取NAS上的文件
+        self._sha256_cache: Dict[tuple, str] = {}
         self.session = requests.Session()
         self.session.timeout = 300  # 5分钟超时
         # 设置连接池，避免每次建立新连接
@@ -31,7 +58,108 @@ class RemoteOCRClient:
         )
         self.session.mount('http://', adapter)
         self.session.mount('https://', adapter)
+        # 响应编码协商：服务端按需压缩（zstd/gzip），可用时使用msgpack减少解析耗时
+        self.session.headers['Accept-Encoding'] = 'zstd, gzip' if ZSTD_DECODE_AVAILABLE else 'gzip'
+        if MSGPACK_AVAILABLE:
+            self.session.headers['Accept'] = f'{MSGPACK_MEDIA_TYPE}, application/json'
+    
+    def _decode(self, response) -> Dict:
+        """按 Content-Type 解析响应（msgpack 或 JSON），记录传输大小与解析耗时"""
+        started = time.perf_counter()
+        if response.headers.get('Content-Type', '').startswith(MSGPACK_MEDIA_TYPE):
+            result = msgpack.unpackb(response.content, raw=False)
+        else:
+            result = response.json()
+        logger.debug(
+            f"响应解析: 编码={response.headers.get('Content-Encoding', 'identity')} "
+            f"原始={response.headers.get('X-Uncompressed-Length', '?')}字节 "
+            f"传输={response.headers.get('Content-Length', '?')}字节 "
+            f"解析={(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return result
+        
+    def _file_sha256(self, file_path: str) -> str:
+        """计算文件SHA-256（按路径、大小与修改时间缓存）"""
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime)
+        sha256 = self._sha256_cache.get(key)
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            sha256 = self._sha256_cache[key] = digest.hexdigest()
+        return sha256
+    
+    def ensure_blob(self, file_path: str) -> Optional[str]:
+        """
+        确保服务器持有该文件：先 HEAD /blobs/{sha256}，不存在时 PUT 上传
+        
+        Returns:
+            文件SHA-256；服务器不支持或上传失败时返回None（调用方改用普通上传）
+        """
+        try:
+            sha256 = self._file_sha256(file_path)
+            url = f"{self.server_url}/blobs/{sha256}"
+            response = self.session.head(url, timeout=10)
+            if response.status_code == 200:
+                logger.info(f"服务器已有相同文件，跳过上传: {os.path.basename(file_path)}")
+                return sha256
+            if response.status_code != 404:
+                return None
+            with open(file_path, 'rb') as f:
+                response = self.session.put(url, data=f, headers={'Content-Type': 'application/octet-stream'})
+            if response.status_code in (200, 201):
+                return sha256
+            logger.warning(f"文件上传失败: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.warning(f"按哈希上传失败，改用普通上传: {e}")
+            return None
+    
+    def _post_file(self, endpoint: str, file_path: str, filename: str, mime_type: str,
+                   data: Optional[Dict] = None, **kwargs):
+        """
+        发送处理请求：服务器持有该文件时只传哈希（blob），否则以表单上传文件
         
+        服务器繁忙（429）时按 Retry-After 等待后重试，最多 busy_retries 次。
+        按哈希引用的文件在 HEAD 之后被服务器淘汰（404）时改为以表单上传文件。
+        """
+        data = dict(data or {})
+        sha256 = self.ensure_blob(file_path) if self.use_blobs else None
+        if sha256:
+            data.update(blob=sha256, filename=filename)
+        attempt = 0
+        while True:
+            if sha256:
+                response = self.session.post(f"{self.server_url}{endpoint}", data=data, **kwargs)
+            else:
+                with open(file_path, 'rb') as f:
+                    files = {'file': (filename, f, mime_type)}
+                    response = self.session.post(f"{self.server_url}{endpoint}", files=files, data=data, **kwargs)
+            if sha256 and response.status_code == 404:
+                logger.warning(f"服务器上的文件已被淘汰，改为直接上传: {filename}")
+                response.close()
+                sha256 = None
+                data.pop('blob', None)
+                data.pop('filename', None)
+                continue
+            if response.status_code != 429 or attempt == self.busy_retries:
+                return response
+            attempt += 1
+            self._wait_busy(response, attempt, filename)
+    
+    def _wait_busy(self, response, attempt: int, name: str):
+        """服务器繁忙（429）：关闭响应，按 Retry-After 等待（不超过 max_retry_wait）"""
+        try:
+            wait = float(response.headers.get('Retry-After', 5))
+        except ValueError:
+            wait = 5.0
+        wait = min(wait, self.max_retry_wait)
+        logger.warning(f"服务器繁忙，{wait:.0f}秒后重试({attempt}/{self.busy_retries}): {name}")
+        response.close()
+        time.sleep(wait)
+    
     def check_server_health(self) -> bool:
         """检查服务器健康状态 - 快速检查"""
         try:
@@ -44,13 +172,16 @@ class RemoteOCRClient:
         except Exception:
             return False
     
-    def process_pdf(self, pdf_path: str, filename: str) -> Dict:
+    def process_pdf(self, pdf_path: str, filename: str, fields: Optional[str] = None,
+                    mode: Optional[str] = None) -> Dict:
         """
         处理PDF文件
         
         Args:
             pdf_path: PDF文件路径
             filename: 文件名
+            fields: 只返回指定字段（可选），如 "page_text" 或 "texts.page,texts.text,summary"
+            mode: 处理模式（标准/快速/精细），为None时使用服务端默认模式
             
         Returns:
             处理结果
@@ -61,15 +192,13 @@ class RemoteOCRClient:
             
             logger.info(f"发送PDF到远程GPU服务器: {filename}")
             
-            with open(pdf_path, 'rb') as f:
-                files = {'file': (filename, f, 'application/pdf')}
-                response = self.session.post(
-                    f"{self.server_url}/ocr/pdf",
-                    files=files
-                )
+            response = self._post_file(
+                "/ocr/pdf", pdf_path, filename, 'application/pdf', data={'mode': mode} if mode else None,
+                params={'fields': fields} if fields else None
+            )
             
             if response.status_code == 200:
-                result = response.json()
+                result = self._decode(response)
                 if result.get('status') == 'success':
                     logger.info(f"远程PDF处理成功: {filename}")
                     return result['result']
@@ -84,13 +213,49 @@ class RemoteOCRClient:
             logger.error(f"远程PDF处理异常: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def process_ppt(self, ppt_path: str, filename: str) -> Dict:
+    def iter_pdf_pages(self, pdf_path: str, filename: str, mode: Optional[str] = None) -> Iterator[Dict]:
+        """
+        流式处理PDF，逐页产出识别结果（无需等待整篇完成即可开始后续处理）
+        
+        Args:
+            pdf_path: PDF文件路径
+            filename: 文件名
+            mode: 处理模式（标准/快速/精细），为None时使用服务端默认模式
+            
+        Yields:
+            {'type': 'page', 'page', 'total_pages', 'texts', 'figures', 'tables'}，
+            最后一条为 {'type': 'summary', ...} 或 {'type': 'error', 'message'}
+        """
+        if not os.path.exists(pdf_path):
+            yield {'type': 'error', 'message': f'文件不存在: {pdf_path}'}
+            return
+        
+        try:
+            logger.info(f"流式发送PDF到远程GPU服务器: {filename}")
+            response = self._post_file("/ocr/pdf/stream", pdf_path, filename, 'application/pdf',
+                                       data={'mode': mode} if mode else None, stream=True)
+            
+            with response:
+                if response.status_code != 200:
+                    logger.error(f"远程PDF流式处理请求失败: {response.status_code}")
+                    yield {'type': 'error', 'message': f'服务器错误: {response.status_code}'}
+                    return
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+                    
+        except Exception as e:
+            logger.error(f"远程PDF流式处理异常: {e}")
+            yield {'type': 'error', 'message': str(e)}
+    
+    def process_ppt(self, ppt_path: str, filename: str, mode: Optional[str] = None) -> Dict:
         """
         处理PPT文件
         
         Args:
             ppt_path: PPT文件路径
             filename: 文件名
+            mode: 幻灯片图片OCR的处理模式（标准/快速/精细），为None时使用服务端默认模式
             
         Returns:
             处理结果
@@ -101,15 +266,11 @@ class RemoteOCRClient:
             
             logger.info(f"发送PPT到远程GPU服务器: {filename}")
             
-            with open(ppt_path, 'rb') as f:
-                files = {'file': (filename, f, 'application/vnd.ms-powerpoint')}
-                response = self.session.post(
-                    f"{self.server_url}/ocr/ppt",
-                    files=files
-                )
+            response = self._post_file("/ocr/ppt", ppt_path, filename, 'application/vnd.ms-powerpoint',
+                                       data={'mode': mode} if mode else None)
             
             if response.status_code == 200:
-                result = response.json()
+                result = self._decode(response)
                 if result.get('status') == 'success':
                     logger.info(f"远程PPT处理成功: {filename}")
                     return result['result']
@@ -151,15 +312,10 @@ class RemoteOCRClient:
             }
             mime_type = mime_types.get(file_ext, 'application/octet-stream')
             
-            with open(office_path, 'rb') as f:
-                files = {'file': (filename, f, mime_type)}
-                response = self.session.post(
-                    f"{self.server_url}/ocr/office",
-                    files=files
-                )
+            response = self._post_file("/ocr/office", office_path, filename, mime_type)
             
             if response.status_code == 200:
-                result = response.json()
+                result = self._decode(response)
                 if result.get('status') == 'success':
                     logger.info(f"远程Office文档处理成功: {filename}")
                     return result
@@ -199,7 +355,7 @@ class RemoteOCRClient:
                 )
             
             if response.status_code == 200:
-                result = response.json()
+                result = self._decode(response)
                 if result.get('status') == 'success':
                     logger.info(f"远程图片处理成功: {filename}")
                     return result.get('text', '')
@@ -213,3 +369,153 @@ class RemoteOCRClient:
         except Exception as e:
             logger.error(f"远程图片处理异常: {e}")
             return ""
+    
+    def submit_job(self, file_path: str, filename: str, kind: Optional[str] = None,
+                   mode: Optional[str] = None) -> Optional[str]:
+        """
+        提交异步任务（立即返回，不占用长连接）
+        
+        Args:
+            file_path: 文件路径
+            filename: 文件名
+            kind: 处理类型（pdf/ppt/office/image），为None时由服务端按扩展名判断
+            mode: 处理模式（标准/快速/精细），为None时使用服务端默认模式
+            
+        Returns:
+            任务ID，失败返回None
+        """
+        try:
+            if not os.path.exists(file_path):
+                logger.error(f"文件不存在: {file_path}")
+                return None
+            
+            data = {'kind': kind} if kind else {}
+            if mode:
+                data['mode'] = mode
+            response = self._post_file("/jobs", file_path, filename, 'application/octet-stream', data=data, timeout=60)
+            
+            if response.status_code in (200, 202):
+                job_id = response.json().get('job_id')
+                logger.info(f"任务已提交: {filename} -> {job_id}")
+                return job_id
+            logger.error(f"任务提交失败: {response.status_code}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"任务提交异常: {e}")
+            return None
+    
+    def process_batch(self, file_paths: List[str], archive_path: Optional[str] = None,
+                      timeout: float = 3600) -> List[Dict]:
+        """
+        批量处理：一次请求提交多个文件和/或一个zip/tar归档，省去逐文件请求的开销
+        
+        与单文件请求相同，服务器已有的文件（HEAD /blobs）只传哈希，其余文件以表单上传；
+        按哈希引用的文件在此期间被服务器淘汰（404）时整批改为上传文件。
+        服务器放不下整批（429）时按 Retry-After 等待后整批重试，最多 busy_retries 次；
+        批量文件数超过服务器可同时接收的任务数（413）时需拆分为多次调用。
+        
+        Args:
+            file_paths: 文件路径列表
+            archive_path: 归档文件路径（可选），服务端解压后逐个处理
+            timeout: 整批处理超时（秒）
+            
+        Returns:
+            每个文件一条 {'filename', 'status', 'result' 或 'message'}
+        """
+        try:
+            blobs: Dict[str, str] = {}
+            if self.use_blobs:
+                for path in file_paths:
+                    sha256 = self.ensure_blob(path)
+                    if sha256:
+                        blobs[path] = sha256
+            
+            logger.info(f"批量发送到远程GPU服务器: {len(file_paths)} 个文件（{len(blobs)} 个服务器已有）"
+                        + (f" + 归档 {archive_path}" if archive_path else ""))
+            attempt = 0
+            while True:
+                response = self._post_batch(file_paths, blobs, archive_path, timeout)
+                if blobs and response.status_code == 404:
+                    logger.warning("服务器上的文件已被淘汰，整批改为直接上传")
+                    response.close()
+                    blobs = {}
+                    continue
+                if response.status_code != 429 or attempt == self.busy_retries:
+                    break
+                attempt += 1
+                self._wait_busy(response, attempt, f"批量 {len(file_paths)} 个文件")
+            
+            if response.status_code == 200:
+                return self._decode(response).get('results', [])
+            logger.error(f"批量处理请求失败: {response.status_code}")
+            return [{'filename': os.path.basename(p), 'status': 'error', 'message': f'服务器错误: {response.status_code}'}
+                    for p in file_paths]
+            
+        except Exception as e:
+            logger.error(f"批量处理异常: {e}")
+            return [{'filename': os.path.basename(p), 'status': 'error', 'message': str(e)} for p in file_paths]
+    
+    def _post_batch(self, file_paths: List[str], blobs: Dict[str, str], archive_path: Optional[str],
+                    timeout: float):
+        """发送一次批量请求：blobs 中的文件（路径 -> 哈希）只传哈希与文件名，其余文件与归档以表单上传"""
+        with ExitStack() as stack:
+            files = [
+                ('files', (os.path.basename(path), stack.enter_context(open(path, 'rb')), 'application/octet-stream'))
+                for path in file_paths if path not in blobs
+            ]
+            if archive_path:
+                f = stack.enter_context(open(archive_path, 'rb'))
+                files.append(('archive', (os.path.basename(archive_path), f, 'application/octet-stream')))
+            data = {'blobs': list(blobs.values()), 'filenames': [os.path.basename(path) for path in blobs]}
+            return self.session.post(f"{self.server_url}/batch", files=files or None, data=data, timeout=timeout)
+    
+    def get_job_status(self, job_id: str) -> Dict:
+        """查询任务状态（阶段与页级进度）"""
+        try:
+            response = self.session.get(f"{self.server_url}/jobs/{job_id}", timeout=10)
+            if response.status_code == 200:
+                return response.json()
+            return {'status': 'error', 'message': f'服务器错误: {response.status_code}'}
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+    
+    def get_job_result(self, job_id: str, fields: Optional[str] = None) -> Optional[Dict]:
+        """
+        获取任务结果
+        
+        Args:
+            job_id: 任务ID
+            fields: 只返回指定字段（可选）
+            
+        Returns:
+            任务完成时返回处理结果（失败时为 {'status': 'error', ...}），未完成返回None
+        """
+        try:
+            response = self.session.get(
+                f"{self.server_url}/jobs/{job_id}/result",
+                params={'fields': fields} if fields else None,
+                timeout=60
+            )
+            if response.status_code == 202:
+                return None
+            if response.status_code == 200:
+                result = self._decode(response)
+                if result.get('status') == 'success':
+                    return result['result']
+                return {'status': 'error', 'message': result.get('message', '处理失败')}
+            return {'status': 'error', 'message': f'服务器错误: {response.status_code}'}
+        except Exception as e:
+            logger.warning(f"获取任务结果异常（将重试）: {e}")
+            return None
+    
+    def wait_for_job(self, job_id: str, poll_interval: float = 2.0, timeout: float = 3600,
+                     fields: Optional[str] = None) -> Dict:
+        """轮询等待任务完成并返回结果；网络抖动只影响单次轮询"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            result = self.get_job_result(job_id, fields)
+            if result is not None:
+                return result
+            time.sleep(poll_interval)
+        return {'status': 'error', 'message': f'等待任务超时: {job_id}'}
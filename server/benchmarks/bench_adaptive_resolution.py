@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+自适应分辨率基准：比较固定模式分辨率与按页自适应分辨率的 渲染像素/文档
+
+用法:
+    python benchmarks/bench_adaptive_resolution.py [PDF路径] [--pages 12]
+未指定PDF时生成研报样式的合成文档：封面（大字号）、10pt正文页、7pt密排附注页、图表页交替。
+固定分辨率为各配置档的 target_resolution（config.PROCESSING_PROFILES）；自适应像素含灰度预览
+（原生PDF由文字层估计字号，--scanned 去掉文字层后走灰度预览）。
+区域升级（低置信度区域按高分辨率重渲染）取决于识别结果，不在此统计，服务端结果中的
+pixels_rendered 包含该部分。
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.adaptive_resolution import choose_page_resolution
+from src.config import ADAPTIVE_RESOLUTION_CONFIG
+from src.processing_profile import available_modes, get_profile
+
+PROFILES = [get_profile(mode) for mode in available_modes()]
+FIXED = {p.mode: (p.target_resolution, p.target_char_px) for p in PROFILES}
+HIGH = {p.mode: p.high_resolution for p in PROFILES}
+
+
+def synthetic_pdf(path: str, pages: int, scanned: bool = False):
+    sentence = "Revenue grew steadily while margins expanded across all business segments."
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page(width=595, height=842)
+            kind = number % 4
+            if kind == 0:
+                page.insert_text((60, 300), "Annual Strategy Report", fontsize=36)
+                page.insert_text((60, 360), "Industry outlook 2026", fontsize=20)
+            elif kind == 3:
+                page.insert_text((40, 60), "Figure: quarterly revenue", fontsize=12)
+                for i in range(10):
+                    page.draw_rect(fitz.Rect(60 + i * 48, 700 - 30 * (i + 3), 90 + i * 48, 700), color=None, fill=(0.2, 0.4, 0.8))
+            else:
+                size = 10 if kind == 1 else 7
+                for line in range(int(760 / (size * 1.4))):
+                    page.insert_text((40, 50 + line * size * 1.4), sentence, fontsize=size)
+        if scanned:
+            # 每页渲染为150dpi图片重新组成PDF，去掉文字层
+            with fitz.open() as images:
+                for page in doc:
+                    pix = page.get_pixmap(dpi=150)
+                    images.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=pix)
+                images.save(path)
+        else:
+            doc.save(path)
+
+
+def pixels_at(page, resolution: int) -> int:
+    zoom = resolution / max(page.rect.width, page.rect.height)
+    return int(round(page.rect.width * zoom)) * int(round(page.rect.height * zoom))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('pdf_path', nargs='?', help='PDF文件')
+    parser.add_argument('--pages', type=int, default=12, help='合成文档页数')
+    parser.add_argument('--scanned', action='store_true', help='合成文档按扫描件处理（去掉文字层，走灰度预览估计）')
+    args = parser.parse_args()
+
+    pdf_path = args.pdf_path
+    if pdf_path is None:
+        pdf_path = str(Path(tempfile.mkdtemp(prefix="bench_res_")) / "synthetic.pdf")
+        synthetic_pdf(pdf_path, args.pages, args.scanned)
+
+    config = ADAPTIVE_RESOLUTION_CONFIG
+    with fitz.open(pdf_path) as doc:
+        print(f"{doc.page_count} 页")
+        print(f"{'模式':<6}{'固定MP':>10}{'自适应MP':>10}{'其中预览MP':>10}{'选择ms/页':>10}  各页分辨率")
+        for mode, (fixed, target_char_px) in FIXED.items():
+            fixed_pixels = sum(pixels_at(page, fixed) for page in doc)
+            adaptive_pixels, probe_pixels, resolutions = 0, 0, []
+            started = time.perf_counter()
+            for page in doc:
+                choice = choose_page_resolution(page, target_char_px, config["min_resolution"],
+                                                min(config["max_resolution"], HIGH[mode]),
+                                                config["probe_size"], config["min_chars"])
+                resolutions.append(choice['resolution'])
+                probe_pixels += choice['probe_pixels']
+                adaptive_pixels += choice['probe_pixels'] + pixels_at(page, choice['resolution'])
+            elapsed = (time.perf_counter() - started) / doc.page_count
+            print(f"{mode:<6}{fixed_pixels / 1e6:>12.2f}{adaptive_pixels / 1e6:>12.2f}{probe_pixels / 1e6:>12.2f}"
+                  f"{elapsed * 1000:>12.1f}  {resolutions}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+回退布局检测基准：比较原轮廓法（每个外轮廓一个区域）与块级分割的 区域数/页 与 耗时/页
+
+用法:
+    python benchmarks/bench_fallback_layout.py [PDF路径] [--resolution 1024] [--pages 10]
+未指定PDF时生成双栏研报样式的合成页面（标题、正文、表格、柱状图）。
+区域数即无布局模型时 process_page 对每页调用 extract_text 的次数。
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.block_layout import segment_blocks
+
+
+def legacy_layout(gray: np.ndarray) -> list:
+    """原 _default_layout_detection：Otsu阈值后每个外轮廓一个区域"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h > 100 and (w / h if h > 0 else 0) < 10:
+            regions.append({'bbox': [x, y, x + w, y + h], 'category': 'text'})
+    return regions
+
+
+def synthetic_page(resolution: int, seed: int) -> np.ndarray:
+    """双栏研报样式页面（长边为 resolution 像素）"""
+    rng = random.Random(seed)
+    height, width = resolution, int(resolution * 0.707)
+    scale = resolution / 1024
+    page = np.full((height, width), 255, dtype=np.uint8)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    words = ["revenue", "margin", "growth", "quarter", "guidance", "capex", "yoy", "segment", "outlook", "EBITDA"]
+
+    def line(x, y, max_width, size=0.38, thickness=1):
+        text = ""
+        while True:
+            candidate = (text + " " + rng.choice(words)).strip()
+            if cv2.getTextSize(candidate, font, size * scale, thickness)[0][0] > max_width:
+                break
+            text = candidate
+        cv2.putText(page, text, (x, y), font, size * scale, 0, thickness, cv2.LINE_AA)
+
+    margin, gutter = int(40 * scale), int(24 * scale)
+    column_w = (width - 2 * margin - gutter) // 2
+    line(margin, int(60 * scale), width - 2 * margin, size=0.8, thickness=2)
+    y0 = int(100 * scale)
+    step = int(14 * scale)
+    for column in range(2):
+        x = margin + column * (column_w + gutter)
+        y = y0
+        for paragraph in range(4):
+            for _ in range(rng.randint(4, 7)):
+                line(x, y, column_w)
+                y += step
+            y += step
+    # 表格
+    top, left = int(620 * scale), margin
+    rows, cols = 6, 5
+    cell_w, cell_h = (width - 2 * margin) // cols, int(22 * scale)
+    for r in range(rows + 1):
+        cv2.line(page, (left, top + r * cell_h), (left + cols * cell_w, top + r * cell_h), 0, 1)
+    for c in range(cols + 1):
+        cv2.line(page, (left + c * cell_w, top), (left + c * cell_w, top + rows * cell_h), 0, 1)
+    for r in range(rows):
+        for c in range(cols):
+            cv2.putText(page, f"{rng.uniform(1, 99):.1f}", (left + c * cell_w + 6, top + r * cell_h + cell_h - 6),
+                        font, 0.35 * scale, 0, 1, cv2.LINE_AA)
+    # 柱状图
+    base, chart_left = int(940 * scale), margin
+    cv2.line(page, (chart_left, base), (chart_left + int(300 * scale), base), 0, 2)
+    cv2.line(page, (chart_left, base), (chart_left, base - int(150 * scale)), 0, 2)
+    for i in range(8):
+        bar_h = rng.randint(30, 140)
+        x = chart_left + int((12 + i * 34) * scale)
+        cv2.rectangle(page, (x, base - int(bar_h * scale)), (x + int(20 * scale), base), 90, -1)
+    return page
+
+
+def pdf_pages(pdf_path: str, resolution: int, limit: int):
+    import fitz
+    with fitz.open(pdf_path) as pdf:
+        for page in list(pdf)[:limit]:
+            scale = resolution / max(page.rect.width, page.rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+            yield cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def measure(name: str, detect, pages: list, repeat: int = 3):
+    counts = [len(detect(page)) for page in pages]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            detect(page)
+    seconds = (time.perf_counter() - started) / repeat / len(pages)
+    print(f"{name:<16}{np.mean(counts):>14.1f}{max(counts):>10}{seconds * 1000:>16.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('pdf_path', nargs='?', help='PDF文件')
+    parser.add_argument('--resolution', type=int, default=1024, help='渲染长边像素（标准1024，精细2560）')
+    parser.add_argument('--pages', type=int, default=10, help='页数')
+    args = parser.parse_args()
+
+    if args.pdf_path:
+        pages = list(pdf_pages(args.pdf_path, args.resolution, args.pages))
+    else:
+        pages = [synthetic_page(args.resolution, seed) for seed in range(args.pages)]
+
+    print(f"{len(pages)} 页, 长边 {args.resolution}px")
+    print(f"{'方法':<14}{'区域数/页':>12}{'最多':>8}{'分割ms/页':>12}")
+    measure("轮廓法(原)", legacy_layout, pages)
+    measure("块级分割", segment_blocks, pages)
+    counts = {}
+    for page in pages:
+        for region in segment_blocks(page):
+            counts[region['category']] = counts.get(region['category'], 0) + 1
+    print("块级分割类别:", {k: round(v / len(pages), 1) for k, v in counts.items()})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+图表导出基准：比较原裁剪路径（整页按高分辨率渲染后PIL裁剪）与嵌入图片直接导出的 耗时/文档 与 字节/文档
+
+用法:
+    python benchmarks/bench_figure_extraction.py [PDF路径] [--resolution 2560] [--pages 10]
+未指定PDF时生成研报样式的合成文档：每页一张嵌入图表（另有一张跨页重复的Logo）和一张矢量图表。
+图表区域取自页面上的图片放置位置（真实PDF）或已知的图表位置（合成文档），
+新路径中未匹配嵌入图片的区域按高分辨率只渲染该区域。
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import fitz
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.embedded_images import EmbeddedImageExtractor, page_to_pixel_scale
+
+STANDARD = 1024
+
+
+def _chart_png(seed: int, width: int = 1200, height: int = 800) -> bytes:
+    rng = np.random.RandomState(seed)
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.line(image, (60, height - 60), (width - 40, height - 60), (0, 0, 0), 3)
+    for i in range(10):
+        bar = int(rng.randint(80, height - 120))
+        color = tuple(int(c) for c in rng.randint(0, 220, 3))
+        cv2.rectangle(image, (90 + i * 105, height - 60 - bar), (160 + i * 105, height - 60), color, -1)
+    cv2.putText(image, f"Figure {seed}", (80, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0, 0, 0), 2)
+    return cv2.imencode('.png', image)[1].tobytes()
+
+
+def synthetic_pdf(path: str, pages: int):
+    """每页：正文、一张嵌入图表、页眉Logo（各页相同）、一张矢量柱状图"""
+    logo = cv2.imencode('.png', np.full((120, 360, 3), (40, 90, 200), dtype=np.uint8))[1].tobytes()
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page(width=595, height=842)
+            page.insert_image(fitz.Rect(40, 20, 160, 60), stream=logo)
+            for line in range(12):
+                page.insert_text((40, 90 + line * 14), "Revenue grew steadily while margins expanded in the quarter.", fontsize=9)
+            page.insert_image(fitz.Rect(60, 280, 535, 597), stream=_chart_png(number))
+            page.draw_line((60, 800), (535, 800))
+            for i in range(8):
+                page.draw_rect(fitz.Rect(80 + i * 55, 800 - 20 * (i + 2), 110 + i * 55, 800), color=None, fill=(0.2, 0.4, 0.8))
+        doc.save(path)
+
+
+def figure_regions(doc, synthetic: bool) -> dict:
+    """{页码: [标准分辨率像素bbox, ...]}"""
+    regions = {}
+    for page in doc:
+        scale = page_to_pixel_scale(page, STANDARD)
+        rects = [rect for item in page.get_images(full=True) for rect in page.get_image_rects(item[0])]
+        if synthetic:
+            rects.append(fitz.Rect(60, 600, 535, 805))
+        regions[page.number] = [[int(r.x0 * scale), int(r.y0 * scale), int(r.x1 * scale), int(r.y1 * scale)]
+                                for r in rects if r.width * scale >= 32 and r.height * scale >= 32]
+    return regions
+
+
+def crop_path(doc, regions: dict, resolution: int, out: Path) -> list:
+    """原路径：整页按高分辨率渲染，按区域裁剪保存PNG"""
+    files = []
+    for page in doc:
+        if not regions[page.number]:
+            continue
+        zoom = page_to_pixel_scale(page, resolution)
+        page_file = out / f"page_{page.number + 1}_{resolution}.jpg"
+        page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False).save(str(page_file))
+        image = Image.open(page_file)
+        ratio = resolution / STANDARD
+        for i, bbox in enumerate(regions[page.number]):
+            target = out / f"fig_{page.number + 1}_{i}.png"
+            image.crop([int(v * ratio) for v in bbox]).save(target)
+            files.append(target)
+    return files
+
+
+def embedded_path(doc, regions: dict, resolution: int, out: Path) -> list:
+    """新路径：嵌入图片直接导出，其余区域按高分辨率只渲染该区域"""
+    images = EmbeddedImageExtractor(doc, out)
+    files = set()
+    for page in doc:
+        scale = page_to_pixel_scale(page, STANDARD)
+        zoom = page_to_pixel_scale(page, resolution)
+        for i, bbox in enumerate(regions[page.number]):
+            path = images.extract_region(page, bbox, scale, f"fig_{page.number + 1}")
+            if path is None:
+                clip = fitz.Rect(*[v / scale for v in bbox]) + (page.rect.x0, page.rect.y0, page.rect.x0, page.rect.y0)
+                path = out / f"fig_{page.number + 1}_{i}.png"
+                page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip & page.rect, alpha=False).save(str(path))
+            files.add(Path(path))
+    return sorted(files)
+
+
+def measure(name: str, method, pdf_path: str, regions: dict, resolution: int, repeat: int = 3):
+    seconds, total_bytes, count = [], 0, 0
+    for _ in range(repeat):
+        out = Path(tempfile.mkdtemp(prefix="bench_fig_"))
+        try:
+            with fitz.open(pdf_path) as doc:
+                started = time.perf_counter()
+                files = method(doc, regions, resolution, out)
+                seconds.append(time.perf_counter() - started)
+            # 原路径另有整页渲染图，一并计入临时写盘量
+            total_bytes = sum(p.stat().st_size for p in out.iterdir())
+            count = len(files)
+        finally:
+            shutil.rmtree(out, ignore_errors=True)
+    print(f"{name:<14}{count:>10}{min(seconds) * 1000:>14.1f}{total_bytes / 1024:>16.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('pdf_path', nargs='?', help='PDF文件')
+    parser.add_argument('--resolution', type=int, default=2560, help='裁剪用的高分辨率长边像素')
+    parser.add_argument('--pages', type=int, default=10, help='合成文档页数')
+    args = parser.parse_args()
+
+    pdf_path = args.pdf_path
+    synthetic = pdf_path is None
+    if synthetic:
+        pdf_path = str(Path(tempfile.mkdtemp(prefix="bench_fig_")) / "synthetic.pdf")
+        synthetic_pdf(pdf_path, args.pages)
+
+    with fitz.open(pdf_path) as doc:
+        regions = figure_regions(doc, synthetic)
+        page_count = doc.page_count
+    print(f"{page_count} 页, {sum(len(r) for r in regions.values())} 个图表区域, 高分辨率 {args.resolution}px")
+    print(f"{'方法':<12}{'导出文件':>8}{'耗时ms/文档':>10}{'写盘KB/文档':>10}")
+    measure("裁剪(原)", crop_path, pdf_path, regions, args.resolution)
+    measure("嵌入导出", embedded_path, pdf_path, regions, args.resolution)
+
+
+if __name__ == '__main__':
+    main()
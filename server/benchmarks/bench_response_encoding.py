@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+响应编码基准：比较 JSON / msgpack、gzip / zstd 以及 fields 选择下的负载大小与客户端解析耗时
+
+用法:
+    python benchmarks/bench_response_encoding.py [结果pickle路径] [--pages 80]
+未指定pickle时生成与长研报相近的合成结果（每页约40个文本区域、若干图表）。
+"""
+
+import argparse
+import gzip
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.response_encoding import MSGPACK_AVAILABLE, ZSTD_AVAILABLE, select_fields
+
+if MSGPACK_AVAILABLE:
+    import msgpack
+if ZSTD_AVAILABLE:
+    import zstandard
+
+
+def synthetic_result(pages: int) -> dict:
+    texts, figures, tables = [], [], []
+    for page in range(1, pages + 1):
+        for i in range(40):
+            texts.append({
+                'page': page,
+                'text': f"第{page}页第{i}段：公司营收同比增长{i}.{page}%，毛利率环比改善，维持买入评级。",
+                'bbox': [50 + i, 80 + i * 20, 560, 96 + i * 20],
+                'category': 'text',
+                'confidence': 0.93
+            })
+        for i in range(2):
+            figures.append({'page': page, 'path': f"/srv/ocr/output/report/fig_{page}_{i}.png",
+                            'bbox': [60, 300, 540, 520], 'category': 'figure'})
+        tables.append({'page': page, 'path': f"/srv/ocr/output/report/table_{page}.png",
+                       'bbox': [60, 540, 540, 760], 'category': 'table'})
+    return {
+        'status': 'success', 'output_path': '/srv/ocr/output/report', 'total_pages': pages,
+        'texts': texts, 'figures': figures, 'tables': tables,
+        'summary': '', 'keywords': [], 'hybrid_summary': '', 'markdown_content': '', 'part_summaries': [],
+        'categories': [], 'category_descriptions': {}, 'category_confidence': 0.0, 'tags': []
+    }
+
+
+def measure(name: str, body: bytes, decode, repeat: int = 5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode(body)
+    parse_ms = (time.perf_counter() - started) / repeat * 1000
+    print(f"{name:<36}{len(body) / 1024:>12.1f} KB{parse_ms:>12.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('pickle_path', nargs='?', help='PDF处理结果pickle')
+    parser.add_argument('--pages', type=int, default=80, help='合成结果的页数')
+    args = parser.parse_args()
+
+    if args.pickle_path:
+        with open(args.pickle_path, 'rb') as f:
+            result = pickle.load(f)
+    else:
+        result = synthetic_result(args.pages)
+
+    print(f"{'编码':<36}{'负载':>15}{'解析':>15}")
+    for fields in (None, 'texts.page,texts.text,total_pages,summary', 'page_text'):
+        payload = select_fields(result, fields)
+        label = f"fields={fields}" if fields else "完整结果"
+        raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        print(f"-- {label}")
+        measure("json", raw, json.loads)
+        measure("json+gzip", gzip.compress(raw, 6), lambda b: json.loads(gzip.decompress(b)))
+        if ZSTD_AVAILABLE:
+            compressed = zstandard.ZstdCompressor(level=3).compress(raw)
+            measure("json+zstd", compressed, lambda b: json.loads(zstandard.ZstdDecompressor().decompress(b)))
+        if MSGPACK_AVAILABLE:
+            packed = msgpack.packb(payload, use_bin_type=True)
+            measure("msgpack", packed, lambda b: msgpack.unpackb(b, raw=False))
+            measure("msgpack+gzip", gzip.compress(packed, 6),
+                    lambda b: msgpack.unpackb(gzip.decompress(b), raw=False))
+
+
+if __name__ == '__main__':
+    main()
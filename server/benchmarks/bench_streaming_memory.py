@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+大文档流式处理基准：比较整篇累积与按页窗口流式处理的 峰值RSS 随页数的变化
+
+用法:
+    python benchmarks/bench_streaming_memory.py [--pages 100 200 400] [--regions 60]
+每个 (页数, 方式) 在独立子进程中运行：生成合成文档，PDFProcessor 处理后序列化完整结果
+（整篇累积：json.dumps 结果字典；流式：iter_result_json 逐块生成），记录子进程峰值RSS。
+识别引擎替换为固定输出的模拟引擎（每页 --regions 个文本区域），只测结果累积与组装的内存，不含模型；
+页面渲染、预筛等与实际处理相同。
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class _FixedEngine:
+    """每页返回固定数量文本区域的模拟识别引擎"""
+
+    def __init__(self, regions: int):
+        self.regions = regions
+
+    def set_mode(self, mode: str):
+        pass
+
+    def process_page(self, image_path: str, direct_scan=None, profile=None):
+        line = "营业收入同比增长，毛利率提升，经营性现金流改善。" * 4
+        return {
+            'text_regions': [{'bbox': [40, 40 + i * 12, 560, 50 + i * 12], 'text': f"{i} {line}",
+                              'category': 'text', 'confidence': 0.95} for i in range(self.regions)],
+            'figure_regions': [], 'table_regions': []
+        }
+
+    def extract_text_direct(self, image_path: str, profile=None):
+        return []
+
+    def recognize_region(self, image, bbox=None, profile=None):
+        return '', 1.0
+
+
+def synthetic_pdf(path: str, pages: int):
+    import fitz
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page(width=595, height=842)
+            for line in range(48):
+                page.insert_text((40, 50 + line * 16), f"Page {number + 1} revenue grew steadily line {line}", fontsize=10)
+        doc.save(path)
+
+
+def child(pdf_path: str, streaming: bool, regions: int):
+    """子进程：处理并序列化完整结果，输出峰值RSS(MB)与耗时"""
+    from src import config
+    config.RESULT_STORE_CONFIG["enabled"] = False
+    config.STREAMING_CONFIG.update(enabled=streaming, min_pages=1)
+    from src.pdf_processor import PDFProcessor
+    from src.page_spill import is_spilled, iter_result_json
+
+    started = time.perf_counter()
+    processor = PDFProcessor(ocr_engine=_FixedEngine(regions))
+    result = processor.process_pdf(pdf_path, "bench_stream", streaming=streaming)
+    if is_spilled(result):
+        size = sum(len(chunk) for chunk in iter_result_json(result))
+    else:
+        size = len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'peak_mb': peak_mb, 'seconds': time.perf_counter() - started, 'result_mb': size / 1e6,
+                      'status': result.get('status')}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 200, 400], help='合成文档页数')
+    parser.add_argument('--regions', type=int, default=60, help='每页文本区域数')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1] == '1', int(args.child[2]))
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_stream_"))
+    print(f"{'页数':>6}{'方式':>8}{'峰值RSS MB':>12}{'结果MB':>10}{'耗时s':>8}")
+    for pages in args.pages:
+        pdf_path = str(workdir / f"synthetic_{pages}.pdf")
+        synthetic_pdf(pdf_path, pages)
+        for streaming in (False, True):
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', pdf_path, '1' if streaming else '0', str(args.regions)],
+                capture_output=True, text=True, env={**os.environ, 'LOGURU_LEVEL': 'WARNING'}
+            )
+            try:
+                stats = json.loads(output.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                print(output.stderr[-2000:])
+                raise
+            name = '流式' if streaming else '整篇'
+            print(f"{pages:>6}{name:>8}{stats['peak_mb']:>12.0f}{stats['result_mb']:>10.1f}{stats['seconds']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
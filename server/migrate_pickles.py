@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+把旧的逐文档 pickle（pickles/<name>/result.pkl、pickles/<name>_ppt.pkl）导入结果库
+
+用法:
+    python migrate_pickles.py [--pickles-dir pickles] [--store results] [--delete]
+可重复执行：结果库中内容相同的文档跳过。只应导入本服务自己写出的pickle。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from src.config import PICKLES_DIR, RESULT_STORE_CONFIG
+from src.result_store import ResultStore, migrate_pickles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pickles-dir', default=str(PICKLES_DIR), help='pickle 目录')
+    parser.add_argument('--store', default=RESULT_STORE_CONFIG["root"], help='结果库目录')
+    parser.add_argument('--delete', action='store_true', help='导入成功后删除原pickle')
+    args = parser.parse_args()
+
+    store = ResultStore(
+        args.store,
+        codec=RESULT_STORE_CONFIG.get("codec", "zstd"),
+        level=RESULT_STORE_CONFIG.get("level", 3),
+        segment_max_bytes=RESULT_STORE_CONFIG.get("segment_max_bytes", 256 * 1024 * 1024)
+    )
+    stats = migrate_pickles(args.pickles_dir, store, delete=args.delete)
+    store.close()
+    print(f"导入 {stats['migrated']}，跳过 {stats['skipped']}，失败 {stats['failed']}；结果库共 {len(store)} 个文档")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
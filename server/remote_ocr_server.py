@@ -8,137 +8,141 @@ import os
 import sys
 import json
 import base64
+import asyncio
 import tempfile
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from typing import Dict, Iterable, List, Optional
+from fastapi import FastAPI, File, Form, Request, UploadFile, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 from loguru import logger
-from starlette.concurrency import run_in_threadpool
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 # 添加src路径
 sys.path.append('src')
 
-from src import PDFProcessor, PPTProcessor, OfficeProcessor, OCREngine
+from src.config import WORKER_CONFIG, JOB_CONFIG, UPLOAD_CONFIG, ADMISSION_CONFIG, WORKSPACE_CONFIG
+from src.processing_profile import available_modes
+from src.admission import AdmissionController, AdmissionMiddleware
+from src.blob_store import BlobStore, create_blob_store
+from src.inference_pool import InferencePool
+from src.job_store import JobStore
+from src.metrics import MetricsMiddleware, ServerMetrics
+from src.result_cache import SingleFlight, create_result_cache, make_result_key
+from src.response_encoding import (encode_json_stream, encode_response, encode_result_response, iter_record_json,
+                                   select_fields)
+from src.page_spill import is_spilled, iter_pages, spill_available
+from src.upload import UploadLimitMiddleware, cleanup_spooled, extract_archive, is_archive, spool_upload
+from src.workspace import collect_garbage
 
-# GPU 信息探测
-def _probe_gpu_info():
-    info = {
-        "torch": {"available": False, "device_count": 0, "devices": []},
-        "paddle": {"compiled_with_cuda": False, "device": "unknown"},
-        "opencv": {"cuda_device_count": 0}
-    }
-    try:
-        import torch
-        info["torch"]["available"] = bool(torch.cuda.is_available())
-        if info["torch"]["available"]:
-            count = torch.cuda.device_count()
-            info["torch"]["device_count"] = count
-            info["torch"]["devices"] = [torch.cuda.get_device_name(i) for i in range(count)]
-    except Exception as e:
-        info["torch"]["error"] = str(e)
-    try:
-        import paddle
-        info["paddle"]["compiled_with_cuda"] = bool(paddle.device.is_compiled_with_cuda())
-        try:
-            info["paddle"]["device"] = paddle.device.get_device()
-        except Exception:
-            pass
-    except Exception as e:
-        info["paddle"]["error"] = str(e)
-    try:
-        import cv2
-        cnt = 0
-        try:
-            cnt = int(cv2.cuda.getCudaEnabledDeviceCount())
-        except Exception:
-            cnt = 0
-        info["opencv"]["cuda_device_count"] = cnt
-    except Exception as e:
-        info["opencv"]["error"] = str(e)
-    return info
+# 全局变量（兼容旧逻辑），同时使用 app.state 保存，确保各路由读取一致
+# HTTP前端不加载任何模型：OCR引擎只存在于推理进程池的各个进程中
+inference_pool = None
+result_cache = None
+job_store = None
+blob_store = None
+admission = None
+single_flight = SingleFlight()
+metrics = ServerMetrics()
+_job_tasks: Dict[str, asyncio.Task] = {}
+# 启动耗时：进程启动 -> 推理进程就绪 -> 首个请求完成
+_PROCESS_STARTED = time.time()
+startup_info: Dict = {'ready_seconds': None, 'first_request_seconds': None}
 
-# 全局变量（兼容旧逻辑），同时使用 app.state 保存，确保在各 worker/路由共享
-pdf_processor = None
-ppt_processor = None
-ocr_engine = None
-office_processor = None
+# 文件扩展名 -> 处理类型
+KIND_BY_SUFFIX = {
+    '.pdf': 'pdf',
+    '.ppt': 'ppt', '.pptx': 'ppt',
+    '.doc': 'office', '.docx': 'office', '.xls': 'office', '.xlsx': 'office',
+    '.jpg': 'image', '.jpeg': 'image', '.png': 'image', '.bmp': 'image', '.tif': 'image', '.tiff': 'image'
+}
 
-_warmed_up = False
+# 使用处理模式的类型；Office 文档直接读取文字内容，模式不影响结果，也不参与结果缓存键
+MODE_KINDS = ('pdf', 'ppt', 'image')
 
-def _warmup_once():
-    global _warmed_up, ocr_engine
-    if _warmed_up or ocr_engine is None:
-        return
-    try:
-        # 进行一次轻量推理以触发 CUDA/Paddle/Torch 的内核与显存缓存
-        # 这里使用一个极小的空白图片进行直扫，避免真实 I/O
-        import numpy as np
-        import cv2
-        tmp = np.full((32, 32, 3), 255, dtype=np.uint8)
-        tmp_path = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg').name
-        cv2.imwrite(tmp_path, tmp)
+async def _workspace_gc_loop(interval: float):
+    """定期回收 output/、pickles/ 中过期或超出容量的条目（推理进程与HTTP前端共用这些目录）"""
+    while True:
         try:
-            _ = ocr_engine.extract_text_direct(tmp_path)
-        finally:
-            try:
-                os.unlink(tmp_path)
-            except Exception:
-                pass
-        _warmed_up = True
-        logger.info("OCR 引擎 warmup 完成")
-    except Exception as e:
-        logger.warning(f"warmup 失败（不影响服务可用）: {e}")
+            await run_in_threadpool(collect_garbage)
+        except Exception as e:
+            logger.warning(f"输出目录回收失败: {e}")
+        await asyncio.sleep(interval)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 启动时初始化OCR组件（只执行一次）
-    global pdf_processor, ppt_processor, ocr_engine, office_processor
+    # 启动时创建推理进程池（模型在各推理进程内加载，只执行一次）
+    global inference_pool, result_cache, job_store, blob_store, admission
     
     try:
         logger.info("正在初始化GPU OCR服务...")
-        gpu_info = _probe_gpu_info()
-        logger.info(f"GPU 探测: {gpu_info}")
         
-        # 初始化OCR引擎（使用GPU加速）
-        ocr_engine = OCREngine(use_gpu=True)
-        logger.info("OCR引擎初始化成功")
+        inference_pool = InferencePool(
+            num_workers=WORKER_CONFIG["inference_workers"],
+            use_gpu=WORKER_CONFIG["use_gpu"],
+            task_threads=WORKER_CONFIG["task_threads"]
+        )
+        inference_pool.start()
+        ready = await run_in_threadpool(inference_pool.wait_ready, WORKER_CONFIG["start_timeout"])
+        if not ready:
+            raise RuntimeError(f"推理进程初始化失败: {inference_pool.stats()}")
+        logger.info(f"GPU 探测: {inference_pool.gpu_info}")
+        startup_info['ready_seconds'] = round(time.time() - _PROCESS_STARTED, 3)
+        startup_info['workers'] = inference_pool.stats().get('startup', {})
+        logger.info(f"推理进程池就绪: 距进程启动 {startup_info['ready_seconds']} 秒")
+        
+        # 初始化文档结果缓存
+        result_cache = create_result_cache()
         
-        # 初始化PDF处理器
-        pdf_processor = PDFProcessor(ocr_engine=ocr_engine)
-        logger.info("PDF处理器初始化成功")
+        # 初始化上传文件存储（按内容哈希跳过重复上传）
+        blob_store = create_blob_store()
         
-        # 初始化PPT处理器（传入已初始化的OCR引擎以便图片直扫补救）
-        ppt_processor = PPTProcessor(ocr_engine=ocr_engine)
-        logger.info("PPT处理器初始化成功")
+        # 初始化准入控制（并发上限默认等于推理进程池的并发任务数）
+        admission = AdmissionController(
+            max_inflight=ADMISSION_CONFIG["max_inflight"] or WORKER_CONFIG["inference_workers"] * WORKER_CONFIG["task_threads"],
+            max_queue=ADMISSION_CONFIG["max_queue"],
+            initial_service_seconds=ADMISSION_CONFIG["initial_service_seconds"]
+        )
         
-        # 初始化Office处理器（只做文本解析，无需 OCR 引擎）
-        office_processor = OfficeProcessor(use_gpu=False)
-        logger.info("Office处理器初始化成功")
+        # 初始化异步任务存储
+        job_store = JobStore(
+            retention_seconds=JOB_CONFIG["retention_seconds"],
+            max_jobs=JOB_CONFIG["max_jobs"],
+            max_result_bytes=JOB_CONFIG.get("max_result_bytes", 64 * 1024 * 1024)
+        )
+        
+        # 后台回收任务输出目录
+        if WORKSPACE_CONFIG.get("gc_interval_seconds"):
+            app.state.workspace_gc = asyncio.create_task(_workspace_gc_loop(WORKSPACE_CONFIG["gc_interval_seconds"]))
         
         # 保存到 app.state，确保路由读取的一致性
-        app.state.ocr_engine = ocr_engine
-        app.state.pdf_processor = pdf_processor
-        app.state.ppt_processor = ppt_processor
-        app.state.office_processor = office_processor
+        app.state.inference_pool = inference_pool
+        app.state.result_cache = result_cache
+        app.state.job_store = job_store
+        app.state.blob_store = blob_store
+        app.state.admission = admission
         app.state.initialized = True
 
-        # 预热，减少首个请求的冷启动延迟
-        _warmup_once()
-
         logger.info("🚀 GPU OCR服务启动成功！")
         
     except Exception as e:
         logger.error(f"OCR服务初始化失败: {e}")
+        if inference_pool:
+            inference_pool.shutdown()
         raise
     
     yield
     
     # 关闭时清理资源
     logger.info("正在关闭OCR服务...")
+    gc_task = getattr(app.state, "workspace_gc", None)
+    if gc_task:
+        gc_task.cancel()
+    inference_pool.shutdown()
 
 app = FastAPI(title="远程GPU OCR服务", version="1.0.0", lifespan=lifespan)
 
@@ -151,6 +155,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求体大小上限（在解析multipart之前拒绝，预留1MB给表单字段与边界）
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_body_bytes=max(UPLOAD_CONFIG["max_bytes"], UPLOAD_CONFIG["batch_max_bytes"]) + 1024 * 1024
+)
+
+# 队列已满时在接收上传之前返回429
+app.add_middleware(
+    AdmissionMiddleware,
+    get_controller=lambda: _get_admission(),
+    path_prefixes=("/ocr/", "/jobs", "/batch")
+)
+
+# 请求耗时与处理中请求数（最外层，包含被拒绝的请求）
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 
 @app.get("/")
 async def root():
@@ -161,145 +181,625 @@ async def root():
         "gpu_enabled": True,
         "llm_enabled": False,
         "initialized": bool(getattr(app.state, "initialized", False)),
-        "gpu_info": _probe_gpu_info(),
-        "components": {
-            "pdf_processor": bool(getattr(app.state, "pdf_processor", None)),
-            "ppt_processor": bool(getattr(app.state, "ppt_processor", None)),
-            "ocr_engine": bool(getattr(app.state, "ocr_engine", None))
-        }
+        "gpu_info": _gpu_info(),
+        "components": _components()
     }
 
-@app.post("/ocr/pdf")
-async def process_pdf(file: UploadFile = File(...)):
-    """处理PDF文件OCR"""
+def _get_pool() -> InferencePool:
+    pool = getattr(app.state, "inference_pool", None) or inference_pool
+    if not pool:
+        raise HTTPException(status_code=500, detail="推理进程池未初始化")
+    return pool
+
+def _gpu_info() -> Dict:
+    pool = getattr(app.state, "inference_pool", None) or inference_pool
+    return pool.gpu_info if pool else {}
+
+def _components() -> Dict:
+    pool = getattr(app.state, "inference_pool", None) or inference_pool
+    stats = pool.stats() if pool else {}
+    ready = bool(stats.get('ready'))
+    return {
+        "pdf_processor": ready,
+        "ppt_processor": ready,
+        "ocr_engine": ready,
+        "inference_pool": stats
+    }
+
+async def _process_document(kind: str, sha256: str, mode: str, compute) -> Dict:
+    """
+    按内容寻址处理文档：命中结果缓存直接返回，并发的相同请求只计算一次
+    
+    Args:
+        kind: 处理类型（pdf/ppt/office）
+        sha256: 上传文件内容的SHA-256
+        mode: 处理模式，参与缓存键（不使用模式的类型为None）
+        compute: 实际处理协程函数（提交到推理进程池）
+    """
+    cache = _get_result_cache()
+    key = make_result_key(sha256, kind, mode)
+    
+    if cache:
+        cached = await run_in_threadpool(cache.get, key)
+        if is_spilled(cached) and not spill_available(cached):
+            # 流式结果的逐页落盘文件已随输出目录回收，重新处理
+            cached = None
+        if cached is not None:
+            logger.info(f"结果缓存命中: {key}")
+            metrics.record_cache_hit('result')
+            return cached
+    
+    async def run():
+        result = await compute()
+        if cache and result.get('status') == 'success':
+            await run_in_threadpool(cache.put, key, result)
+        return result
+    
+    return await single_flight.do(key, run)
+
+def _get_result_cache():
+    return getattr(app.state, "result_cache", None) or result_cache
+
+def _get_job_store() -> JobStore:
+    store = getattr(app.state, "job_store", None) or job_store
+    if not store:
+        raise HTTPException(status_code=500, detail="任务存储未初始化")
+    return store
+
+def _detect_kind(filename: str) -> Optional[str]:
+    """根据文件扩展名推断处理类型"""
+    return KIND_BY_SUFFIX.get(Path(filename or '').suffix.lower())
+
+def _get_admission() -> Optional[AdmissionController]:
+    return getattr(app.state, "admission", None) or admission
+
+async def _run_job(job_id: str, kind: str, tmp_file_path: str, filename: str, sha256: str, mode: str,
+                   listener=None, ticket=None, endpoint: str = '/jobs', retain: bool = True) -> Optional[Dict]:
+    """
+    在后台执行任务：结果缓存/单飞 + 推理进程池，完成后写入任务存储并清理临时文件
+    
+    Args:
+        retain: 完成后是否在任务存储中保留（异步任务）；同步接口的任务完成即移除
+    
+    Returns:
+        任务最终状态（含 'result'），由同步接口等待并读取
+    """
+    store = _get_job_store()
+    controller = _get_admission()
+    started = time.perf_counter()
+    stages: Dict[str, float] = {}
+    job = None
     try:
-        proc = getattr(app.state, "pdf_processor", None) or pdf_processor
-        if not proc:
-            raise HTTPException(status_code=500, detail="PDF处理器未初始化")
+        pool = _get_pool()
+        args = {'path': tmp_file_path, 'filename': filename, 'mode': mode}
         
-        # 保存上传的文件到临时目录
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
+        def on_progress(info: Dict):
+            store.progress(job_id, info)
+            if listener is not None:
+                listener(info)
         
+        async def compute():
+            # 实际提交推理前占用并发槽位（缓存命中/合并计算的任务不占用）
+            wait_started = time.perf_counter()
+            if ticket is not None:
+                await controller.start(ticket)
+            admission_wait = time.perf_counter() - wait_started
+            result = await pool.run(kind, args, on_progress, stages)
+            stages['queue_wait'] = admission_wait + stages.pop('pool_wait', 0.0)
+            return result
+        
+        result_key = None
+        if kind == 'image':
+            result = await compute()
+        else:
+            result = await _process_document(kind, sha256, mode, compute)
+            if _get_result_cache():
+                # 文档结果已在结果缓存中，异步任务只记录缓存键，获取结果时从磁盘读取
+                result_key = make_result_key(sha256, kind, mode)
+        job = await run_in_threadpool(store.finish, job_id, result=result, result_key=result_key, retain=retain)
+        # 缓存命中/合并计算的任务没有阶段耗时，其页数等已在实际计算的任务中计入
+        metrics.observe_job(endpoint, kind, mode, time.perf_counter() - started,
+                            result if stages else None, stages)
+        if startup_info['first_request_seconds'] is None:
+            startup_info['first_request_seconds'] = round(time.time() - _PROCESS_STARTED, 3)
+            logger.info(f"首个请求完成: 距进程启动 {startup_info['first_request_seconds']} 秒")
+    except Exception as e:
+        logger.error(f"任务执行失败({job_id}): {e}")
+        job = store.finish(job_id, error=str(e), retain=retain)
+        metrics.observe_job(endpoint, kind, mode, time.perf_counter() - started, stages=stages, error=True)
+    finally:
+        if ticket is not None:
+            controller.release(ticket)
+        # 清理临时文件
         try:
-            # 处理PDF（放入线程池，避免阻塞事件循环，从而不影响/health等轻量请求）
-            logger.info(f"开始处理PDF: {file.filename}")
-            result = await run_in_threadpool(lambda: proc.process_pdf(tmp_file_path, file.filename))
-            
-            # 清理临时文件
             os.unlink(tmp_file_path)
+        except Exception:
+            pass
+        _job_tasks.pop(job_id, None)
+    return job
+
+async def _start_job(kind: str, file: Optional[UploadFile], mode: Optional[str] = None, listener=None,
+                     blob: Optional[str] = None, filename: Optional[str] = None, endpoint: str = '/jobs',
+                     retain: bool = True) -> str:
+    """
+    保存上传文件（或引用已上传的文件）并创建后台任务，立即返回任务ID
+    
+    Args:
+        mode: 处理模式（PROCESSING_PROFILES 的名称），None 时为 WORKER_CONFIG["default_mode"]；Office 文档忽略
+        listener: 额外的进度监听（可选），在推理进程池的监听线程中调用
+        blob: 已通过 PUT /blobs/{sha256} 上传的文件哈希，提供时无需 file
+        filename: 文件名，引用 blob 时使用
+        endpoint: 提交任务的接口，作为指标标签
+        retain: 完成后是否在任务存储中保留结果（同步接口为False，由 _wait_job 取得结果）
+    """
+    _get_pool()
+    _get_job_store()
+    mode = _resolve_mode(mode)
+    filename = _upload_name(file, blob, filename)
+    suffix = Path(filename).suffix.lower() or '.bin'
+    store = _get_blob_store()
+    
+    if file is None:
+        # 生成任务文件可能需要整体复制（跨文件系统时），不在事件循环中执行
+        upload = await run_in_threadpool(store.materialize, store.validate(blob), suffix) if store else None
+        if upload is None:
+            raise HTTPException(status_code=404, detail=f"文件不存在，请先上传: {blob}")
+        return _launch_job(kind, filename, upload, mode, listener, endpoint=endpoint, retain=retain)
+    
+    # 分块保存上传文件到临时目录，同时计算内容哈希（不整体读入内存）
+    upload = await spool_upload(file, suffix=suffix)
+    if store:
+        await run_in_threadpool(store.adopt, upload)
+    return _launch_job(kind, filename, upload, mode, listener, endpoint=endpoint, retain=retain)
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    """校验请求的处理模式（在保存上传文件之前），未指定时为默认模式"""
+    mode = mode or WORKER_CONFIG["default_mode"]
+    if mode not in available_modes():
+        raise HTTPException(status_code=400, detail=f"未知的处理模式: {mode}（可选: {'、'.join(available_modes())}）")
+    return mode
+
+def _get_blob_store():
+    return getattr(app.state, "blob_store", None) or blob_store
+
+def _upload_name(file: Optional[UploadFile], blob: Optional[str], filename: Optional[str]) -> str:
+    """处理请求的文件名：上传文件名或引用 blob 时提供的 filename"""
+    if file is None and not blob:
+        raise HTTPException(status_code=400, detail="未提供文件（file）或文件哈希（blob）")
+    return filename or (file.filename if file is not None else None) or blob
+
+def _launch_job(kind: str, filename: str, upload: Dict, mode: Optional[str] = None, listener=None,
+                ticket=None, endpoint: str = '/jobs', retain: bool = True) -> str:
+    """
+    为已落盘的文件（{'path', 'sha256', 'size'}）创建后台任务；任务结束后删除该文件
+    
+    Args:
+        ticket: 已领取的准入票据（批量请求整体准入），None 时在此单独准入
+        retain: 完成后是否在任务存储中保留（见 _run_job）
+    
+    Raises:
+        HTTPException: 429，等待队列已满
+    """
+    store = _get_job_store()
+    controller = _get_admission()
+    try:
+        if ticket is None and controller:
+            ticket = controller.admit()
+    except HTTPException:
+        cleanup_spooled([upload])
+        raise
+    mode = (mode or WORKER_CONFIG["default_mode"]) if kind in MODE_KINDS else None
+    job_id = store.create(kind, filename, sha256=upload['sha256'], mode=mode, size=upload['size'])
+    _job_tasks[job_id] = asyncio.create_task(
+        _run_job(job_id, kind, upload['path'], filename, upload['sha256'], mode, listener, ticket, endpoint, retain)
+    )
+    logger.info(f"任务已提交: {job_id} ({kind}) {filename}")
+    return job_id
+
+async def _wait_job(job_id: str) -> Dict:
+    """
+    等待同步接口的任务完成并返回其最终状态（含 'result'）
+    
+    任务以 retain=False 提交，完成即从任务存储中移除，结果只经由这里交给请求；
+    客户端断开不会取消任务，结果随任务结束释放
+    """
+    task = _job_tasks.get(job_id)
+    job = await asyncio.shield(task) if task is not None else None
+    if job is None:
+        raise HTTPException(status_code=500, detail=f"任务不存在: {job_id}")
+    return job
+
+async def _job_result(job_id: str) -> Optional[Dict]:
+    """异步任务的结果：内存中保留的结果，或按缓存键从结果缓存读取；已过期时返回None"""
+    store = _get_job_store()
+    result = store.result(job_id)
+    if result is not None:
+        return result
+    key = store.result_key(job_id)
+    cache = _get_result_cache()
+    if key is None or not cache:
+        return None
+    result = await run_in_threadpool(cache.get, key)
+    if is_spilled(result) and not spill_available(result):
+        return None
+    return result
+
+@app.head("/blobs/{sha256}")
+async def head_blob(sha256: str):
+    """查询服务器是否已有该内容的文件：200（Content-Length为文件大小）或404"""
+    store = _get_blob_store()
+    sha256 = BlobStore.validate(sha256)
+    size = await run_in_threadpool(store.size, sha256) if store else None
+    if size is None:
+        return Response(status_code=404)
+    return Response(status_code=200, headers={"Content-Length": str(size)})
+
+@app.put("/blobs/{sha256}")
+async def put_blob(sha256: str, request: Request):
+    """上传文件原始字节（请求体流式写入并校验哈希），之后处理请求以 blob=sha256 引用"""
+    store = _get_blob_store()
+    if not store:
+        raise HTTPException(status_code=404, detail="文件存储未启用")
+    sha256 = BlobStore.validate(sha256)
+    if await run_in_threadpool(store.size, sha256) is not None:
+        return JSONResponse(status_code=200, content={"sha256": sha256, "created": False})
+    size = await store.put_stream(sha256, request.stream(), UPLOAD_CONFIG["max_bytes"])
+    logger.info(f"已保存上传文件: {sha256} ({size} 字节)")
+    return JSONResponse(status_code=201, content={"sha256": sha256, "size": size, "created": True})
+
+@app.post("/jobs", status_code=202)
+async def submit_job(file: Optional[UploadFile] = File(None),
+                     blob: Optional[str] = Form(None), filename: Optional[str] = Form(None),
+                     kind: Optional[str] = Form(None), mode: Optional[str] = Form(None)):
+    """提交异步任务，立即返回任务ID（file 与 blob 二选一；mode 为处理模式）"""
+    filename = _upload_name(file, blob, filename)
+    kind = kind or _detect_kind(filename)
+    if kind not in ('pdf', 'ppt', 'office', 'image'):
+        raise HTTPException(status_code=400, detail=f"无法确定处理类型: {filename}")
+    job_id = await _start_job(kind, file, mode, blob=blob, filename=filename)
+    return _get_job_store().get(job_id)
+
+async def _spool_batch(files: List[UploadFile], archive: Optional[UploadFile],
+                       blobs: Optional[List[str]] = None, filenames: Optional[List[str]] = None) -> List[Dict]:
+    """
+    落盘批量上传的文件与归档成员，按 batch_max_files / batch_max_bytes 限制
+    
+    blobs 为已通过 PUT /blobs/{sha256} 上传的文件哈希（filenames 按位置给出文件名），
+    从文件存储生成任务文件，不再传输；任一文件已被淘汰时整批返回404，客户端改为上传文件
+    """
+    blobs = blobs or []
+    filenames = filenames or []
+    max_files = UPLOAD_CONFIG["batch_max_files"]
+    remaining = UPLOAD_CONFIG["batch_max_bytes"]
+    if len(files) + len(blobs) > max_files:
+        raise HTTPException(status_code=413, detail=f"批量文件数超过上限 {max_files}")
+    store = _get_blob_store()
+    if blobs and not store:
+        raise HTTPException(status_code=404, detail="文件存储未启用，请直接上传文件")
+    
+    entries: List[Dict] = []
+    try:
+        for i, blob in enumerate(blobs):
+            filename = filenames[i] if i < len(filenames) and filenames[i] else blob
+            suffix = Path(filename).suffix.lower() or '.bin'
+            upload = await run_in_threadpool(store.materialize, store.validate(blob), suffix)
+            if upload is None:
+                raise HTTPException(status_code=404, detail=f"文件不存在，请先上传: {blob}")
+            remaining -= upload['size']
+            if remaining < 0:
+                cleanup_spooled([upload])
+                raise HTTPException(status_code=413, detail=f"批量文件总大小超过上限 {UPLOAD_CONFIG['batch_max_bytes']} 字节")
+            entries.append({'filename': filename, **upload})
+        for file in files:
+            suffix = Path(file.filename or '').suffix.lower() or '.bin'
+            upload = await spool_upload(file, suffix=suffix, max_bytes=min(UPLOAD_CONFIG["max_bytes"], remaining))
+            remaining -= upload['size']
+            entries.append({'filename': file.filename, **upload})
+        if archive is not None:
+            if not is_archive(archive.filename):
+                raise HTTPException(status_code=400, detail=f"不支持的归档格式: {archive.filename}")
+            packed = await spool_upload(archive, suffix='.archive', max_bytes=remaining)
+            try:
+                entries.extend(await run_in_threadpool(
+                    extract_archive, packed['path'], archive.filename, max_files - len(entries), remaining
+                ))
+            finally:
+                cleanup_spooled([packed])
+    except BaseException:
+        cleanup_spooled(entries)
+        raise
+    return entries
+
+def _batch_record(filename: str, job: Dict) -> tuple:
+    """批量接口的单文件记录与其结果（失败时为None）；流式结果不在此读回，输出时从落盘文件分块生成"""
+    if job['status'] == 'success':
+        return {'filename': filename, 'job_id': job['job_id'], 'status': 'success'}, job['result']
+    record = {'filename': filename, 'job_id': job['job_id'], 'status': 'error', 'message': job.get('error') or '处理失败'}
+    return record, None
+
+@app.post("/batch")
+async def process_batch(request: Request, files: List[UploadFile] = File(None),
+                        archive: Optional[UploadFile] = File(None), mode: Optional[str] = Form(None),
+                        blobs: List[str] = Form(None), filenames: List[str] = Form(None),
+                        stream: bool = False, fields: Optional[str] = None):
+    """
+    批量处理：一次请求提交多个文件（files 可重复）、已上传文件的哈希（blobs + filenames，可重复）
+    或一个 zip/tar 归档（archive）
+    
+    各文件按扩展名判断处理类型，经推理进程池的任务队列并发处理。
+    默认等待全部完成后返回 {'results': [...]}；含流式结果（大文档逐页落盘）时响应逐个文件分块生成，
+    不把各文件的完整结果同时读入内存。stream=true 时以NDJSON按完成顺序逐个下发，
+    最后一行为 {'type': 'summary'}。fields 对每个文件的结果做字段选择。
+    """
+    files = files or []
+    if not files and not blobs and archive is None:
+        raise HTTPException(status_code=400, detail="未提供文件或归档")
+    _get_pool()
+    mode = _resolve_mode(mode)
+    
+    entries = await _spool_batch(files, archive, blobs, filenames)
+    logger.info(f"批量任务: {len(entries)} 个文件")
+    
+    skipped: List[Dict] = []
+    accepted: List[tuple] = []
+    for entry in entries:
+        kind = _detect_kind(entry['filename'])
+        if kind is None:
+            cleanup_spooled([entry])
+            skipped.append({'filename': entry['filename'], 'status': 'error', 'message': '不支持的文件类型'})
+            continue
+        accepted.append((kind, entry))
+    
+    # 整批准入：放不下全部文件时整批返回429（或超出总容量时413），不让批量请求越过等待队列上限
+    controller = _get_admission()
+    try:
+        tickets = controller.admit_batch(len(accepted)) if controller else [None] * len(accepted)
+    except HTTPException:
+        cleanup_spooled([entry for _, entry in accepted])
+        raise
+    launched: List[tuple] = []
+    for (kind, entry), ticket in zip(accepted, tickets):
+        job_id = _launch_job(kind, entry['filename'], entry, mode, ticket=ticket, endpoint='/batch', retain=False)
+        launched.append((entry['filename'], job_id))
+    
+    async def wait_record(filename: str, job_id: str) -> tuple:
+        return _batch_record(filename, await _wait_job(job_id))
+    
+    def summary(records: List[Dict]) -> Dict:
+        succeeded = sum(1 for r in records if r['status'] == 'success')
+        return {'total': len(records), 'succeeded': succeeded, 'failed': len(records) - succeeded}
+    
+    if not stream:
+        done = [(record, None) for record in skipped]
+        done += await asyncio.gather(*(wait_record(f, j) for f, j in launched))
+        records = [record for record, _ in done]
+        if not any(is_spilled(result) for _, result in done):
+            return encode_response(request, {
+                'status': 'success', **summary(records),
+                'results': [{**record, 'result': select_fields(result, fields)} if result is not None else record
+                            for record, result in done]
+            })
+        
+        def body():
+            # 逐个文件分块输出，流式结果从落盘文件读回，同一时刻只有一个文件的一块结果在内存中
+            head = json.dumps({'status': 'success', **summary(records)}, ensure_ascii=False, separators=(',', ':'))
+            yield (head[:-1] + ',"results":[').encode('utf-8')
+            for i, (record, result) in enumerate(done):
+                if i:
+                    yield b','
+                yield from iter_record_json(record, result, fields)
+            yield b']}'
+        
+        return encode_json_stream(request, body())
+    
+    async def lines():
+        records = []
+        for record in skipped:
+            records.append(record)
+            yield _stream_record({'type': 'file', **record}, False)
+        for next_done in asyncio.as_completed([wait_record(f, j) for f, j in launched]):
+            record, result = await next_done
+            records.append(record)
+            async for piece in iterate_in_threadpool(iter_record_json({'type': 'file', **record}, result, fields)):
+                yield piece
+            yield b"\n"
+        yield _stream_record({'type': 'summary', **summary(records)}, False)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询任务状态：阶段与页级进度"""
+    job = _get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, request: Request, fields: Optional[str] = None):
+    """获取任务结果；任务未完成时返回202及当前状态。fields 选择返回的结果字段"""
+    store = _get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    if job['status'] in ('queued', 'running'):
+        return JSONResponse(status_code=202, content=job)
+    if job['status'] == 'error':
+        return {"status": "error", "job_id": job_id, "filename": job['filename'], "message": job['error']}
+    result = await _job_result(job_id)
+    if result is None:
+        raise HTTPException(status_code=410, detail="任务结果已过期，请重新提交")
+    return encode_result_response(request, {
+        "status": "success",
+        "job_id": job_id,
+        "filename": job['filename']
+    }, result, fields)
+
+@app.post("/ocr/pdf")
+async def process_pdf(request: Request, file: Optional[UploadFile] = File(None),
+                      blob: Optional[str] = Form(None), filename: Optional[str] = Form(None),
+                      mode: Optional[str] = Form(None), fields: Optional[str] = None):
+    """处理PDF文件OCR（同步接口：提交任务并等待完成）。mode 为处理模式（标准/快速/精细），fields 选择返回的结果字段"""
+    filename = _upload_name(file, blob, filename)
+    try:
+        # 处理PDF（交给推理进程，事件循环不阻塞，从而不影响/health等轻量请求）
+        logger.info(f"开始处理PDF: {filename}")
+        job = await _wait_job(await _start_job('pdf', file, mode, blob=blob, filename=filename, endpoint='/ocr/pdf',
+                                               retain=False))
+        
+        if job['status'] == 'success':
+            # 大文档的流式结果从逐页落盘文件分块组装下发
+            return encode_result_response(request, {"status": "success", "filename": filename}, job['result'], fields)
+        else:
+            return {
+                "status": "error",
+                "filename": filename,
+                "message": job.get('error') or '处理失败'
+            }
             
-            if result.get('status') == 'success':
-                return {
-                    "status": "success",
-                    "filename": file.filename,
-                    "result": result
-                }
-            else:
-                return {
-                    "status": "error",
-                    "filename": file.filename,
-                    "message": result.get('message', '处理失败')
-                }
-                
-        except Exception as e:
-            # 清理临时文件
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
-            raise e
-            
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"PDF处理异常: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _pages_from_result(result: Dict, skip_pages) -> Iterable[Dict]:
+    """将完整结果按页拆分（结果缓存命中或合并到同一计算时没有逐页进度可转发）"""
+    if is_spilled(result):
+        # 流式结果本身逐页落盘，按页读回
+        return (record for record in iter_pages(result)
+                if record['page'] not in skip_pages and any(record.get(f) for f in ('texts', 'figures', 'tables')))
+    pages: Dict[int, Dict] = {}
+    for field in ('texts', 'figures', 'tables'):
+        for item in result.get(field) or []:
+            page = item.get('page')
+            if page in skip_pages:
+                continue
+            pages.setdefault(page, {'page': page, 'texts': [], 'figures': [], 'tables': []})[field].append(item)
+    return [pages[page] for page in sorted(pages, key=lambda p: (p is None, p or 0))]
+
+def _stream_record(record: Dict, sse: bool) -> bytes:
+    """编码一条流式记录：NDJSON 每行一个JSON；SSE 以 type 作为事件名"""
+    data = json.dumps(record, ensure_ascii=False)
+    if sse:
+        return f"event: {record['type']}\ndata: {data}\n\n".encode('utf-8')
+    return (data + "\n").encode('utf-8')
+
+@app.post("/ocr/pdf/stream")
+async def process_pdf_stream(file: Optional[UploadFile] = File(None),
+                             blob: Optional[str] = Form(None), filename: Optional[str] = Form(None),
+                             mode: Optional[str] = Form(None), format: str = "ndjson"):
+    """
+    流式处理PDF：每页完成即下发该页的 texts/figures/tables，最后下发汇总记录
+    
+    记录格式：{"type": "page", "page", "total_pages", "texts", "figures", "tables"}，
+    结束时 {"type": "summary", ...}（除逐页内容外的完整结果）或 {"type": "error", "message"}。
+    format=sse 时以 Server-Sent Events 输出，默认 NDJSON。mode 为处理模式（标准/快速/精细）。
+    """
+    filename = _upload_name(file, blob, filename)
+    sse = format == "sse"
+    loop = asyncio.get_running_loop()
+    pages: asyncio.Queue = asyncio.Queue()
+    
+    def on_progress(info: Dict):
+        page_result = info.get('page_result')
+        if page_result is not None:
+            record = {'type': 'page', 'total_pages': info.get('total_pages'), **page_result}
+            loop.call_soon_threadsafe(pages.put_nowait, record)
+    
+    logger.info(f"开始流式处理PDF: {filename}")
+    job_id = await _start_job('pdf', file, mode, blob=blob, filename=filename, listener=on_progress,
+                              endpoint='/ocr/pdf/stream', retain=False)
+    task = _job_tasks.get(job_id)
+    
+    async def records():
+        streamed = set()
+        finished = asyncio.ensure_future(asyncio.shield(task)) if task is not None else None
+        while finished is not None:
+            getter = asyncio.ensure_future(pages.get())
+            done, _ = await asyncio.wait({getter, finished}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            record = getter.result()
+            streamed.add(record['page'])
+            yield _stream_record(record, sse)
+        # 任务结束前已入队但尚未发送的页
+        while not pages.empty():
+            record = pages.get_nowait()
+            streamed.add(record['page'])
+            yield _stream_record(record, sse)
+        
+        job = finished.result() if finished is not None else None
+        if job is None or job['status'] != 'success':
+            message = (job or {}).get('error') or '处理失败'
+            yield _stream_record({'type': 'error', 'job_id': job_id, 'filename': filename, 'message': message}, sse)
+            return
+        
+        result = job['result'] or {}
+        for page_record in _pages_from_result(result, streamed):
+            yield _stream_record({'type': 'page', 'total_pages': result.get('total_pages'), **page_record}, sse)
+        summary = {k: v for k, v in result.items() if k not in ('texts', 'figures', 'tables', 'spill')}
+        yield _stream_record({'type': 'summary', 'job_id': job_id, 'filename': filename, **summary}, sse)
+    
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(records(), media_type=media_type)
+
 @app.post("/ocr/ppt")
-async def process_ppt(file: UploadFile = File(...)):
-    """处理PPT文件OCR"""
+async def process_ppt(request: Request, file: Optional[UploadFile] = File(None),
+                      blob: Optional[str] = Form(None), filename: Optional[str] = Form(None),
+                      mode: Optional[str] = Form(None), fields: Optional[str] = None):
+    """处理PPT文件OCR（同步接口：提交任务并等待完成）。mode 为幻灯片图片OCR的处理模式，fields 选择返回的结果字段"""
+    filename = _upload_name(file, blob, filename)
     try:
-        proc = getattr(app.state, "ppt_processor", None) or ppt_processor
-        if not proc:
-            raise HTTPException(status_code=500, detail="PPT处理器未初始化")
-        
-        # 保存上传的文件到临时目录
-        suffix = '.pptx' if file.filename.endswith('.pptx') else '.ppt'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
+        logger.info(f"开始处理PPT: {filename}")
+        job = await _wait_job(await _start_job('ppt', file, mode, blob=blob, filename=filename, endpoint='/ocr/ppt',
+                                               retain=False))
         
-        try:
-            # 处理PPT（放入线程池，避免阻塞事件循环）
-            logger.info(f"开始处理PPT: {file.filename}")
-            result = await run_in_threadpool(lambda: proc.process_ppt(tmp_file_path, file.filename))
-            
-            # 清理临时文件
-            os.unlink(tmp_file_path)
-            
-            if result.get('status') == 'success':
-                logger.info(f"PPT处理成功: {file.filename}")
-                return {
-                    "status": "success",
-                    "filename": file.filename,
-                    "result": result
-                }
-            else:
-                logger.error(f"PPT处理失败: {file.filename}")
-                return {
-                    "status": "error",
-                    "filename": file.filename,
-                    "message": result.get('message', '处理失败')
-                }
-                
-        except Exception as e:
-            # 清理临时文件
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
-            raise e
+        if job['status'] == 'success':
+            logger.info(f"PPT处理成功: {filename}")
+            return encode_response(request, {
+                "status": "success",
+                "filename": filename,
+                "result": select_fields(job['result'], fields)
+            })
+        else:
+            logger.error(f"PPT处理失败: {filename}")
+            return {
+                "status": "error",
+                "filename": filename,
+                "message": job.get('error') or '处理失败'
+            }
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"PPT处理异常: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ocr/office")
-async def process_office(file: UploadFile = File(...)):
-    """处理Office文档（Word/Excel）"""
+async def process_office(request: Request, file: Optional[UploadFile] = File(None),
+                         blob: Optional[str] = Form(None), filename: Optional[str] = Form(None),
+                         fields: Optional[str] = None):
+    """处理Office文档（Word/Excel）（同步接口：提交任务并等待完成）。直接读取文字内容，不区分处理模式；fields 选择返回的结果字段"""
+    filename = _upload_name(file, blob, filename)
     try:
-        logger.info(f"开始处理Office文档: {file.filename}")
+        logger.info(f"开始处理Office文档: {filename}")
         
         # 检查文件类型
-        file_ext = Path(file.filename).suffix.lower()
+        file_ext = Path(filename).suffix.lower()
         if file_ext not in ['.docx', '.doc', '.xlsx', '.xls']:
             raise HTTPException(status_code=400, detail=f"不支持的文件类型: {file_ext}")
         
-        # 保存上传的文件到临时目录
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
+        job = await _wait_job(await _start_job('office', file, blob=blob, filename=filename, endpoint='/ocr/office',
+                                               retain=False))
         
-        try:
-            # 使用Office处理器处理文档
-            proc = getattr(app.state, "office_processor", None) or office_processor
-            if not proc:
-                raise HTTPException(status_code=500, detail="Office处理器未初始化")
-            # 放入线程池，保持/health可用
-            result = await run_in_threadpool(lambda: proc.process_office_document(tmp_file_path, file.filename))
-            
-            if result.get('status') == 'success':
-                logger.info(f"Office文档处理成功: {file.filename}")
-                return result
-            else:
-                logger.error(f"Office文档处理失败: {result.get('message', '未知错误')}")
-                raise HTTPException(status_code=500, detail=result.get('message', '处理失败'))
-                
-        finally:
-            # 清理临时文件
-            try:
-                os.unlink(tmp_file_path)
-            except Exception:
-                pass
+        if job['status'] == 'success':
+            logger.info(f"Office文档处理成功: {filename}")
+            return encode_response(request, select_fields(job['result'], fields))
+        else:
+            logger.error(f"Office文档处理失败: {job.get('error') or '未知错误'}")
+            raise HTTPException(status_code=500, detail=job.get('error') or '处理失败')
                 
     except HTTPException:
         raise
@@ -308,64 +808,58 @@ async def process_office(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ocr/image")
-async def process_image(file: UploadFile = File(...)):
-    """处理图片OCR"""
+async def process_image(file: Optional[UploadFile] = File(None),
+                        blob: Optional[str] = Form(None), filename: Optional[str] = Form(None),
+                        mode: Optional[str] = Form(None)):
+    """处理图片OCR（同步接口：提交任务并等待完成）。mode 为处理模式（标准/快速/精细）"""
+    filename = _upload_name(file, blob, filename)
     try:
-        engine = getattr(app.state, "ocr_engine", None) or ocr_engine
-        if not engine:
-            raise HTTPException(status_code=500, detail="OCR引擎未初始化")
-        
-        # 保存上传的文件到临时目录
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
+        logger.info(f"开始处理图片: {filename}")
+        job = await _wait_job(await _start_job('image', file, mode, blob=blob, filename=filename, endpoint='/ocr/image',
+                                               retain=False))
+        if job['status'] != 'success':
+            raise RuntimeError(job.get('error') or '处理失败')
         
-        try:
-            # 处理图片（放入线程池，避免阻塞事件循环）
-            logger.info(f"开始处理图片: {file.filename}")
-            result = await run_in_threadpool(lambda: engine.extract_text_direct(tmp_file_path))
-            
-            # 清理临时文件
-            os.unlink(tmp_file_path)
-            
-            logger.info(f"图片处理成功: {file.filename}")
-            return {
-                "status": "success",
-                "filename": file.filename,
-                "text": result
-            }
-                
-        except Exception as e:
-            # 清理临时文件
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
-            raise e
+        logger.info(f"图片处理成功: {filename}")
+        return {
+            "status": "success",
+            "filename": filename,
+            "text": job['result']
+        }
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"图片处理异常: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
 async def health_check():
-    """健康检查"""
+    """健康检查（含排队深度、处理中任务数与预计等待时间，供客户端与负载均衡退避）"""
+    controller = _get_admission()
     return {
         "status": "healthy",
         "gpu_available": True,
         "llm_enabled": False,
         "initialized": bool(getattr(app.state, "initialized", False)),
-        "gpu_info": _probe_gpu_info(),
-        "components": {
-            "pdf_processor": bool(getattr(app.state, "pdf_processor", None)),
-            "ppt_processor": bool(getattr(app.state, "ppt_processor", None)),
-            "ocr_engine": bool(getattr(app.state, "ocr_engine", None))
-        }
+        "accepting": not controller.saturated() if controller else False,
+        "admission": controller.stats() if controller else {},
+        "startup": startup_info,
+        "gpu_info": _gpu_info(),
+        "components": _components()
     }
 
 @app.get("/gpu")
 async def gpu_info():
     """返回详细GPU信息"""
-    return _probe_gpu_info()
+    return _gpu_info()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 指标：请求/任务/各阶段耗时直方图，页数、缓存命中、错误与处理中任务数"""
+    controller = _get_admission()
+    pool = getattr(app.state, "inference_pool", None) or inference_pool
+    return metrics.render(controller.stats() if controller else None, pool.stats() if pool else None)
 
 if __name__ == "__main__":
     # 配置日志
@@ -378,5 +872,7 @@ if __name__ == "__main__":
         port=8888,
         reload=False,
         log_level="info",
-        workers=2  # 增加并发worker，确保长任务期间健康检查可用
+        # 前端为异步单进程即可：推理在独立进程中执行，长任务期间健康检查依然可用；
+        # 注意每个HTTP worker会各自创建一个推理进程池
+        workers=WORKER_CONFIG["http_workers"]
     )
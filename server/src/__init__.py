@@ -1,7 +1,20 @@
 # PDF OCR模块
-from .pdf_processor import PDFProcessor
-from .ppt_processor import PPTProcessor
-from .office_processor import OfficeProcessor
-from .ocr_engine import OCREngine
+# 处理器按需导入：HTTP前端只使用缓存/进程池等轻量模块，不加载OCR/YOLO依赖
+import importlib
+
+_LAZY_EXPORTS = {
+    'PDFProcessor': '.pdf_processor',
+    'PPTProcessor': '.ppt_processor',
+    'OfficeProcessor': '.office_processor',
+    'OCREngine': '.ocr_engine',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ['PDFProcessor', 'PPTProcessor', 'OfficeProcessor', 'OCREngine']
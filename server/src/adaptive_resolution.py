@@ -0,0 +1,95 @@
+"""
+按页自适应渲染分辨率
+
+固定分辨率对大字号页面（封面、幻灯片式页面）过高、对小字号页面（脚注、密排表格）又不够。
+按页估计正文字形高度，按“字符目标像素高度”换算该页的渲染分辨率：
+1. 有文字层的页面（原生PDF）按字符数加权的字号中位数估计，不需要渲染
+2. 文字层字符过少且页面含图片（扫描件）时，以长边 probe_size 渲染灰度预览，由连通域估计
+文字过少的页面（封面、图表页、空白页）取最低分辨率。识别置信度仍偏低的文本区域由调用方
+按高分辨率只重渲染该区域（get_pixmap(clip=...)）。
+"""
+
+from typing import Dict, Optional, Tuple
+
+import fitz
+import numpy as np
+
+from .block_layout import estimate_char_height
+
+# 字形高度约为字号的0.8（连通域取较高分位，含升部/降部）
+GLYPH_RATIO = 0.8
+
+
+def render_gray(page, target_size: int) -> np.ndarray:
+    """按长边 target_size 渲染灰度图"""
+    zoom = target_size / max(page.rect.width, page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+
+def text_layer_font_size(page) -> Tuple[Optional[float], int]:
+    """文字层按字符数加权的字号中位数（磅）与字符数；无文字层时字号为None"""
+    sizes: Dict[float, int] = {}
+    for block in page.get_text("dict").get("blocks", []):
+        for line in block.get("lines", []):
+            for span in line.get("spans", []):
+                chars = len(span.get("text", "").strip())
+                if chars and span.get("size", 0) > 0:
+                    size = round(span["size"], 1)
+                    sizes[size] = sizes.get(size, 0) + chars
+    total = sum(sizes.values())
+    if not total:
+        return None, 0
+    seen = 0
+    for size in sorted(sizes):
+        seen += sizes[size]
+        if seen * 2 >= total:
+            return size, total
+    return None, total
+
+
+def resolution_for_glyph_height(glyph_pt: float, long_side_pt: float, target_char_px: float,
+                                min_resolution: int, max_resolution: int, step: int = 64) -> int:
+    """字形高 glyph_pt 磅时，使其达到 target_char_px 像素所需的长边分辨率（按 step 取整并限幅）"""
+    resolution = target_char_px * long_side_pt / max(glyph_pt, 0.1)
+    resolution = int(round(resolution / step)) * step
+    return int(min(max_resolution, max(min_resolution, resolution)))
+
+
+def choose_page_resolution(page, target_char_px: float, min_resolution: int, max_resolution: int,
+                           probe_size: int = 640, min_chars: int = 80) -> Dict:
+    """
+    为单页选择渲染分辨率
+
+    Args:
+        target_char_px: 正文字形的目标像素高度
+        min_chars: 文字层字符数/预览类字符连通域数少于该值时视为文字过少
+        probe_size: 无文字层时灰度预览的长边像素
+
+    Returns:
+        {'resolution': 长边像素, 'glyph_pt': 估计的字形高度（磅，None 表示文字过少）,
+         'source': 'text_layer' | 'probe', 'probe_pixels': 预览渲染像素数}
+    """
+    long_side = max(page.rect.width, page.rect.height)
+    glyph_pt, source, probe_pixels = None, 'text_layer', 0
+    size, chars = text_layer_font_size(page)
+    if size is not None and chars >= min_chars:
+        glyph_pt = size * GLYPH_RATIO
+    elif page.get_images():
+        # 文字可能在图片中（扫描件）：由灰度预览估计
+        source = 'probe'
+        gray = render_gray(page, probe_size)
+        probe_pixels = int(gray.size)
+        char_px, _ = estimate_char_height(gray, min_chars=min_chars)
+        if char_px is not None:
+            glyph_pt = char_px * long_side / probe_size
+    if glyph_pt is None:
+        resolution = min_resolution
+    else:
+        resolution = resolution_for_glyph_height(glyph_pt, long_side, target_char_px, min_resolution, max_resolution)
+    return {
+        'resolution': resolution,
+        'glyph_pt': glyph_pt,
+        'source': source,
+        'probe_pixels': probe_pixels
+    }
@@ -0,0 +1,167 @@
+"""
+准入控制 - 全局并发上限 + 有界等待队列，超出时返回429并给出 Retry-After
+
+任务提交时先领取票据（计入等待队列），实际提交到推理进程池前占用并发槽位；
+结果缓存命中或合并到同一计算的任务不占用槽位。Retry-After 由当前排队深度与
+服务时间的指数滑动平均估算，客户端与负载均衡据此退避，避免超时重试放大拥塞。
+"""
+
+import asyncio
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from loguru import logger
+
+
+class AdmissionTicket:
+    """一次任务的准入票据"""
+
+    __slots__ = ('started_at', 'released')
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.released = False
+
+
+class AdmissionController:
+    """并发槽位与等待队列（仅在事件循环线程内使用）"""
+
+    def __init__(self, max_inflight: int, max_queue: int, initial_service_seconds: float = 30.0,
+                 ewma_alpha: float = 0.2):
+        """
+        Args:
+            max_inflight: 同时提交到推理进程池的任务数
+            max_queue: 等待槽位的任务数上限
+            initial_service_seconds: 尚无统计时假定的单任务耗时
+            ewma_alpha: 服务时间滑动平均系数
+        """
+        self.max_inflight = max(1, int(max_inflight))
+        self.max_queue = max(0, int(max_queue))
+        self.ewma_alpha = ewma_alpha
+        self._service_seconds = float(initial_service_seconds)
+        self._semaphore = asyncio.Semaphore(self.max_inflight)
+        self._waiting = 0
+        self._inflight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def saturated(self, n: int = 1) -> bool:
+        """再接收 n 个任务是否超出 并发上限 + 队列上限"""
+        return self._waiting + self._inflight + n > self.max_inflight + self.max_queue
+
+    def estimated_wait(self, position: Optional[int] = None) -> float:
+        """排在第 position 位（默认队尾之后）的任务预计等待秒数"""
+        if position is None:
+            position = self._waiting + 1
+        ahead = self._inflight + position - self.max_inflight
+        if ahead <= 0:
+            return 0.0
+        return math.ceil(ahead / self.max_inflight) * self._service_seconds
+
+    def retry_after(self) -> int:
+        return max(1, int(math.ceil(self.estimated_wait() or self._service_seconds)))
+
+    def reject(self) -> HTTPException:
+        """构造429响应并计数"""
+        self._rejected += 1
+        retry_after = self.retry_after()
+        logger.warning(f"请求被拒绝(队列已满): 处理中{self._inflight} 排队{self._waiting}，建议{retry_after}秒后重试")
+        return HTTPException(
+            status_code=429,
+            detail=f"服务繁忙：处理中 {self._inflight}，排队 {self._waiting}，请 {retry_after} 秒后重试",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    def admit(self) -> AdmissionTicket:
+        """
+        领取票据进入等待队列
+
+        Raises:
+            HTTPException: 429，队列已满
+        """
+        if self.saturated():
+            raise self.reject()
+        self._waiting += 1
+        return AdmissionTicket()
+
+    def admit_batch(self, n: int) -> List[AdmissionTicket]:
+        """
+        批量请求整体准入：n 个任务全部放得下时一次领取 n 张票据，否则整批拒绝
+
+        Raises:
+            HTTPException: 413，n 超过 并发上限 + 队列上限（空闲时也无法整体接收，需拆分）；
+                429，当前放不下整批
+        """
+        capacity = self.max_inflight + self.max_queue
+        if n > capacity:
+            raise HTTPException(status_code=413, detail=f"批量文件数 {n} 超过服务器可同时接收的任务数 {capacity}，请拆分后提交")
+        if self.saturated(n):
+            raise self.reject()
+        self._waiting += n
+        return [AdmissionTicket() for _ in range(n)]
+
+    async def start(self, ticket: AdmissionTicket):
+        """等待并发槽位"""
+        if ticket.started_at is not None or ticket.released:
+            return
+        await self._semaphore.acquire()
+        self._waiting -= 1
+        self._inflight += 1
+        ticket.started_at = time.perf_counter()
+
+    def release(self, ticket: AdmissionTicket):
+        """任务结束（或未占用槽位即完成）时归还票据，更新服务时间统计"""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.started_at is None:
+            self._waiting -= 1
+            return
+        elapsed = time.perf_counter() - ticket.started_at
+        self._service_seconds += self.ewma_alpha * (elapsed - self._service_seconds)
+        self._completed += 1
+        self._inflight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': self._inflight,
+            'queue_depth': self._waiting,
+            'max_inflight': self.max_inflight,
+            'max_queue': self.max_queue,
+            'avg_service_seconds': round(self._service_seconds, 3),
+            'estimated_wait_seconds': round(self.estimated_wait(), 3),
+            'completed': self._completed,
+            'rejected': self._rejected
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI中间件：队列已满时在读取请求体之前直接返回429"""
+
+    def __init__(self, app, get_controller: Callable[[], Optional[AdmissionController]], path_prefixes=()):
+        self.app = app
+        self.get_controller = get_controller
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] == "http" and scope.get("method") == "POST"
+                and scope.get("path", "").startswith(self.path_prefixes)):
+            controller = self.get_controller()
+            if controller is not None and controller.saturated():
+                error = controller.reject()
+                body = ('{"detail":"%s"}' % error.detail).encode("utf-8")
+                await send({
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", error.headers["Retry-After"].encode())
+                    ]
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,118 @@
+"""
+识别微批调度器 - 汇聚并发页面/请求中的文本行切片，按批次统一执行文字识别
+
+批次在以下任一条件满足时提交：
+    - 已收集 max_batch_size 个切片
+    - 最早的切片已等待 max_wait_ms 毫秒
+max_wait_ms 越大批次越满、吞吐越高，但单请求延迟增加；统计信息中的
+平均批次填充率与排队延迟用于调优这一取舍。
+识别参数不同的切片（如是否启用方向分类）以 key 区分：同一批次中按 key 分组分别识别，不会混用参数。
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+
+class RecognitionBatcher:
+    """跨线程的文本行识别微批调度器（单个调度线程独占识别模型）"""
+
+    def __init__(self, recognize_fn: Callable[[List[Any]], List[Tuple[str, float]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Args:
+            recognize_fn: 批量识别函数，输入图像列表，返回等长的 (文本, 置信度) 列表；
+                提交时指定了 key 的切片以 recognize_fn(图像列表, key) 调用
+            max_batch_size: 单批最大切片数
+            max_wait_ms: 批次最长等待时间（毫秒）
+        """
+        self.recognize_fn = recognize_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+        self._batch_time_total = 0.0
+        self._thread = threading.Thread(target=self._loop, name="recognition-batcher", daemon=True)
+        self._thread.start()
+
+    def recognize(self, images: Sequence[Any], key: Optional[Hashable] = None) -> List[Tuple[str, float]]:
+        """提交一组切片并阻塞等待识别结果（顺序与输入一致）；key 为识别参数，只与相同 key 的切片合批"""
+        if not images:
+            return []
+        now = time.perf_counter()
+        futures = []
+        for image in images:
+            future = Future()
+            self._queue.put((image, future, now, key))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def _collect(self) -> List[Tuple[Any, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            groups: Dict[Hashable, List[Tuple[Any, Future, float, Any]]] = {}
+            for item in self._collect():
+                groups.setdefault(item[3], []).append(item)
+            for key, batch in groups.items():
+                self._run(batch, key)
+
+    def _run(self, batch: List[Tuple[Any, Future, float, Any]], key: Optional[Hashable]):
+        """识别同一 key 的一批切片并回填结果"""
+        started = time.perf_counter()
+        try:
+            images = [item[0] for item in batch]
+            results = self.recognize_fn(images) if key is None else self.recognize_fn(images, key)
+            if len(results) != len(batch):
+                raise RuntimeError(f"识别结果数量不匹配: {len(results)} != {len(batch)}")
+            for (_, future, _, _), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            logger.error(f"批量识别失败: {e}")
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_time_total += finished - started
+            for _, _, enqueued, _ in batch:
+                delay = started - enqueued
+                self._queue_delay_total += delay
+                self._queue_delay_max = max(self._queue_delay_max, delay)
+
+    def stats(self) -> Dict:
+        """批次填充率、排队延迟与批次耗时统计"""
+        with self._stats_lock:
+            batches = self._batches or 1
+            items = self._items or 1
+            return {
+                'batches': self._batches,
+                'items': self._items,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'avg_batch_fill': round(self._items / batches / self.max_batch_size, 4),
+                'avg_queue_delay_ms': round(self._queue_delay_total / items * 1000.0, 3),
+                'max_queue_delay_ms': round(self._queue_delay_max * 1000.0, 3),
+                'avg_batch_ms': round(self._batch_time_total / batches * 1000.0, 3),
+                'queued': self._queue.qsize()
+            }
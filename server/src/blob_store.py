@@ -0,0 +1,153 @@
+"""
+内容寻址的上传文件存储 - 客户端先以 HEAD /blobs/{sha256} 询问，服务器已有则不再传输文件
+
+上传过的文件（PUT /blobs 或普通上传）按SHA-256保存，处理请求以 blob=哈希 引用；
+换模式重处理、重试与重复文件都无需再次传输。容量按条数/字节LRU淘汰（以目录为准，见 PageCache），
+任务使用的是落盘目录中的硬链接/副本，淘汰不影响正在处理的任务。
+流式写入时请求体按块汇集后在线程池中写盘，提交（目录锁与淘汰扫描）也在线程池中执行，不阻塞事件循环。
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+from .config import BLOB_CONFIG, UPLOAD_CONFIG
+from .page_cache import PageCache
+from .upload import get_spool_dir
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _write_chunk(out, digest, data: bytes):
+    digest.update(data)
+    out.write(data)
+
+
+def _discard(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _link_or_copy(src: Path, dst: Path):
+    """同一文件系统内硬链接，否则复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class BlobStore(PageCache):
+    """按内容哈希保存的上传文件（复用页面缓存的LRU索引与淘汰）"""
+
+    suffix = ".blob"
+
+    @staticmethod
+    def validate(sha256: str) -> str:
+        sha256 = (sha256 or '').lower()
+        if not _SHA256_RE.match(sha256):
+            raise HTTPException(status_code=400, detail=f"无效的SHA-256: {sha256}")
+        return sha256
+
+    def size(self, sha256: str) -> Optional[int]:
+        """已保存则返回文件大小并刷新最近使用时间，否则返回None"""
+        path = self._path(sha256)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return None
+        self._touch(path)
+        return size
+
+    async def put_stream(self, sha256: str, chunks: AsyncIterator[bytes], max_bytes: int) -> int:
+        """
+        流式写入并校验内容哈希（写盘、哈希与提交在线程池中执行）
+
+        Returns:
+            写入的字节数
+        """
+        chunk_size = UPLOAD_CONFIG.get("chunk_size", 1024 * 1024)
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = await run_in_threadpool(self._reserve, sha256)
+        try:
+            with open(tmp_path, 'wb') as out:
+                pending = bytearray()
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise HTTPException(status_code=413, detail=f"上传文件超过大小上限 {max_bytes} 字节")
+                    pending += chunk
+                    if len(pending) >= chunk_size:
+                        await run_in_threadpool(_write_chunk, out, digest, bytes(pending))
+                        pending.clear()
+                if pending:
+                    await run_in_threadpool(_write_chunk, out, digest, bytes(pending))
+            if digest.hexdigest() != sha256:
+                raise HTTPException(status_code=400, detail="上传内容与SHA-256不一致")
+        except BaseException:
+            await run_in_threadpool(_discard, tmp_path)
+            raise
+        if not await run_in_threadpool(self._commit, sha256, tmp_path):
+            raise HTTPException(status_code=500, detail="保存上传文件失败")
+        return size
+
+    def _reserve(self, sha256: str) -> str:
+        """在条目所在目录创建临时文件，返回其路径"""
+        path = self._path(sha256)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=path.parent)
+        os.close(fd)
+        return tmp_path
+
+    def adopt(self, upload: Dict):
+        """保存一次普通上传的文件（{'path', 'sha256', 'size'}），供之后以哈希引用"""
+        path = self._path(upload['sha256'])
+        if path.exists():
+            self._touch(path)
+            return
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            _link_or_copy(Path(upload['path']), tmp_path)
+        except OSError as e:
+            logger.warning(f"保存上传文件失败: {e}")
+            return
+        self._commit(upload['sha256'], tmp_path)
+
+    def materialize(self, sha256: str, suffix: str = '') -> Optional[Dict]:
+        """为任务在落盘目录中生成一份文件（硬链接或副本），不存在返回None"""
+        size = self.size(sha256)
+        if size is None:
+            return None
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=get_spool_dir())
+        os.close(fd)
+        os.unlink(path)
+        try:
+            _link_or_copy(self._path(sha256), Path(path))
+        except OSError as e:
+            logger.warning(f"读取已保存文件失败: {sha256}: {e}")
+            return None
+        return {'path': path, 'sha256': sha256, 'size': size}
+
+
+def create_blob_store() -> Optional[BlobStore]:
+    """按配置创建文件存储，未启用时返回None"""
+    if not BLOB_CONFIG.get("enabled", False):
+        return None
+    return BlobStore(
+        BLOB_CONFIG["blob_dir"],
+        max_entries=BLOB_CONFIG.get("max_entries", 5000),
+        max_bytes=BLOB_CONFIG.get("max_bytes", 20 * 1024 * 1024 * 1024),
+        low_water=BLOB_CONFIG.get("low_water", 0.9)
+    )
@@ -47,7 +47,99 @@ IMAGE_CONFIG = {
     "target_resolution": 1024,      # 标准分辨率
     "high_resolution": 2560,        # 高分辨率
     "similarity_threshold": 0.8,    # 图片相似度阈值
-    "overlap_threshold": 0.3        # 重叠区域阈值
+    "overlap_threshold": 0.3,       # 同类布局区域IoU超过该值时合并为一个区域（识别前去重）
+    "embedded_images": True,        # 图表区域对应PDF嵌入图片时直接导出原始数据，不再渲染裁剪
+    "embedded_min_iou": 0.7         # 图表区域与嵌入图片放置位置的最小IoU
+}
+
+# 按页自适应渲染分辨率：由文字层字号（无文字层时由低分辨率灰度预览）估计正文字形高度，
+# 按字符目标像素高度选择该页分辨率；识别置信度偏低的文本区域按 high_resolution 只重渲染该区域后重新识别
+ADAPTIVE_RESOLUTION_CONFIG = {
+    "enabled": True,
+    "probe_size": 640,              # 无文字层时预览渲染长边像素
+    "min_chars": 80,                # 字符少于该值的页面（图表页、空白页）取最低分辨率
+    "target_char_px": 9,            # 快速模式：正文字符目标高度（像素），10pt正文约对应960
+    "fine_target_char_px": 14,      # 精细模式：10pt正文约对应1472
+    "min_resolution": 768,          # 大字号页面、图表页的最低分辨率
+    "max_resolution": 2048,         # 小字号页面的最高分辨率（区域升级仍用 high_resolution）
+    "escalate_confidence": 0.75,    # 文本区域平均识别置信度低于该值时高分辨率重识别
+    "escalate_max_regions": 8       # 每页最多重识别的区域数
+}
+
+# 处理配置档：请求的 mode 选择其中一个，生成不可变的 ProcessingProfile 随调用显式传给 PDFProcessor 与 OCREngine，
+# 不再改写 LAYOUT_CONFIG 或共享引擎的属性，不同模式的任务可在同一推理进程内并发。可按需增加配置档
+PROCESSING_PROFILES = {
+    # 默认模式：与引入配置档之前未调用 set_mode 时的参数一致（IMAGE_CONFIG/LAYOUT_CONFIG 的分辨率与阈值）
+    "标准": {
+        "target_resolution": IMAGE_CONFIG["target_resolution"],  # 页面标准分辨率（未启用自适应分辨率时）
+        "high_resolution": IMAGE_CONFIG["high_resolution"],      # 区域重渲染/高清直扫分辨率
+        "target_char_px": ADAPTIVE_RESOLUTION_CONFIG["target_char_px"],
+        "layout_conf": LAYOUT_CONFIG["conf_threshold"],          # 布局检测置信度阈值
+        "layout_iou": LAYOUT_CONFIG["iou_threshold"],
+        "layout_imgsz": 1024,           # 布局检测输入尺寸
+        "use_angle_cls": True,          # 文字方向分类
+        "region_min_conf": 0.5,         # 区域识别保留文本行的最低置信度
+        "direct_min_conf": 0.1,         # 整页直扫保留文本行的最低置信度
+        "min_text_regions": 1,          # 区域识别的文本区域少于该数时尝试直扫补充
+        "fine": False                   # 图表/表格按高分辨率重渲染、无文本页高清直扫补救
+    },
+    # 快速：降低分辨率与布局输入尺寸、关闭方向分类，以召回换速度，需请求显式指定
+    "快速": {
+        "target_resolution": 960,
+        "high_resolution": 2048,
+        "target_char_px": ADAPTIVE_RESOLUTION_CONFIG["target_char_px"],
+        "layout_conf": 0.35,
+        "layout_iou": LAYOUT_CONFIG["iou_threshold"],
+        "layout_imgsz": 768,
+        "use_angle_cls": False,
+        "region_min_conf": 0.5,
+        "direct_min_conf": 0.25,
+        "min_text_regions": 1,
+        "fine": False
+    },
+    "精细": {
+        "target_resolution": 1536,
+        "high_resolution": 2560,
+        "target_char_px": ADAPTIVE_RESOLUTION_CONFIG["fine_target_char_px"],
+        "layout_conf": 0.22,
+        "layout_iou": LAYOUT_CONFIG["iou_threshold"],
+        "layout_imgsz": 1024,
+        "use_angle_cls": True,
+        "region_min_conf": 0.3,
+        "direct_min_conf": 0.12,
+        "min_text_regions": 2,
+        "fine": True
+    }
+}
+
+# 空白页/图片页预筛：布局检测与OCR之前按文字层与灰度缩略图统计跳过无需识别的页面
+PAGE_FILTER_CONFIG = {
+    "enabled": True,
+    "thumbnail_size": 256,          # 缩略图长边像素
+    "min_text_chars": 20,           # 文字层字符数不少于该值的页面直接按正文页处理
+    "blank_ink_ratio": 0.001,       # 空白页：墨迹像素比例上限
+    "blank_edge_density": 0.001,    # 空白页：边缘像素比例上限
+    "blank_std": 8.0,               # 空白页：灰度标准差上限
+    "image_coverage": 0.85,         # 图片页：单张图片覆盖页面的最小比例
+    "image_min_ink_ratio": 0.2,     # 图片页：墨迹像素比例下限（照片铺满页面）
+    "image_max_edge_density": 0.05, # 图片页：边缘像素比例上限（扫描正文页边缘密集）
+    "skip_image_only": True         # 图片页跳过识别，只导出整页图片；False 时按正文页处理
+}
+
+# 大文档流式处理：页数达到阈值的PDF按页窗口处理，逐页结果写入任务输出目录的 pages.jsonl，
+# 不在内存中累积整篇结果；写结果库与返回响应时从该文件逐页读回、增量组装，峰值内存与页数无关
+STREAMING_CONFIG = {
+    "enabled": True,
+    "min_pages": 200,               # 达到该页数的PDF使用流式处理
+    "window_pages": 16,             # 每个窗口的页数，窗口结束时释放页面渲染图、直扫结果与MuPDF资源缓存
+    "chunk_bytes": 256 * 1024       # 增量组装时每次输出（写入/压缩/发送）的字节数
+}
+
+# 图片感知哈希（近似重复图片检测）：相似度 = 1 - 汉明距离/64，阈值取 IMAGE_CONFIG["similarity_threshold"]
+IMAGE_HASH_CONFIG = {
+    "method": "phash",                # phash（DCT低频，对缩放/压缩更稳定）或 dhash（更快）
+    "corpus_index": False,            # 启用全库索引：跨研报识别重复出现的图片（Logo、重复图表）
+    "index_path": str(BASE_DIR / "cache" / "image_hashes.jsonl")
 }
 
 # 向量化配置
@@ -129,3 +221,118 @@ REMOTE_OCR_CONFIG = {
     "retry_times": 3,
     "fallback_to_local": True
 }
+
+# 跨文档页面OCR缓存（免责声明、分析师声明、评级说明等重复页面直接复用识别结果）
+PAGE_CACHE_CONFIG = {
+    "enabled": True,
+    "cache_dir": str(BASE_DIR / "cache" / "pages"),
+    "max_entries": 5000,              # 最多缓存页数
+    "max_bytes": 200 * 1024 * 1024,   # 缓存总大小上限（所有推理进程合计），超出按LRU淘汰
+    "low_water": 0.9                  # 超出上限时淘汰到上限的该比例，缓存满后不必每页都扫描目录
+}
+
+# 文档结果缓存（按上传内容SHA-256 + 处理类型 + 模式寻址，重复上传直接返回）
+RESULT_CACHE_CONFIG = {
+    "enabled": True,
+    "cache_dir": str(BASE_DIR / "cache" / "results"),
+    "ttl_seconds": 24 * 3600,         # 结果保留时间
+    "max_entries": 2000,
+    "max_bytes": 2 * 1024 * 1024 * 1024,
+    "low_water": 0.9                  # 超出上限时淘汰到上限的该比例，缓存满后不必每次写入都扫描目录
+}
+
+# 推理进程配置：HTTP前端不加载模型，由推理进程各自持有一个OCR引擎
+WORKER_CONFIG = {
+    "inference_workers": int(os.environ.get("OCR_INFERENCE_WORKERS", "1")),  # 推理进程数（每个进程加载一份模型）
+    "use_gpu": os.environ.get("OCR_USE_GPU", "1") != "0",                     # 设为0可在纯CPU环境运行/测试
+    # 每个推理进程内并发处理的任务数：默认1，一个进程同一时刻只处理一个任务、独占本进程的OCR引擎；
+    # 大于1为显式启用进程内并发（多个任务共享同一引擎，检测/布局推理经引擎锁串行，识别经微批调度合批）
+    "task_threads": int(os.environ.get("OCR_TASK_THREADS", "1")),
+    "http_workers": 1,              # HTTP前端为异步单进程即可，推理不阻塞事件循环
+    "start_timeout": 600,           # 等待推理进程加载模型的超时（秒）
+    "default_mode": "标准"           # 请求未指定时的处理模式（PROCESSING_PROFILES 的名称）
+}
+
+# 准入控制：并发处理上限 + 有界等待队列，超出返回429（Retry-After按排队深度与平均处理时间估算）
+ADMISSION_CONFIG = {
+    "max_inflight": None,             # 同时提交到推理进程池的任务数，None时为 推理进程数 × task_threads
+    "max_queue": 32,                  # 等待中的任务数上限
+    "initial_service_seconds": 30     # 尚无统计时假定的单任务处理时间
+}
+
+# 启动配置：离线校验模型、并行加载、可配置的预热（均使用内存中的合成页面，不访问网络、不写临时文件）
+STARTUP_CONFIG = {
+    "offline": True,                          # 本地不存在 yolov8n.pt 时不尝试从网络下载
+    "parallel_load": True,                    # PaddleOCR 与布局模型并行加载
+    "warmup": True,
+    "warmup_shapes": [[48, 320], [1024, 768]],  # 预热图像尺寸 [高, 宽]：文本行切片与整页
+    "warmup_iterations": 1
+}
+
+# 识别微批调度配置：汇聚并发请求的文本行切片批量识别
+BATCH_CONFIG = {
+    "enabled": True,
+    "max_batch_size": 32,     # 单批最大文本行数（配合 rec_batch_num 使用）
+    "max_wait_ms": 5          # 批次最长等待时间，越大吞吐越高、单请求延迟越大
+}
+
+# 异步任务配置（/jobs 接口）
+JOB_CONFIG = {
+    "retention_seconds": 3600,   # 已完成任务的保留时间
+    "max_jobs": 10000,           # 内存中最多保留的任务数
+    # 内存中保留的异步任务结果总字节数上限（结果已写入结果缓存时只保留缓存键，不计入）；
+    # 超出时丢弃最早完成的结果，此后获取结果返回410
+    "max_result_bytes": 64 * 1024 * 1024
+}
+
+# 上传配置：分块流式落盘，超过大小上限直接返回413
+UPLOAD_CONFIG = {
+    "max_bytes": int(os.environ.get("OCR_MAX_UPLOAD_MB", "512")) * 1024 * 1024,  # 单个上传文件大小上限
+    "chunk_size": 1024 * 1024,    # 落盘块大小，单请求内存峰值约为一个块
+    "spool_dir": None,            # 上传落盘目录，None时使用系统临时目录
+    "use_tmpfs": False,           # 为True且spool_dir未设置时使用 /dev/shm（内存盘，注意容量）
+    "batch_max_files": 1000,                    # 批量接口单次最多文件数（含归档内文件）；整批准入，另受 并发上限+队列上限 限制（超出返回413）
+    "batch_max_bytes": 2 * 1024 * 1024 * 1024   # 批量接口单次总大小上限（归档按解压后计算）
+}
+
+# 上传文件存储（HEAD/PUT /blobs/{sha256}）：服务器已有相同内容时客户端跳过上传，处理请求以哈希引用
+BLOB_CONFIG = {
+    "enabled": True,
+    "blob_dir": str(BASE_DIR / "cache" / "blobs"),   # 与落盘目录同一文件系统时以硬链接保存，不额外占用空间
+    "max_entries": 5000,
+    "max_bytes": 20 * 1024 * 1024 * 1024,
+    "low_water": 0.9                  # 超出上限时淘汰到上限的该比例
+}
+
+# 响应编码配置：按 Accept-Encoding 压缩（zstd优先，其次gzip），可选msgpack二进制编码
+RESPONSE_CONFIG = {
+    "compress_min_bytes": 1024,   # 小于该大小的响应不压缩
+    "gzip_level": 6,
+    "zstd_level": 3
+}
+
+# 任务工作目录：每个任务独立目录（名称加随机后缀），结束后只保留结果引用的图表裁剪等产物
+WORKSPACE_CONFIG = {
+    "use_tmpfs": False,                       # 页面渲染等中间文件写入内存盘，保留的产物再移回 OUTPUT_DIR
+    "tmpfs_dir": "/dev/shm/ocr_work",
+    "gc_interval_seconds": 3600,              # 服务端后台回收间隔，0 表示不回收
+    "gc_max_age_days": 7,                     # output/、pickles/ 中超过该天数的条目删除（应长于结果缓存保留时间）
+    "gc_max_bytes": 20 * 1024 * 1024 * 1024,  # 每个目录的容量上限，超出按最旧优先删除
+    "gc_min_age_seconds": 3600                # 短于该时间的条目可能属于处理中的任务，不删除
+}
+
+# 结果库：取代逐文档pickle，结果以zstd压缩的JSONL追加写入数据段，清单记录 id/哈希/页数/偏移
+# 旧pickle可用 python migrate_pickles.py 导入
+RESULT_STORE_CONFIG = {
+    "enabled": True,
+    "root": str(BASE_DIR / "results"),
+    "codec": "zstd",                          # zstd（未安装 zstandard 时自动使用 gzip）或 gzip
+    "level": 3,
+    "segment_max_bytes": 256 * 1024 * 1024    # 单个数据段上限，超过后换新段
+}
+
+# 报告更新时按页差异重处理：PDF结果记录每页内容哈希（内容流与所引用图片/XObject的数据），
+# 同名文档以同一模式重新处理时，哈希未变的页面直接复用结果库中上一版本的结果，只识别变化或新增的页面
+PAGE_DIFF_CONFIG = {
+    "enabled": True
+}
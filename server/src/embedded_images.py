@@ -0,0 +1,137 @@
+"""
+PDF嵌入图片提取 - 直接导出图表的原始图片数据，不再渲染整页后裁剪
+
+研报中的图表多数是嵌入的图片XObject。布局检测给出的图表区域（标准分辨率像素坐标）
+换算到PDF页面坐标后与图片的放置位置匹配，匹配成功则经xref无损导出原始数据；
+同一xref只导出一次，不同xref但内容相同（摘要一致）的图片复用同一文件。
+未匹配到嵌入图片的区域（矢量图表）仍由调用方渲染裁剪。
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fitz
+from loguru import logger
+
+from .region_merge import iou
+
+# 可直接写出原始数据的格式（其余格式经Pixmap转为PNG）
+_RAW_FORMATS = {'png': 'png', 'jpeg': 'jpg', 'jpg': 'jpg'}
+
+
+def page_to_pixel_scale(page, target_size: int) -> float:
+    """页面按长边 target_size 渲染时的缩放比例（与页面图像生成一致）"""
+    return target_size / max(page.rect.width, page.rect.height)
+
+
+class EmbeddedImageExtractor:
+    """单个PDF文档的嵌入图片提取器，按xref与内容摘要去重"""
+
+    def __init__(self, doc, output_path: Path, min_iou: float = 0.7, min_side: int = 32):
+        """
+        Args:
+            doc: 已打开的 fitz 文档
+            output_path: 图片输出目录
+            min_iou: 图表区域与图片放置位置的IoU不低于该值才视为同一图片
+            min_side: 原始图片宽或高小于该像素数时不导出（图标、线条等）
+        """
+        self.doc = doc
+        self.output_path = Path(output_path)
+        self.min_iou = min_iou
+        self.min_side = min_side
+        self._placements: Dict[int, List[Tuple[int, fitz.Rect]]] = {}
+        self._by_xref: Dict[int, Optional[str]] = {}
+        self._by_digest: Dict[str, str] = {}
+        self.stats = {'extracted': 0, 'reused': 0, 'bytes': 0}
+
+    def placements(self, page) -> List[Tuple[int, fitz.Rect]]:
+        """页面上未旋转的图片放置位置 [(xref, 页面坐标矩形), ...]"""
+        if page.number not in self._placements:
+            found = []
+            try:
+                for item in page.get_images(full=True):
+                    xref = item[0]
+                    for rect, matrix in page.get_image_rects(xref, transform=True):
+                        # 旋转/翻转放置的图片原始数据与页面显示不一致，交给渲染裁剪
+                        if abs(matrix.b) > 1e-3 or abs(matrix.c) > 1e-3 or matrix.a <= 0 or matrix.d <= 0:
+                            continue
+                        rect = rect & page.rect
+                        if not rect.is_empty:
+                            found.append((xref, rect))
+            except Exception as e:
+                logger.warning(f"读取第{page.number + 1}页嵌入图片失败: {e}")
+            self._placements[page.number] = found
+        return self._placements[page.number]
+
+    def match(self, page, rect: fitz.Rect) -> Optional[int]:
+        """返回与页面区域 rect 最吻合的嵌入图片xref"""
+        if page.rotation:
+            return None
+        box = [rect.x0, rect.y0, rect.x1, rect.y1]
+        best, best_iou = None, self.min_iou
+        for xref, placed in self.placements(page):
+            overlap = iou(box, [placed.x0, placed.y0, placed.x1, placed.y1])
+            if overlap >= best_iou:
+                best, best_iou = xref, overlap
+        return best
+
+    def extract(self, xref: int, name: str) -> Optional[str]:
+        """导出xref对应的图片，返回文件路径；已导出或内容相同时复用"""
+        if xref in self._by_xref:
+            if self._by_xref[xref]:
+                self.stats['reused'] += 1
+            return self._by_xref[xref]
+        path = None
+        try:
+            data, ext = self._image_bytes(xref)
+            if data:
+                digest = hashlib.sha1(data).hexdigest()
+                path = self._by_digest.get(digest)
+                if path:
+                    self.stats['reused'] += 1
+                else:
+                    target = self.output_path / f"{name}_x{xref}.{ext}"
+                    target.write_bytes(data)
+                    path = self._by_digest[digest] = str(target)
+                    self.stats['extracted'] += 1
+                    self.stats['bytes'] += len(data)
+        except Exception as e:
+            logger.warning(f"导出嵌入图片失败(xref={xref}): {e}")
+        self._by_xref[xref] = path
+        return path
+
+    def _image_bytes(self, xref: int) -> Tuple[Optional[bytes], str]:
+        info = self.doc.extract_image(xref)
+        if not info or min(info.get('width', 0), info.get('height', 0)) < self.min_side:
+            return None, ''
+        ext = _RAW_FORMATS.get(info.get('ext', ''))
+        if ext and not info.get('smask') and info.get('colorspace', 3) in (1, 3):
+            return info['image'], ext
+        # 带透明蒙版、CMYK 或 JPX/JBIG2 等格式：转为RGB(A) PNG
+        pix = fitz.Pixmap(self.doc, xref)
+        if pix.colorspace and pix.colorspace.n > 3:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        if info.get('smask'):
+            pix = fitz.Pixmap(pix, fitz.Pixmap(self.doc, info['smask']))
+        return pix.tobytes('png'), 'png'
+
+    def extract_region(self, page, bbox: List[float], scale: float, name: str) -> Optional[str]:
+        """
+        按图表区域导出嵌入图片
+
+        Args:
+            page: fitz 页面
+            bbox: 区域像素坐标 [x1, y1, x2, y2]（页面按 scale 渲染的图像上）
+            scale: 页面坐标到像素坐标的缩放比例
+            name: 文件名前缀
+
+        Returns:
+            图片路径；区域不是单张嵌入图片（矢量图表等）时返回None
+        """
+        origin = page.rect.tl
+        rect = fitz.Rect(bbox[0] / scale, bbox[1] / scale, bbox[2] / scale, bbox[3] / scale) + (origin.x, origin.y, origin.x, origin.y)
+        xref = self.match(page, rect)
+        if xref is None:
+            return None
+        return self.extract(xref, name)
@@ -0,0 +1,214 @@
+"""
+图像感知哈希索引 - 近似重复图片（Logo、免责声明图、重复图表）检测
+
+每张图片只解码一次，计算64位 pHash（DCT低频）或 dHash（相邻像素梯度）；
+相似度定义为 1 - 汉明距离/64。哈希存入 BK 树，按汉明半径查询只需访问少数节点，
+n 张图片的去重接近线性，而不是两两比较的 O(n²) 次解码。
+可选的全库索引以JSONL追加写入磁盘，多个推理进程共享，跨研报识别重复出现的图片。
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from .config import IMAGE_HASH_CONFIG
+
+HASH_BITS = 64
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def similarity_to_radius(similarity: float) -> int:
+    """相似度阈值换算为汉明半径（相似度 = 1 - 距离/64）"""
+    return max(0, int((1.0 - similarity) * HASH_BITS))
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int(''.join('1' if b else '0' for b in bits.ravel()), 2)
+
+
+def dhash(gray: np.ndarray) -> int:
+    """差值哈希：缩小到 9x8，比较水平相邻像素"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray: np.ndarray) -> int:
+    """感知哈希：缩小到 32x32 做DCT，取左上 8x8 低频系数与其中位数比较"""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    # 中位数不含直流分量
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+_METHODS = {'phash': phash, 'dhash': dhash}
+
+
+def image_hash(image_path: str, method: str = 'phash') -> Optional[int]:
+    """读取图片（支持非ASCII路径）并计算哈希，无法解码时返回None"""
+    try:
+        data = np.fromfile(str(image_path), dtype=np.uint8)
+        gray = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取图片失败: {image_path}: {e}")
+        return None
+    if gray is None or gray.size == 0:
+        return None
+    return _METHODS[method](gray)
+
+
+class BKTree:
+    """以汉明距离为度量的BK树"""
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash, [values], {distance: child}]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value_hash: int, value: Any):
+        self._size += 1
+        if self._root is None:
+            self._root = [value_hash, [value], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value_hash, node[0])
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value_hash, [value], {}]
+                return
+            node = child
+
+    def find(self, value_hash: int, radius: int) -> List[Tuple[int, Any]]:
+        """返回汉明距离不超过 radius 的 [(距离, 值), ...]，按距离升序"""
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value_hash, node[0])
+            if distance <= radius:
+                matches.extend((distance, value) for value in node[1])
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        matches.sort(key=lambda m: m[0])
+        return matches
+
+
+class ImageHashIndex:
+    """持久化的全库图片哈希索引（JSONL追加写入，读取时增量加载其他进程写入的条目）"""
+
+    def __init__(self, index_path: str, method: str = 'phash'):
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.method = method
+        self._tree = BKTree()
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    def _refresh(self):
+        """加载文件中尚未读取的条目"""
+        try:
+            if self.index_path.stat().st_size <= self._offset:
+                return
+        except OSError:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # 其他进程正在写入的行，下次再读
+                self._offset += len(raw)
+                try:
+                    entry = json.loads(raw)
+                    self._tree.add(int(entry['hash'], 16), entry.get('ref'))
+                except (ValueError, KeyError) as e:
+                    logger.debug(f"跳过损坏的图片哈希条目: {e}")
+
+    def find(self, value_hash: int, radius: int) -> List[Tuple[int, Any]]:
+        with self._lock:
+            self._refresh()
+            return self._tree.find(value_hash, radius)
+
+    def add(self, value_hash: int, ref: Any):
+        line = json.dumps({'hash': f"{value_hash:016x}", 'ref': ref}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._refresh()
+            with open(self.index_path, 'ab') as f:
+                f.write(line.encode('utf-8'))
+            self._offset += len(line.encode('utf-8'))
+            self._tree.add(value_hash, ref)
+
+
+def find_similar_images(image_paths: Iterable[str], radius: int, method: str = 'phash',
+                        index: Optional[ImageHashIndex] = None) -> Dict[str, Dict]:
+    """
+    找出近似重复的图片
+
+    Args:
+        image_paths: 图片路径（按顺序处理，先出现的作为保留的原图）
+        radius: 汉明半径
+        index: 全库索引（可选）；提供时也与此前其他研报中的图片比较，并登记本批保留的图片
+
+    Returns:
+        {重复图片路径: {'duplicate_of': 原图路径或全库索引中的引用, 'distance': 汉明距离, 'corpus': 是否来自全库索引}}
+
+    每张图片的哈希在检查下一张之前都登记到本批的BK树：保留的图片与只和全库相似的图片（不删除）
+    以自身路径登记，本批内的重复以其保留的原图登记。与全库图片相似的图片在本批内的后续副本
+    因此按本地重复识别，近似重复链上的图片都指向同一张保留的原图。
+    """
+    tree = BKTree()
+    duplicates: Dict[str, Dict] = {}
+    for path in image_paths:
+        path = str(path)
+        value_hash = image_hash(path, method)
+        if value_hash is None:
+            continue
+        local = tree.find(value_hash, radius)
+        if local:
+            distance, original = local[0]
+            duplicates[path] = {'duplicate_of': original, 'distance': distance, 'corpus': False}
+            tree.add(value_hash, original)
+            continue
+        if index is not None:
+            corpus = index.find(value_hash, radius)
+            if corpus:
+                distance, ref = corpus[0]
+                duplicates[path] = {'duplicate_of': ref, 'distance': distance, 'corpus': True}
+            else:
+                index.add(value_hash, path)
+        tree.add(value_hash, path)
+    return duplicates
+
+
+_index: Optional[ImageHashIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_image_hash_index() -> Optional[ImageHashIndex]:
+    """获取进程内共享的全库图片哈希索引，未启用时返回None"""
+    global _index
+    if not IMAGE_HASH_CONFIG.get("corpus_index", False):
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = ImageHashIndex(IMAGE_HASH_CONFIG["index_path"], IMAGE_HASH_CONFIG.get("method", "phash"))
+        return _index
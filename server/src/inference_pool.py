@@ -0,0 +1,398 @@
+"""
+推理进程池 - HTTP前端不加载任何模型，OCR/布局推理全部在独立进程中执行
+
+每个推理进程只持有一个OCREngine（以及基于它的PDF/PPT/Office处理器），
+顺序处理本地队列中的任务，避免多线程共享引擎和全局配置带来的竞争；
+吞吐随进程数扩展，显存/内存占用可预期（进程数 x 单份模型）。
+"""
+
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from .metrics import collect_stages
+from .processing_profile import get_profile
+
+DEFAULT_FACTORY = "src.inference_pool:build_processors"
+
+
+def probe_gpu_info() -> Dict:
+    """GPU 信息探测（在推理进程中执行，避免前端导入torch/paddle）"""
+    info = {
+        "torch": {"available": False, "device_count": 0, "devices": []},
+        "paddle": {"compiled_with_cuda": False, "device": "unknown"},
+        "opencv": {"cuda_device_count": 0}
+    }
+    try:
+        import torch
+        info["torch"]["available"] = bool(torch.cuda.is_available())
+        if info["torch"]["available"]:
+            count = torch.cuda.device_count()
+            info["torch"]["device_count"] = count
+            info["torch"]["devices"] = [torch.cuda.get_device_name(i) for i in range(count)]
+    except Exception as e:
+        info["torch"]["error"] = str(e)
+    try:
+        import paddle
+        info["paddle"]["compiled_with_cuda"] = bool(paddle.device.is_compiled_with_cuda())
+        try:
+            info["paddle"]["device"] = paddle.device.get_device()
+        except Exception:
+            pass
+    except Exception as e:
+        info["paddle"]["error"] = str(e)
+    try:
+        import cv2
+        cnt = 0
+        try:
+            cnt = int(cv2.cuda.getCudaEnabledDeviceCount())
+        except Exception:
+            cnt = 0
+        info["opencv"]["cuda_device_count"] = cnt
+    except Exception as e:
+        info["opencv"]["error"] = str(e)
+    return info
+
+
+def build_processors(use_gpu: bool) -> Dict[str, Any]:
+    """在推理进程内创建OCR引擎及各处理器（每个进程恰好一个引擎），记录启动耗时分解"""
+    started = time.perf_counter()
+    from .ocr_engine import OCREngine
+    from .pdf_processor import PDFProcessor
+    from .ppt_processor import PPTProcessor
+    from .office_processor import OfficeProcessor
+    timings = {'imports': round(time.perf_counter() - started, 3)}
+
+    engine = OCREngine(use_gpu=use_gpu)
+    timings.update(engine.startup_timings)
+    timings['engine'] = round(time.perf_counter() - started - timings['imports'], 3)
+
+    processors_started = time.perf_counter()
+    processors = {
+        'engine': engine,
+        'pdf': PDFProcessor(ocr_engine=engine),
+        'ppt': PPTProcessor(ocr_engine=engine),
+        'office': OfficeProcessor(use_gpu=False)
+    }
+    timings['processors'] = round(time.perf_counter() - processors_started, 3)
+
+    warmup_started = time.perf_counter()
+    warmup_timings = warmup(processors)
+    timings['warmup'] = round(time.perf_counter() - warmup_started, 3)
+    if warmup_timings:
+        timings['warmup_shapes'] = warmup_timings
+    timings['total'] = round(time.perf_counter() - started, 3)
+    processors['startup'] = timings
+    logger.info(f"推理进程启动耗时分解(秒): {timings}")
+    return processors
+
+
+def warmup(processors: Dict[str, Any]) -> Dict[str, float]:
+    """
+    用内存中的合成页面预热（尺寸与次数见 STARTUP_CONFIG），触发 CUDA/Paddle/Torch 的内核与显存缓存
+
+    Returns:
+        引擎报告的各尺寸预热耗时 {"高x宽": 秒}；未启用或失败时为空
+    """
+    from .config import STARTUP_CONFIG
+
+    engine = processors.get('engine')
+    if engine is None or not STARTUP_CONFIG.get("warmup", True):
+        return {}
+    try:
+        timings = engine.warmup(STARTUP_CONFIG.get("warmup_shapes"), STARTUP_CONFIG.get("warmup_iterations", 1))
+        logger.info(f"OCR 引擎 warmup 完成: {timings}")
+        return dict(timings or {})
+    except Exception as e:
+        logger.warning(f"warmup 失败（不影响服务可用）: {e}")
+        return {}
+
+
+def run_task(processors: Dict[str, Any], kind: str, args: Dict,
+             progress: Optional[Callable[[Dict], None]] = None) -> Any:
+    """在推理进程内执行一个任务，progress 用于回报阶段与页级进度"""
+    # 同一进程的多个任务线程共享处理器与引擎，模式以不可变配置档逐次传入，不调用 set_mode 修改共享状态
+    profile = get_profile(args.get('mode'))
+    if kind == 'pdf':
+        return processors['pdf'].process_pdf(args['path'], args.get('filename'), progress_callback=progress,
+                                             streaming=True, profile=profile)
+    if kind == 'ppt':
+        return processors['ppt'].process_ppt(args['path'], args.get('filename'), profile=profile)
+    if kind == 'office':
+        # Office 文档直接读取文字内容，不经过OCR，不使用模式
+        return processors['office'].process_office_document(args['path'], args.get('filename'))
+    if kind == 'image':
+        return processors['engine'].extract_text_direct(args['path'], profile=profile)
+    raise ValueError(f"不支持的任务类型: {kind}")
+
+
+def collect_stats(processors: Dict[str, Any]) -> Dict:
+    """推理进程运行时统计（识别微批调度等）"""
+    stats = {}
+    engine = processors.get('engine')
+    batcher = getattr(engine, 'batcher', None)
+    if batcher is not None:
+        stats['batcher'] = batcher.stats()
+    return stats
+
+
+def _resolve(path: str) -> Callable:
+    module_name, _, attr = path.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _worker_main(worker_id: int, task_queue, result_queue, use_gpu: bool, factory_path: str,
+                 runner_path: str, task_threads: int = 1):
+    """推理进程主循环：task_threads 个线程并发取任务，共享本进程唯一的OCR引擎"""
+    started = time.perf_counter()
+    try:
+        processors = _resolve(factory_path)(use_gpu)
+        runner = _resolve(runner_path)
+        gpu_info = probe_gpu_info() if use_gpu else {}
+    except Exception as e:
+        result_queue.put(('failed', worker_id, str(e)))
+        return
+    startup = dict(processors.get('startup') or {}) if isinstance(processors, dict) else {}
+    startup['ready'] = round(time.perf_counter() - started, 3)
+    result_queue.put(('ready', worker_id, {'gpu_info': gpu_info, 'startup': startup}))
+
+    def loop():
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            task_id, kind, args = task
+            result_queue.put(('start', task_id, worker_id))
+            progress = lambda info, _task_id=task_id: result_queue.put(('progress', _task_id, info))
+            try:
+                with collect_stages() as stages:
+                    result = runner(processors, kind, args, progress)
+                result_queue.put(('stages', task_id, stages))
+                result_queue.put(('done', task_id, result))
+            except Exception as e:
+                result_queue.put(('error', task_id, f"{type(e).__name__}: {e}"))
+            try:
+                result_queue.put(('stats', worker_id, collect_stats(processors)))
+            except Exception:
+                pass
+
+    threads = [
+        threading.Thread(target=loop, name=f"inference-task-{i}", daemon=True)
+        for i in range(max(1, task_threads))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class InferencePool:
+    """推理进程池：前端提交任务，推理进程通过本地队列取任务并回传结果"""
+
+    def __init__(self, num_workers: int = 1, use_gpu: bool = True,
+                 factory: str = DEFAULT_FACTORY, runner: str = "src.inference_pool:run_task",
+                 task_threads: int = 1):
+        self.num_workers = max(1, int(num_workers))
+        self.task_threads = max(1, int(task_threads))
+        self.use_gpu = use_gpu
+        self.factory = factory
+        self.runner = runner
+        self.gpu_info: Dict = {}
+        self._ctx = multiprocessing.get_context('spawn')
+        self._tasks = None
+        self._results = None
+        self._processes: Dict[int, Any] = {}
+        self._ready = set()
+        self._failed: Dict[int, str] = {}
+        self._worker_stats: Dict[int, Dict] = {}
+        self._startup: Dict[int, Dict] = {}
+        self._futures: Dict[int, Future] = {}
+        self._progress: Dict[int, Callable[[Dict], None]] = {}
+        self._stages: Dict[int, tuple] = {}  # task_id -> (阶段耗时dict, 提交时间)
+        self._running: Dict[int, int] = {}  # task_id -> worker_id
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._stopping = False
+        self._listener: Optional[threading.Thread] = None
+        self._monitor: Optional[threading.Thread] = None
+
+    def start(self):
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+        self._listener = threading.Thread(target=self._listen, name="inference-pool-listener", daemon=True)
+        self._listener.start()
+        self._monitor = threading.Thread(target=self._watch, name="inference-pool-monitor", daemon=True)
+        self._monitor.start()
+        logger.info(f"推理进程池启动: {self.num_workers} 个进程, GPU={'开启' if self.use_gpu else '关闭'}")
+
+    def _spawn(self, worker_id: int):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._tasks, self._results, self.use_gpu, self.factory, self.runner,
+                  self.task_threads),
+            name=f"ocr-inference-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """等待所有推理进程完成模型加载"""
+        self._ready_event.wait(timeout)
+        return self._ready_event.is_set() and not self._failed
+
+    def _listen(self):
+        while True:
+            try:
+                kind, key, payload = self._results.get()
+            except (EOFError, OSError):
+                break
+            if kind == 'stop':
+                break
+            if kind == 'ready':
+                with self._lock:
+                    self._ready.add(key)
+                    self.gpu_info = payload.get('gpu_info') or self.gpu_info
+                    self._startup[key] = payload.get('startup', {})
+                logger.info(f"推理进程 {key} 就绪，启动耗时(秒): {payload.get('startup', {})}")
+            elif kind == 'failed':
+                with self._lock:
+                    self._failed[key] = payload
+                logger.error(f"推理进程 {key} 初始化失败: {payload}")
+            elif kind == 'stats':
+                with self._lock:
+                    self._worker_stats[key] = payload
+                continue
+            elif kind == 'start':
+                with self._lock:
+                    self._running[key] = payload
+                    stages, submitted = self._stages.get(key, (None, None))
+                if stages is not None:
+                    stages['pool_wait'] = time.perf_counter() - submitted
+                self._notify(key, {'stage': 'processing', 'worker': payload})
+                continue
+            elif kind == 'progress':
+                self._notify(key, payload)
+                continue
+            elif kind == 'stages':
+                with self._lock:
+                    stages, _ = self._stages.get(key, (None, None))
+                if stages is not None:
+                    stages.update(payload)
+                continue
+            elif kind in ('done', 'error'):
+                with self._lock:
+                    future = self._futures.pop(key, None)
+                    self._running.pop(key, None)
+                    self._progress.pop(key, None)
+                    self._stages.pop(key, None)
+                if future is not None and not future.done():
+                    if kind == 'done':
+                        future.set_result(payload)
+                    else:
+                        future.set_exception(RuntimeError(payload))
+                continue
+            if len(self._ready) + len(self._failed) >= self.num_workers:
+                self._ready_event.set()
+
+    def _notify(self, task_id: int, info: Dict):
+        callback = self._progress.get(task_id)
+        if callback is None:
+            return
+        try:
+            callback(info)
+        except Exception as e:
+            logger.warning(f"任务进度回调失败: {e}")
+
+    def _watch(self):
+        """监控推理进程，异常退出时使其正在处理的任务失败并重启进程"""
+        while not self._stopping:
+            time.sleep(1.0)
+            for worker_id, process in list(self._processes.items()):
+                if self._stopping or process.is_alive() or worker_id in self._failed:
+                    continue
+                logger.error(f"推理进程 {worker_id} 异常退出(exitcode={process.exitcode})，正在重启")
+                with self._lock:
+                    self._ready.discard(worker_id)
+                    lost = [tid for tid, wid in self._running.items() if wid == worker_id]
+                    futures = [self._futures.pop(tid, None) for tid in lost]
+                    for tid in lost:
+                        self._running.pop(tid, None)
+                        self._progress.pop(tid, None)
+                        self._stages.pop(tid, None)
+                for future in futures:
+                    if future is not None and not future.done():
+                        future.set_exception(RuntimeError("推理进程异常退出"))
+                self._spawn(worker_id)
+
+    def submit(self, kind: str, args: Dict, on_progress: Optional[Callable[[Dict], None]] = None,
+               stages: Optional[Dict[str, float]] = None) -> Future:
+        """
+        提交任务，返回 concurrent.futures.Future
+        
+        Args:
+            kind: 任务类型（pdf/ppt/office/image）
+            args: 任务参数（文件路径、文件名、模式等）
+            on_progress: 进度回调，在监听线程中调用
+            stages: 可选，任务完成前填入各阶段耗时（秒），含进程池排队时间 pool_wait
+        """
+        if self._tasks is None:
+            raise RuntimeError("推理进程池未启动")
+        future = Future()
+        task_id = next(self._ids)
+        with self._lock:
+            self._futures[task_id] = future
+            if on_progress is not None:
+                self._progress[task_id] = on_progress
+            if stages is not None:
+                self._stages[task_id] = (stages, time.perf_counter())
+        self._tasks.put((task_id, kind, args))
+        return future
+
+    async def run(self, kind: str, args: Dict, on_progress: Optional[Callable[[Dict], None]] = None,
+                  stages: Optional[Dict[str, float]] = None) -> Any:
+        """在事件循环中等待任务结果"""
+        return await asyncio.wrap_future(self.submit(kind, args, on_progress, stages))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': self.num_workers,
+                'ready': len(self._ready),
+                'failed': dict(self._failed),
+                'alive': sum(1 for p in self._processes.values() if p.is_alive()),
+                'pending': len(self._futures) - len(self._running),
+                'running': len(self._running),
+                'task_threads': self.task_threads,
+                'startup': dict(self._startup),
+                'worker_stats': dict(self._worker_stats)
+            }
+
+    def shutdown(self, timeout: float = 10.0):
+        self._stopping = True
+        if self._tasks is None:
+            return
+        for _ in range(len(self._processes) * self.task_threads):
+            self._tasks.put(None)
+        for process in self._processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(('stop', None, None))
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError("推理进程池已关闭"))
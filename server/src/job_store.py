@@ -0,0 +1,187 @@
+"""
+异步任务存储 - 提交即返回任务ID，客户端轮询状态/进度并获取结果
+
+任务状态: queued -> running -> success / error
+完成的任务保留 retention_seconds 秒后清理。
+同步接口（/ocr/*、/batch）的任务完成即从存储中移除，结果直接交给等待的请求。
+异步任务（/jobs）的结果优先只记录结果缓存中的键，读取时从磁盘取回；
+没有缓存键的结果才保留在内存中，总大小超过 max_result_bytes 时丢弃最早完成的结果（任务状态仍保留）。
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+
+class JobStore:
+    """线程安全的任务状态与结果存储（进度由推理进程池的监听线程更新）"""
+
+    def __init__(self, retention_seconds: float = 3600, max_jobs: int = 10000,
+                 max_result_bytes: int = 64 * 1024 * 1024):
+        self.retention_seconds = retention_seconds
+        self.max_jobs = max_jobs
+        self.max_result_bytes = max_result_bytes
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # 内存中保留的结果：任务ID -> (结果, 估算字节数)，按完成顺序
+        self._results: Dict[str, tuple] = {}
+        self._result_bytes = 0
+        # 结果缓存中的键：任务ID -> 缓存键
+        self._result_keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def create(self, kind: str, filename: str, **extra) -> str:
+        """创建任务，返回任务ID"""
+        self.purge()
+        job_id = uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'kind': kind,
+                'filename': filename,
+                'status': 'queued',
+                'stage': 'queued',
+                'pages_done': 0,
+                'total_pages': None,
+                'created_at': now,
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+                **extra
+            }
+        return job_id
+
+    def progress(self, job_id: str, info: Dict):
+        """更新任务阶段与页级进度"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in ('success', 'error'):
+                return
+            stage = info.get('stage')
+            if stage:
+                job['stage'] = stage
+            if stage == 'processing' and job['started_at'] is None:
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+            if 'pages_done' in info:
+                job['pages_done'] = info['pages_done']
+            if 'total_pages' in info:
+                job['total_pages'] = info['total_pages']
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None,
+               result_key: Optional[str] = None, retain: bool = True) -> Optional[Dict]:
+        """
+        记录任务结果或错误
+
+        Args:
+            result_key: 结果已写入结果缓存时的键，提供时只保留该引用而不在内存中保留结果
+            retain: False 时任务完成即从存储中移除（同步接口，结果由返回值交给等待的请求）
+
+        Returns:
+            任务最终状态，含 'result'；任务不存在时返回None
+        """
+        if error is None and isinstance(result, dict) and result.get('status') == 'error':
+            error = result.get('message', '处理失败')
+        size = None
+        if retain and error is None and result_key is None:
+            size = _result_size(result)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job['finished_at'] = time.time()
+            job['stage'] = 'finished'
+            if error is not None:
+                job['status'] = 'error'
+                job['error'] = error
+            else:
+                job['status'] = 'success'
+                if isinstance(result, dict) and result.get('total_pages'):
+                    job['total_pages'] = result['total_pages']
+                    job['pages_done'] = result['total_pages']
+            final = {**job, 'result': result if error is None else None}
+            if not retain:
+                del self._jobs[job_id]
+            elif error is None:
+                if result_key is not None:
+                    self._result_keys[job_id] = result_key
+                else:
+                    self._keep_result(job_id, result, size)
+        return final
+
+    def _keep_result(self, job_id: str, result: Any, size: int):
+        """在内存中保留结果，超出字节上限时丢弃最早完成的结果（调用方持有锁）"""
+        self._results[job_id] = (result, size)
+        self._result_bytes += size
+        while self._result_bytes > self.max_result_bytes and self._results:
+            oldest = next(iter(self._results))
+            self._drop_result(oldest)
+            if oldest in self._jobs:
+                self._jobs[oldest]['result_expired'] = True
+
+    def _drop_result(self, job_id: str):
+        kept = self._results.pop(job_id, None)
+        if kept is not None:
+            self._result_bytes -= kept[1]
+        self._result_keys.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """任务状态（不含结果）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            status = dict(job)
+        total = status.get('total_pages')
+        status['progress'] = round(status['pages_done'] / total, 4) if total else (
+            1.0 if status['status'] == 'success' else 0.0
+        )
+        return status
+
+    def result(self, job_id: str) -> Any:
+        """内存中保留的结果，没有时返回None（结果只以缓存键引用时见 result_key）"""
+        with self._lock:
+            kept = self._results.get(job_id)
+            return kept[0] if kept else None
+
+    def result_key(self, job_id: str) -> Optional[str]:
+        """结果在结果缓存中的键，没有时返回None"""
+        with self._lock:
+            return self._result_keys.get(job_id)
+
+    def result_bytes(self) -> int:
+        """内存中保留的结果的估算总字节数"""
+        with self._lock:
+            return self._result_bytes
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return counts
+
+    def purge(self):
+        """清理过期的已完成任务；超出数量上限时优先清理最早完成的任务"""
+        now = time.time()
+        with self._lock:
+            finished = sorted(
+                (job['finished_at'], job_id) for job_id, job in self._jobs.items()
+                if job['finished_at'] is not None
+            )
+            overflow = len(self._jobs) - self.max_jobs
+            for finished_at, job_id in finished:
+                if now - finished_at > self.retention_seconds or overflow > 0:
+                    del self._jobs[job_id]
+                    self._drop_result(job_id)
+                    overflow -= 1
+
+
+def _result_size(result: Any) -> int:
+    """结果的估算内存大小（按JSON编码长度）"""
+    try:
+        return len(json.dumps(result, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,168 @@
+"""
+运行指标 - 推理进程内按阶段计时，HTTP前端汇总为 Prometheus 指标（GET /metrics）
+
+推理进程中 collect_stages() 为当前任务收集各阶段耗时（渲染、布局检测、文字识别、
+图表裁剪、结果保存），阶段可嵌套，只统计自身耗时（如直扫中的渲染不计入识别）；
+耗时随任务结果回传，由前端按 接口 + 模式 记入直方图。
+prometheus_client 未安装时所有记录为空操作，/metrics 返回503。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                                   generate_latest)
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+_local = threading.local()
+
+# 长文档单阶段可达数分钟
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    累计当前任务某阶段的耗时，可用作上下文管理器或装饰器
+
+    不在 collect_stages() 内（如离线脚本、预热）时不计时。
+    """
+    frames = getattr(_local, 'frames', None)
+    if frames is None:
+        yield
+        return
+    frame = [name, time.perf_counter(), 0.0]
+    frames.append(frame)
+    try:
+        yield
+    finally:
+        frames.pop()
+        elapsed = time.perf_counter() - frame[1]
+        timings = _local.timings
+        timings[name] = timings.get(name, 0.0) + elapsed - frame[2]
+        if frames:
+            frames[-1][2] += elapsed
+
+
+@contextmanager
+def collect_stages():
+    """在当前线程收集一个任务的阶段耗时，产出 {阶段: 秒}"""
+    previous = (getattr(_local, 'frames', None), getattr(_local, 'timings', None))
+    _local.frames, _local.timings = [], {}
+    try:
+        yield _local.timings
+    finally:
+        _local.frames, _local.timings = previous
+
+
+class ServerMetrics:
+    """HTTP前端的 Prometheus 指标（使用独立 registry，便于测试与多实例）"""
+
+    def __init__(self):
+        self.enabled = PROMETHEUS_AVAILABLE
+        if not self.enabled:
+            return
+        self.registry = CollectorRegistry()
+        self.request_seconds = Histogram(
+            'ocr_request_duration_seconds', 'HTTP请求总耗时', ['endpoint', 'method', 'status'],
+            buckets=_BUCKETS, registry=self.registry)
+        self.requests_in_flight = Gauge(
+            'ocr_requests_in_flight', '处理中的HTTP请求数', registry=self.registry)
+        self.job_seconds = Histogram(
+            'ocr_job_duration_seconds', '任务总耗时（含排队）', ['endpoint', 'kind', 'mode'],
+            buckets=_BUCKETS, registry=self.registry)
+        self.stage_seconds = Histogram(
+            'ocr_stage_duration_seconds', '任务各阶段耗时', ['stage', 'endpoint', 'mode'],
+            buckets=_BUCKETS, registry=self.registry)
+        self.pages = Counter(
+            'ocr_pages_processed_total', '处理的PDF页数', ['endpoint', 'mode'], registry=self.registry)
+        self.cache_hits = Counter(
+            'ocr_cache_hits_total', '缓存命中数', ['cache'], registry=self.registry)
+        self.errors = Counter(
+            'ocr_errors_total', '失败的任务数', ['endpoint', 'kind'], registry=self.registry)
+        self.jobs_in_flight = Gauge(
+            'ocr_jobs_in_flight', '占用并发槽位的任务数', registry=self.registry)
+        self.queue_depth = Gauge(
+            'ocr_queue_depth', '等待并发槽位的任务数', registry=self.registry)
+        self.workers_ready = Gauge(
+            'ocr_inference_workers_ready', '就绪的推理进程数', registry=self.registry)
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float):
+        if self.enabled:
+            self.request_seconds.labels(endpoint, method, str(status)).observe(seconds)
+
+    def track_request(self, delta: int):
+        if self.enabled:
+            self.requests_in_flight.inc(delta)
+
+    def observe_job(self, endpoint: str, kind: str, mode: Optional[str], seconds: float, result=None,
+                    stages: Optional[Dict[str, float]] = None, error: bool = False):
+        """记录一个任务：总耗时、阶段耗时、页数、页面缓存命中与失败（不使用模式的任务 mode 标签为 "-"）"""
+        if not self.enabled:
+            return
+        mode = mode or '-'
+        self.job_seconds.labels(endpoint, kind, mode).observe(seconds)
+        for name, value in (stages or {}).items():
+            self.stage_seconds.labels(name, endpoint, mode).observe(value)
+        if error or (isinstance(result, dict) and result.get('status') == 'error'):
+            self.errors.labels(endpoint, kind).inc()
+            return
+        if isinstance(result, dict):
+            if kind == 'pdf' and result.get('total_pages'):
+                self.pages.labels(endpoint, mode).inc(result['total_pages'])
+            page_hits = (result.get('page_cache') or {}).get('hits')
+            if page_hits:
+                self.cache_hits.labels('page').inc(page_hits)
+
+    def record_cache_hit(self, cache: str):
+        if self.enabled:
+            self.cache_hits.labels(cache).inc()
+
+    def render(self, admission_stats: Optional[Dict] = None, pool_stats: Optional[Dict] = None):
+        """生成 Prometheus 文本格式的响应"""
+        from fastapi.responses import Response
+        if not self.enabled:
+            return Response(content="prometheus_client未安装\n", status_code=503, media_type="text/plain")
+        if admission_stats:
+            self.jobs_in_flight.set(admission_stats.get('in_flight', 0))
+            self.queue_depth.set(admission_stats.get('queue_depth', 0))
+        if pool_stats:
+            self.workers_ready.set(pool_stats.get('ready', 0))
+        return Response(content=generate_latest(self.registry), media_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """ASGI中间件：按路由模板（如 /jobs/{job_id}）记录请求耗时与处理中请求数"""
+
+    def __init__(self, app, metrics: ServerMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled or scope.get("path") == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        self.metrics.track_request(1)
+
+        async def tracking_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, tracking_send)
+        finally:
+            self.metrics.track_request(-1)
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            self.metrics.observe_request(endpoint, scope.get("method", ""), status,
+                                         time.perf_counter() - started)
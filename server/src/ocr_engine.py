@@ -2,6 +2,10 @@
 OCR引擎 - 集成PaddleOCR和布局检测功能
 """
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
 from PIL import Image
@@ -9,10 +13,16 @@ from loguru import logger
 # 延迟导入 PaddleOCR，避免启动阶段卡顿
 PaddleOCR = None
 from ultralytics import YOLO
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
 from pathlib import Path
 
-from .config import OCR_CONFIG, LAYOUT_CONFIG, IMAGE_CONFIG
+from .config import OCR_CONFIG, LAYOUT_CONFIG, IMAGE_CONFIG, IMAGE_HASH_CONFIG, BATCH_CONFIG, STARTUP_CONFIG
+from .batch_scheduler import RecognitionBatcher
+from .block_layout import segment_blocks
+from .region_merge import normalize_regions
+from .image_hash import find_similar_images, get_image_hash_index, similarity_to_radius
+from .metrics import stage
+from .processing_profile import ProcessingProfile, get_profile
 
 
 class OCREngine:
@@ -27,28 +37,99 @@ class OCREngine:
         """
         self.use_gpu = use_gpu
         self.ocr = None
-        self._init_ocr()
-        self._init_layout_detector()
-        self.mode = "快速"
+        self.batcher = None
+        # PaddleOCR/YOLO 非线程安全：检测与布局推理串行执行，识别交给微批调度线程
+        self._infer_lock = threading.RLock()
+        self.startup_timings: Dict[str, float] = {}
+        # 未显式传入 profile 的调用使用的默认配置档；并发任务应逐次传入各自的 profile
+        self.profile = get_profile()
+        self._load_models()
+        if BATCH_CONFIG.get("enabled", False) and self.ocr is not None:
+            self.enable_batching(BATCH_CONFIG["max_batch_size"], BATCH_CONFIG["max_wait_ms"])
+
+    def _load_models(self):
+        """加载PaddleOCR与布局检测模型（两者互不依赖，默认并行加载），记录各自耗时"""
+        def timed(name: str, init: Callable[[], None]):
+            started = time.perf_counter()
+            init()
+            self.startup_timings[name] = round(time.perf_counter() - started, 3)
+        
+        if STARTUP_CONFIG.get("parallel_load", True):
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-load") as executor:
+                futures = [
+                    executor.submit(timed, 'paddleocr', self._init_ocr),
+                    executor.submit(timed, 'layout_model', self._init_layout_detector)
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            timed('paddleocr', self._init_ocr)
+            timed('layout_model', self._init_layout_detector)
+        logger.info(f"模型加载耗时: {self.startup_timings}")
+    
+    @staticmethod
+    def _synthetic_page(height: int = 640, width: int = 480) -> np.ndarray:
+        """内存中的合成页面（若干文字行 + 一个图块），用于模型校验与预热"""
+        page = np.full((height, width, 3), 255, dtype=np.uint8)
+        line_height = max(4, height // 40)
+        margin = max(2, width // 12)
+        for y in range(margin, int(height * 0.5), line_height * 2):
+            cv2.rectangle(page, (margin, y), (width - margin, y + line_height), (30, 30, 30), -1)
+        if height > 200:
+            cv2.rectangle(page, (margin, int(height * 0.6)), (width - margin, int(height * 0.9)), (150, 150, 150), -1)
+        return page
+    
+    def _validate_layout_model(self):
+        """在合成页面上推理一次，确认模型可用（离线，不依赖网络图片）"""
+        with self._infer_lock:
+            self.layout_model.predict(self._synthetic_page(), verbose=False)
+    
+    def _builtin_yolo(self):
+        """加载ultralytics通用权重yolov8n.pt；离线模式下本地没有该文件时不触发下载"""
+        if STARTUP_CONFIG.get("offline", True) and not Path("yolov8n.pt").exists():
+            raise FileNotFoundError("离线模式：本地不存在yolov8n.pt，跳过下载")
+        return YOLO("yolov8n.pt")
+    
+    def warmup(self, shapes: Optional[List[List[int]]] = None, iterations: int = 1) -> Dict[str, float]:
+        """
+        预热检测/识别/布局推理，触发 CUDA/Paddle/Torch 的内核选择与显存分配
+        
+        Args:
+            shapes: 预热图像尺寸列表 [[高, 宽], ...]
+            iterations: 每个尺寸的推理次数
+            
+        Returns:
+            {"高x宽": 耗时秒数}
+        """
+        timings = {}
+        for height, width in shapes or [[48, 320], [1024, 768]]:
+            image = self._synthetic_page(int(height), int(width))
+            started = time.perf_counter()
+            for _ in range(max(1, int(iterations))):
+                if self.ocr is not None:
+                    self._ocr_lines(image)
+                if self.layout_model is not None:
+                    with self._infer_lock:
+                        self.layout_model.predict(image, verbose=False)
+            timings[f"{height}x{width}"] = round(time.perf_counter() - started, 3)
+        return timings
+    
+    def enable_batching(self, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """启用识别微批调度：文本行切片跨页面/请求汇聚后批量识别"""
+        self.batcher = RecognitionBatcher(
+            self._recognize_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+        )
+        logger.info(f"识别微批调度已启用: max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms}")
 
+    @property
+    def mode(self) -> str:
+        return self.profile.mode
+    
     def set_mode(self, mode: str):
-        """设置解析模式影响提速与召回"""
-        if mode not in ("快速", "精细"):
-            return
-        self.mode = mode
-        # 基于模式调整参数
+        """设置默认解析模式（只影响未显式传入 profile 的调用，不修改全局配置）"""
         try:
-            if mode == "快速":
-                LAYOUT_CONFIG["conf_threshold"] = max(0.35, LAYOUT_CONFIG["conf_threshold"])  # 略提阈值
-                self.fast_imgsz = 768
-                self.use_angle_cls = False
-                self.direct_conf = 0.25
-            else:
-                LAYOUT_CONFIG["conf_threshold"] = 0.22
-                self.fast_imgsz = 1024
-                self.use_angle_cls = True
-                self.direct_conf = 0.12
-        except Exception:
+            self.profile = get_profile(mode)
+        except ValueError:
             pass
         
     def _init_ocr(self):
@@ -67,7 +148,8 @@ class OCREngine:
                 table=OCR_CONFIG["table"],
                 det_db_unclip_ratio=OCR_CONFIG["det_db_unclip_ratio"],
                 show_log=OCR_CONFIG["show_log"],
-                use_angle_cls=True
+                use_angle_cls=True,
+                rec_batch_num=BATCH_CONFIG.get("max_batch_size", 6)
             )
             logger.info("PaddleOCR初始化成功")
         except Exception as e:
@@ -84,7 +166,7 @@ class OCREngine:
                     try:
                         self.layout_model = YOLO(str(model_path))
                         # 测试模型是否能正常工作
-                        test_result = self.layout_model.predict("https://ultralytics.com/images/bus.jpg", verbose=False)
+                        self._validate_layout_model()
                         logger.info(f"布局检测模型(.pt)加载成功: {model_path}")
                     except Exception as model_error:
                         logger.warning(f"主模型加载失败: {model_error}，尝试备用模型")
@@ -92,7 +174,7 @@ class OCREngine:
                 elif model_path.suffix.lower() in {".yaml", ".yml"}:
                     logger.warning("检测到的是模型配置(yaml)，非已训练权重，将回退到通用检测权重models/yolov8n.pt")
                     local_fallback = Path(__file__).parent / "models" / "yolov8n.pt"
-                    self.layout_model = YOLO(str(local_fallback)) if local_fallback.exists() else YOLO("yolov8n.pt")
+                    self.layout_model = YOLO(str(local_fallback)) if local_fallback.exists() else self._builtin_yolo()
                     logger.info(f"已回退并加载yolov8n.pt 作为布局检测模型: {local_fallback if local_fallback.exists() else 'ultralytics内置'}")
             else:
                 # 尝试加载专业备用模型
@@ -103,12 +185,12 @@ class OCREngine:
                 else:
                     logger.warning("布局检测模型不存在，回退到yolov8n.pt")
                     local_fallback = Path(__file__).parent / "models" / "yolov8n.pt"
-                    self.layout_model = YOLO(str(local_fallback)) if local_fallback.exists() else YOLO("yolov8n.pt")
+                    self.layout_model = YOLO(str(local_fallback)) if local_fallback.exists() else self._builtin_yolo()
                     logger.info(f"已回退并加载yolov8n.pt 作为布局检测模型: {local_fallback if local_fallback.exists() else 'ultralytics内置'}")
         except Exception as e:
             logger.warning(f"布局检测模型加载失败: {e}，将回退到通用检测模型")
             try:
-                self.layout_model = YOLO("yolov8n.pt")
+                self.layout_model = self._builtin_yolo()
                 logger.info("已回退并加载yolov8n.pt 作为布局检测模型")
             except Exception as _:
                 logger.warning("通用检测模型加载失败，将使用默认规则检测")
@@ -123,7 +205,7 @@ class OCREngine:
                 try:
                     self.layout_model = YOLO(str(fb))
                     # 测试模型是否能正常工作
-                    test_result = self.layout_model.predict("https://ultralytics.com/images/bus.jpg", verbose=False)
+                    self._validate_layout_model()
                     logger.info(f"已回退并加载备用布局模型: {fb}")
                     return
                 except Exception as fb_error:
@@ -134,43 +216,49 @@ class OCREngine:
             if local_fallback.exists():
                 try:
                     self.layout_model = YOLO(str(local_fallback))
-                    test_result = self.layout_model.predict("https://ultralytics.com/images/bus.jpg", verbose=False)
+                    self._validate_layout_model()
                     logger.info(f"已回退并加载本地yolov8n.pt: {local_fallback}")
                     return
                 except Exception as local_error:
                     logger.warning(f"本地模型加载失败: {local_error}")
             
             # 最后的回退方案：使用内置模型
-            self.layout_model = YOLO("yolov8n.pt")
-            test_result = self.layout_model.predict("https://ultralytics.com/images/bus.jpg", verbose=False)
+            self.layout_model = self._builtin_yolo()
+            self._validate_layout_model()
             logger.warning("使用内置yolov8n.pt作为布局检测模型")
             
         except Exception as e2:
             logger.error(f"所有模型都无法加载: {e2}")
             self.layout_model = None
     
-    def detect_layout(self, image_path: str) -> List[Dict]:
+    @stage('layout')
+    def detect_layout(self, image_path: str, profile: Optional[ProcessingProfile] = None) -> List[Dict]:
         """
         检测图像布局
         
         Args:
             image_path: 图像路径
+            profile: 处理配置档（置信度/IoU阈值与输入尺寸），默认 self.profile
             
         Returns:
             布局检测结果列表
         """
-        if not self.layout_model:
+        # 取一次模型引用：启用进程内并发时另一任务可能在出错后禁用模型
+        layout_model = self.layout_model
+        if not layout_model:
             return self._default_layout_detection(image_path)
         
+        profile = profile or self.profile
         try:
             # 使用更适合专用模型的参数
-            results = self.layout_model.predict(
-                image_path,
-                conf=LAYOUT_CONFIG["conf_threshold"],
-                iou=LAYOUT_CONFIG["iou_threshold"],
-                imgsz=getattr(self, 'fast_imgsz', 1024),
-                verbose=False
-            )
+            with self._infer_lock:
+                results = layout_model.predict(
+                    image_path,
+                    conf=profile.layout_conf,
+                    iou=profile.layout_iou,
+                    imgsz=profile.layout_imgsz,
+                    verbose=False
+                )
             
             layout_results = []
             for result in results:
@@ -195,40 +283,23 @@ class OCREngine:
             logger.error(f"布局检测失败: {e}")
             # 如果模型出错，设置为None以避免后续错误
             if "bn" in str(e) or "Conv" in str(e):
-                logger.warning("检测到模型兼容性问题，禁用布局检测模型")
-                self.layout_model = None
+                with self._infer_lock:
+                    # 只禁用本次出错的模型，不覆盖其间已重新加载的模型
+                    if self.layout_model is layout_model:
+                        logger.warning("检测到模型兼容性问题，禁用布局检测模型")
+                        self.layout_model = None
             return self._default_layout_detection(image_path)
     
     def _default_layout_detection(self, image_path: str) -> List[Dict]:
-        """默认布局检测（基于图像分析）"""
+        """默认布局检测（无布局模型时）：块级分割为段落/栏、标题、图片与表格区域"""
         try:
-            image = cv2.imread(image_path)
-            if image is None:
+            gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
                 return []
             
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            height, width = gray.shape
-            
-            # 简单的文本区域检测
-            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            text_regions = []
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                area = w * h
-                aspect_ratio = w / h if h > 0 else 0
-                
-                # 过滤太小的区域和太宽的区域
-                if area > 100 and aspect_ratio < 10:
-                    text_regions.append({
-                        'bbox': [x, y, x + w, y + h],
-                        'confidence': 0.8,
-                        'category': 'text',
-                        'category_id': 0
-                    })
-            
-            return text_regions
+            regions = segment_blocks(gray)
+            logger.info(f"默认布局检测完成，检测到 {len(regions)} 个区域")
+            return regions
             
         except Exception as e:
             logger.error(f"默认布局检测失败: {e}")
@@ -246,93 +317,164 @@ class OCREngine:
         }
         return categories.get(category_id, 'unknown')
     
-    def extract_text(self, image_path: str, bbox: Optional[List[int]] = None) -> str:
+    def _recognize_batch(self, images: List[np.ndarray], use_angle_cls: bool = True) -> List[Tuple[str, float]]:
+        """批量识别文本行切片（仅识别，不做检测），由微批调度线程按方向分类参数分组调用"""
+        with self._infer_lock:
+            result = self.ocr.ocr([images], det=False, rec=True, cls=use_angle_cls)
+        lines = result[0] if result else []
+        return [(str(line[0]), float(line[1])) for line in lines]
+    
+    @staticmethod
+    def _rotate_crop(image: np.ndarray, box) -> np.ndarray:
+        """按四点框透视裁剪文本行（竖排文本旋转为横排）"""
+        points = np.array(box, dtype=np.float32)
+        width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+        height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+        width, height = max(width, 1), max(height, 1)
+        target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+        matrix = cv2.getPerspectiveTransform(points, target)
+        crop = cv2.warpPerspective(image, matrix, (width, height),
+                                   borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+        if height / width >= 1.5:
+            crop = np.rot90(crop)
+        return crop
+    
+    def _ocr_lines(self, image, use_angle_cls: bool = True) -> List[Tuple[list, str, float]]:
+        """
+        整图文字检测 + 识别
+        
+        Args:
+            image: 图像路径或BGR数组
+            use_angle_cls: 是否启用文字方向分类
+            
+        Returns:
+            [(四点框, 文本, 置信度)]，按阅读顺序排列
+        """
+        if self.batcher is None:
+            with self._infer_lock:
+                result = self.ocr.ocr(image, cls=use_angle_cls)
+            if not result or not result[0]:
+                return []
+            return [
+                (line[0], line[1][0], line[1][1])
+                for line in result[0]
+                if line and len(line) >= 2 and len(line[1]) >= 2
+            ]
+        
+        if isinstance(image, str):
+            image = cv2.imread(image)
+            if image is None:
+                return []
+        # 检测在引擎锁内执行，识别切片交给微批调度器与其他页面/请求合批
+        with self._infer_lock:
+            det = self.ocr.ocr(image, det=True, rec=False, cls=False)
+        boxes = det[0] if det and det[0] else []
+        if not boxes:
+            return []
+        boxes = sorted(boxes, key=lambda b: (round(b[0][1] / 10), b[0][0]))
+        crops = [self._rotate_crop(image, box) for box in boxes]
+        recognized = self.batcher.recognize(crops, key=use_angle_cls)
+        return [(box, text, conf) for box, (text, conf) in zip(boxes, recognized)]
+    
+    def extract_text(self, image_path: str, bbox: Optional[List[int]] = None,
+                     profile: Optional[ProcessingProfile] = None) -> str:
         """
         从图像中提取文字
         
         Args:
             image_path: 图像路径
             bbox: 边界框 [x1, y1, x2, y2]，如果为None则处理整个图像
+            profile: 处理配置档，默认 self.profile
             
         Returns:
             提取的文字
         """
+        return self.recognize_region(image_path, bbox, profile)[0]
+    
+    @stage('recognition')
+    def recognize_region(self, image_path, bbox: Optional[List[int]] = None,
+                         profile: Optional[ProcessingProfile] = None) -> Tuple[str, float]:
+        """
+        识别区域文字并给出平均识别置信度（含低于阈值被丢弃的行，供分辨率升级判断）
+        
+        Args:
+            image_path: 图像路径或BGR数组
+            bbox: 边界框 [x1, y1, x2, y2]，如果为None则处理整个图像
+            profile: 处理配置档（方向分类、保留文本行的最低置信度），默认 self.profile
+            
+        Returns:
+            (文字, 平均置信度)；未识别到文字行时置信度为0
+        """
+        profile = profile or self.profile
         try:
+            image = image_path
             if bbox:
-                # 裁剪指定区域
-                image = Image.open(image_path)
-                cropped = image.crop(bbox)
-                temp_path = f"{image_path}_temp.jpg"
-                cropped.save(temp_path)
-                image_path = temp_path
-            
-            result = self.ocr.ocr(image_path, cls=getattr(self, 'use_angle_cls', True))
-            
-            if bbox and Path(temp_path).exists():
-                Path(temp_path).unlink()  # 删除临时文件
-            
-            if not result or not result[0]:
-                return ""
+                # 在内存中裁剪指定区域，不再写临时图片
+                page = cv2.imread(image_path) if isinstance(image_path, str) else image_path
+                if page is None:
+                    return "", 0.0
+                height, width = page.shape[:2]
+                x1, y1, x2, y2 = [int(v) for v in bbox]
+                x1, y1 = max(0, x1), max(0, y1)
+                x2, y2 = min(width, x2), min(height, y2)
+                if x2 <= x1 or y2 <= y1:
+                    return "", 0.0
+                image = np.ascontiguousarray(page[y1:y2, x1:x2])
+            
+            lines = self._ocr_lines(image, profile.use_angle_cls)
             
             # 提取文字内容
             texts = []
-            for line in result[0]:
-                if line and len(line) >= 2:
-                    text = line[1][0]  # 文字内容
-                    confidence = line[1][1]  # 置信度
-                    min_conf = 0.5 if self.mode == "快速" else 0.3
-                    if confidence > min_conf:
-                        texts.append(text)
+            for _, text, confidence in lines:
+                if confidence > profile.region_min_conf:
+                    texts.append(text)
+            mean_conf = float(sum(line[2] for line in lines) / len(lines)) if lines else 0.0
             
-            return "\n".join(texts)
+            return "\n".join(texts), mean_conf
             
         except Exception as e:
             logger.error(f"文字提取失败: {e}")
-            return ""
+            return "", 0.0
     
-    def extract_text_direct(self, image_path: str, confidence_threshold: float = 0.1) -> List[Dict]:
+    @stage('recognition')
+    def extract_text_direct(self, image_path: str, confidence_threshold: float = 0.1,
+                            profile: Optional[ProcessingProfile] = None) -> List[Dict]:
         """
         直接对整张图像进行OCR识别，不依赖布局检测
         
         Args:
             image_path: 图像路径
-            confidence_threshold: 置信度阈值，默认0.1（较低阈值以获取更多文本）
+            confidence_threshold: 置信度阈值，默认0.1（较低阈值以获取更多文本）；提供 profile 时使用其 direct_min_conf
+            profile: 处理配置档（方向分类、置信度阈值），默认 self.profile
             
         Returns:
             OCR识别结果列表
         """
+        min_conf = profile.direct_min_conf if profile is not None else confidence_threshold
+        profile = profile or self.profile
         try:
             # 使用PaddleOCR直接识别整张图像
-            result = self.ocr.ocr(image_path, cls=getattr(self, 'use_angle_cls', True))
+            lines = self._ocr_lines(image_path, profile.use_angle_cls)
             
-            if not result or not result[0]:
+            if not lines:
                 logger.warning(f"直接OCR未识别到任何文本: {image_path}")
                 return []
             
             texts = []
-            for line in result[0]:
-                if len(line) >= 2:
-                    bbox = line[0]  # 边界框坐标
-                    text_info = line[1]  # 文本内容和置信度
+            # 过滤置信度过低的文本
+            for bbox, text, confidence in lines:
+                if confidence >= min_conf:
+                    # 转换边界框格式
+                    x1, y1 = bbox[0]
+                    x2, y2 = bbox[2]
                     
-                    if len(text_info) >= 2:
-                        text = text_info[0]  # 识别的文本
-                        confidence = text_info[1]  # 置信度
-                        
-                        # 过滤置信度过低的文本（模式可覆盖）
-                        min_conf = getattr(self, 'direct_conf', confidence_threshold)
-                        if confidence >= min_conf:
-                            # 转换边界框格式
-                            x1, y1 = bbox[0]
-                            x2, y2 = bbox[2]
-                            
-                            texts.append({
-                                'text': text,
-                                'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                                'confidence': float(confidence),
-                                'category': 'text',
-                                'category_id': 0
-                            })
+                    texts.append({
+                        'text': text,
+                        'bbox': [int(x1), int(y1), int(x2), int(y2)],
+                        'confidence': float(confidence),
+                        'category': 'text',
+                        'category_id': 0
+                    })
             
             logger.info(f"直接OCR识别完成，提取到 {len(texts)} 个文本区域")
             return texts
@@ -341,19 +483,28 @@ class OCREngine:
             logger.error(f"直接OCR识别失败: {e}")
             return []
     
-    def process_page(self, image_path: str) -> Dict:
+    def process_page(self, image_path: str, direct_scan: Optional[Callable[[], List[Dict]]] = None,
+                     profile: Optional[ProcessingProfile] = None) -> Dict:
         """
         处理单页图像，返回布局和文字信息
         
         Args:
             image_path: 图像路径
+            direct_scan: 整页直扫函数（可选），由调用方传入带备忘的实现，
+                保证同一页同一分辨率只直扫一次；默认直接调用 extract_text_direct
+            profile: 处理配置档，默认 self.profile
             
         Returns:
             处理结果字典
         """
+        profile = profile or self.profile
+        if direct_scan is None:
+            direct_scan = lambda: self.extract_text_direct(image_path, profile=profile)
         try:
-            # 布局检测
-            layout_results = self.detect_layout(image_path)
+            # 布局检测，合并重叠/嵌套区域并按阅读顺序排列（避免同一行被识别两次）
+            layout_results = normalize_regions(
+                self.detect_layout(image_path, profile), overlap_threshold=IMAGE_CONFIG["overlap_threshold"]
+            )
             
             # 分类处理
             text_regions = []
@@ -365,13 +516,14 @@ class OCREngine:
                 bbox = region['bbox']
                 
                 if category in ['text', 'title']:
-                    text = self.extract_text(image_path, bbox)
+                    text, ocr_confidence = self.recognize_region(image_path, bbox, profile)
                     if text.strip():
                         text_regions.append({
                             'bbox': bbox,
                             'text': text,
                             'category': category,
-                            'confidence': region['confidence']
+                            'confidence': region['confidence'],
+                            'ocr_confidence': ocr_confidence
                         })
                 elif category == 'figure':
                     figure_regions.append(region)
@@ -379,9 +531,9 @@ class OCREngine:
                     table_regions.append(region)
             
             # 如果布局检测没有找到足够的文本区域，使用直接OCR
-            if len(text_regions) < (1 if self.mode == "快速" else 1):
+            if not text_regions:
                 logger.info("布局检测文本区域不足，使用直接OCR...")
-                direct_text = self.extract_text_direct(image_path)
+                direct_text = direct_scan()
                 if direct_text:
                     # 将直接OCR的结果作为一个整体文本区域
                     text_regions.append({
@@ -393,9 +545,9 @@ class OCREngine:
                     logger.info(f"直接OCR提取到 {len(direct_text)} 个文本区域")
                 else:
                     logger.warning("直接OCR也没有提取到文本内容")
-            elif len(text_regions) < (2 if self.mode == "精细" else 1):
+            elif len(text_regions) < profile.min_text_regions:
                 logger.info("布局检测文本区域较少，尝试直接OCR补充...")
-                direct_text = self.extract_text_direct(image_path)
+                direct_text = direct_scan()
                 if direct_text:
                     # 检查直接OCR是否提供了更多内容
                     existing_text = "\n".join([tr['text'] for tr in text_regions])
@@ -419,7 +571,7 @@ class OCREngine:
             logger.error(f"页面处理失败: {e}")
             # 出错时尝试直接OCR
             try:
-                direct_text = self.extract_text_direct(image_path)
+                direct_text = direct_scan()
                 if direct_text:
                     return {
                         'text_regions': [{
@@ -444,11 +596,11 @@ class OCREngine:
     
     def clean_similar_images(self, image_dir: str, similarity_threshold: float = None) -> bool:
         """
-        清理相似图像
+        清理相似图像：每张图片计算一次感知哈希，经BK树按汉明半径查找，保留先出现的一张
         
         Args:
             image_dir: 图像目录
-            similarity_threshold: 相似度阈值
+            similarity_threshold: 相似度阈值（1 - 汉明距离/64）
             
         Returns:
             是否清理成功
@@ -457,51 +609,25 @@ class OCREngine:
             similarity_threshold = IMAGE_CONFIG["similarity_threshold"]
         
         try:
-            image_files = list(Path(image_dir).glob("*.jpg")) + list(Path(image_dir).glob("*.png"))
+            image_files = sorted(Path(image_dir).glob("*.jpg")) + sorted(Path(image_dir).glob("*.png"))
             
             if len(image_files) < 2:
                 return True
             
-            # 计算图像相似度
-            for i in range(len(image_files)):
-                for j in range(i + 1, len(image_files)):
-                    similarity = self._calculate_image_similarity(
-                        str(image_files[i]), str(image_files[j])
-                    )
-                    
-                    if similarity > similarity_threshold:
-                        # 删除相似度高的图像
-                        image_files[j].unlink()
-                        logger.info(f"删除相似图像: {image_files[j]}")
+            duplicates = find_similar_images(
+                image_files, similarity_to_radius(similarity_threshold),
+                method=IMAGE_HASH_CONFIG.get("method", "phash"), index=get_image_hash_index()
+            )
+            for path, match in duplicates.items():
+                if match['corpus']:
+                    # 其他研报中出现过的图片只记录，不删除
+                    logger.info(f"图片与全库已有图片相似: {path} ~ {match['duplicate_of']}")
+                    continue
+                Path(path).unlink()
+                logger.info(f"删除相似图像: {path}（与 {match['duplicate_of']} 距离 {match['distance']}）")
             
             return True
             
         except Exception as e:
             logger.error(f"清理相似图像失败: {e}")
             return False
-    
-    def _calculate_image_similarity(self, img1_path: str, img2_path: str) -> float:
-        """计算两张图像的相似度"""
-        try:
-            img1 = cv2.imread(img1_path)
-            img2 = cv2.imread(img2_path)
-            
-            if img1 is None or img2 is None:
-                return 0.0
-            
-            # 统一尺寸
-            img1_resized = cv2.resize(img1, (224, 224))
-            img2_resized = cv2.resize(img2, (224, 224))
-            
-            # 转换为灰度图
-            gray1 = cv2.cvtColor(img1_resized, cv2.COLOR_BGR2GRAY)
-            gray2 = cv2.cvtColor(img2_resized, cv2.COLOR_BGR2GRAY)
-            
-            # 计算结构相似性
-            similarity = cv2.matchTemplate(gray1, gray2, cv2.TM_CCOEFF_NORMED)[0][0]
-            
-            return float(similarity)
-            
-        except Exception as e:
-            logger.error(f"计算图像相似度失败: {e}")
-            return 0.0
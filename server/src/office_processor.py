@@ -5,7 +5,6 @@ Office文档处理器 - 服务端版本，支持Word和Excel文件的文本提
 import os
 import json
 import time
-import pickle
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from loguru import logger
@@ -33,7 +32,10 @@ except ImportError:
     XLS_AVAILABLE = False
     logger.warning("xlrd库未安装，旧版Excel文档处理功能将不可用")
 
-from .config import OUTPUT_DIR, PICKLES_DIR, PROMPTS
+from .config import PROMPTS
+from .workspace import JobWorkspace
+from .metrics import stage
+from .result_store import get_result_store
 
 
 class OfficeProcessor:
@@ -86,26 +88,18 @@ class OfficeProcessor:
         file_ext = Path(file_path).suffix.lower()
         
         try:
-            # 创建输出目录
-            output_path = OUTPUT_DIR / output_name
-            output_path.mkdir(exist_ok=True)
-            
-            # 根据文件类型进行相应处理
-            if file_ext == '.docx':
-                result = self._process_docx_file(file_path, output_path, output_name)
-            elif file_ext == '.doc':
-                result = self._process_doc_file(file_path, output_path, output_name)
-            elif file_ext == '.xlsx':
-                result = self._process_xlsx_file(file_path, output_path, output_name)
-            elif file_ext == '.xls':
-                result = self._process_xls_file(file_path, output_path, output_name)
-            else:
+            handlers = {
+                '.docx': self._process_docx_file,
+                '.doc': self._process_doc_file,
+                '.xlsx': self._process_xlsx_file,
+                '.xls': self._process_xls_file
+            }
+            if file_ext not in handlers:
                 return {'status': 'error', 'message': f'不支持的文件类型: {file_ext}'}
             
-            # 清理临时文件
-            self._cleanup_temp_files(output_path)
-            
-            return result
+            # 每个任务独立的工作目录，结束时删除中间文件
+            with JobWorkspace(output_name) as workspace:
+                return handlers[file_ext](file_path, workspace.path, workspace.name)
             
         except Exception as e:
             logger.error(f"Office文档处理失败: {e}")
@@ -188,8 +182,8 @@ class OfficeProcessor:
                 'tags': summary_result.get('tags', [])
             }
             
-            # 保存到pickle文件
-            self._save_to_pickle(result, output_name)
+            # 保存到结果库
+            self._save_result(result, output_name)
             
             logger.info(f"Word文档处理完成: {Path(file_path).name}, 共{len(paragraphs)}段, {len(tables)}表")
             return result
@@ -243,7 +237,7 @@ class OfficeProcessor:
                         'tags': summary_result.get('tags', [])
                     }
                     
-                    self._save_to_pickle(result, output_name)
+                    self._save_result(result, output_name)
                     logger.info(f"旧版Word文档处理完成: {Path(file_path).name}")
                     return result
                     
@@ -330,8 +324,8 @@ class OfficeProcessor:
                 'tags': summary_result.get('tags', [])
             }
             
-            # 保存到pickle文件
-            self._save_to_pickle(result, output_name)
+            # 保存到结果库
+            self._save_result(result, output_name)
             
             logger.info(f"Excel文档处理完成: {Path(file_path).name}, 共{len(sheets_data)}表, {len(all_texts)}单元格")
             return result
@@ -415,8 +409,8 @@ class OfficeProcessor:
                 'tags': summary_result.get('tags', [])
             }
             
-            # 保存到pickle文件
-            self._save_to_pickle(result, output_name)
+            # 保存到结果库
+            self._save_result(result, output_name)
             
             logger.info(f"旧版Excel文档处理完成: {Path(file_path).name}, 共{len(sheets_data)}表, {len(all_texts)}单元格")
             return result
@@ -439,38 +433,17 @@ class OfficeProcessor:
             'tags': []
         }
     
-    def _save_to_pickle(self, result: Dict, output_name: str):
-        """保存结果到pickle文件"""
-        try:
-            pickle_path = PICKLES_DIR / output_name
-            pickle_path.mkdir(exist_ok=True)
-            
-            # 保存主要结果
-            with open(pickle_path / "result.pkl", 'wb') as f:
-                pickle.dump(result, f)
-            
-            # 保存文本向量（如果需要）
-            if result['texts']:
-                texts = [text['text'] for text in result['texts'] if isinstance(text, dict) and 'text' in text]
-                with open(pickle_path / "texts.pkl", 'wb') as f:
-                    pickle.dump(texts, f)
-            
-            logger.info(f"结果已保存到: {pickle_path}")
-            
-        except Exception as e:
-            logger.error(f"保存pickle文件失败: {e}")
-    
-    def _cleanup_temp_files(self, output_path: Path):
-        """清理临时文件"""
+    @stage('save')
+    def _save_result(self, result: Dict, output_name: str):
+        """保存结果到结果库"""
+        store = get_result_store()
+        if store is None:
+            return
         try:
-            # 删除临时文件
-            for temp_file in output_path.glob("*.tmp"):
-                temp_file.unlink()
-            
-            logger.info("临时文件清理完成")
-            
+            entry = store.put(output_name, result)
+            logger.info(f"结果已保存到结果库: {output_name}（{entry['segment']}）")
         except Exception as e:
-            logger.error(f"清理临时文件失败: {e}")
+            logger.error(f"保存结果失败: {e}")
     
     def get_supported_formats(self) -> List[str]:
         """获取支持的文件格式"""
@@ -0,0 +1,253 @@
+"""
+跨文档页面OCR缓存 - 以渲染页面的栅格哈希为键，命中时跳过布局检测与文字识别
+
+缓存以JSON文件形式保存在服务器磁盘上（多个推理进程共享、重启后保留），
+按总条数与总字节数做LRU淘汰（以文件修改时间作为最近使用时间）。
+容量以缓存目录本身为准：总条数/字节数记录在目录内的 usage.json，写入、删除与淘汰
+在目录锁（fcntl.flock，多个进程共用）内更新；超出上限时扫描目录按修改时间删除最旧的条目，
+降到上限的 low_water 比例，并以扫描结果校正记账。各进程不再各自维护索引，
+N 个进程共享同一目录时上限仍对整个缓存生效。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .config import PAGE_CACHE_CONFIG
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+USAGE_NAME = "usage.json"
+LOCK_NAME = ".lock"
+
+
+class PageCache:
+    """基于磁盘的页面识别结果LRU缓存"""
+
+    # 条目文件扩展名（子类可覆盖）
+    suffix = ".json"
+
+    def __init__(self, cache_dir: str, max_entries: int = 5000, max_bytes: int = 200 * 1024 * 1024,
+                 low_water: float = 1.0):
+        """
+        Args:
+            cache_dir: 缓存目录（可被多个进程共享）
+            max_entries: 最多条目数
+            max_bytes: 条目总字节数上限
+            low_water: 超出上限时淘汰到上限的该比例（小于1时缓存满后不必每次写入都扫描目录）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._usage_path = self.cache_dir / USAGE_NAME
+        with self._shared():
+            if self._read_usage() is None:
+                self._write_usage(self._usage_from(self._scan()))
+
+    @staticmethod
+    def make_key(image_path: str, profile_key: str) -> str:
+        """由页面图像内容与处理参数（模式、分辨率）生成缓存键"""
+        digest = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest.update(profile_key.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    # ---- 目录锁与记账 ----
+
+    @contextmanager
+    def _shared(self):
+        """进程内线程锁 + 目录文件锁（无 fcntl 时只在进程内互斥）"""
+        with self._lock:
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            with open(self.cache_dir / LOCK_NAME, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _scan(self) -> List[Tuple[float, Path, int]]:
+        """目录中的全部条目 (修改时间, 路径, 大小)，最旧在前"""
+        entries = []
+        for path in self.cache_dir.glob(f"??/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort(key=lambda entry: entry[0])
+        return entries
+
+    @staticmethod
+    def _usage_from(entries: List[Tuple[float, Path, int]]) -> Dict[str, int]:
+        return {'entries': len(entries), 'bytes': sum(size for _, _, size in entries)}
+
+    def _read_usage(self) -> Optional[Dict[str, int]]:
+        """读取目录记账（调用方持有目录锁），缺失或损坏时返回None"""
+        try:
+            with open(self._usage_path, 'r', encoding='utf-8') as f:
+                usage = json.load(f)
+            return {'entries': int(usage['entries']), 'bytes': int(usage['bytes'])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_usage(self, usage: Dict[str, int]):
+        try:
+            with open(self._usage_path, 'w', encoding='utf-8') as f:
+                json.dump(usage, f)
+        except OSError as e:
+            logger.warning(f"写入缓存记账失败: {e}")
+
+    def _account(self, entries: int, size: int):
+        """按增量更新记账，超出上限时淘汰（调用方持有目录锁）"""
+        usage = self._read_usage()
+        if usage is None:
+            usage = self._usage_from(self._scan())
+        else:
+            usage = {'entries': max(0, usage['entries'] + entries), 'bytes': max(0, usage['bytes'] + size)}
+        if usage['entries'] > self.max_entries or usage['bytes'] > self.max_bytes:
+            usage = self._evict()
+        self._write_usage(usage)
+
+    def _evict(self) -> Dict[str, int]:
+        """扫描目录删除最旧的条目，直到降到上限的 low_water 比例，返回校正后的记账（调用方持有目录锁）"""
+        entries = self._scan()
+        usage = self._usage_from(entries)
+        max_entries = int(self.max_entries * self.low_water)
+        max_bytes = int(self.max_bytes * self.low_water)
+        for _, path, size in entries:
+            if usage['entries'] <= max_entries and usage['bytes'] <= max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"淘汰缓存条目失败: {path}: {e}")
+                continue
+            usage['entries'] -= 1
+            usage['bytes'] -= size
+        return usage
+
+    # ---- 读写 ----
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取缓存条目，未命中返回None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except OSError:
+            return None
+        except ValueError:
+            self.delete(key)
+            return None
+        self._touch(path)
+        return entry
+
+    @staticmethod
+    def _touch(path: Path):
+        """更新最近使用时间（文件修改时间即LRU顺序）"""
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def put(self, key: str, entry: Dict):
+        """写入缓存条目并按容量淘汰最久未使用的条目"""
+        path = self._path(key)
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning(f"写入页面缓存失败: {e}")
+            return
+        self._commit(key, tmp_path)
+
+    def _commit(self, key: str, tmp_path) -> bool:
+        """把已写好的临时文件放到条目位置并记账（同一键已存在时替换）"""
+        path = self._path(key)
+        with self._shared():
+            try:
+                old_size = path.stat().st_size
+            except OSError:
+                old_size = None
+            try:
+                size = os.stat(tmp_path).st_size
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"写入缓存条目失败: {e}")
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                return False
+            if old_size is None:
+                self._account(1, size)
+            else:
+                self._account(0, size - old_size)
+        return True
+
+    def delete(self, key: str):
+        """删除缓存条目"""
+        path = self._path(key)
+        with self._shared():
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                return
+            self._account(-1, -size)
+
+    def stats(self) -> Dict:
+        with self._shared():
+            usage = self._read_usage()
+            if usage is None:
+                usage = self._usage_from(self._scan())
+                self._write_usage(usage)
+            return usage
+
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """获取进程内共享的页面缓存实例，未启用时返回None"""
+    global _page_cache
+    if not PAGE_CACHE_CONFIG.get("enabled", False):
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(
+                PAGE_CACHE_CONFIG["cache_dir"],
+                max_entries=PAGE_CACHE_CONFIG.get("max_entries", 5000),
+                max_bytes=PAGE_CACHE_CONFIG.get("max_bytes", 200 * 1024 * 1024),
+                low_water=PAGE_CACHE_CONFIG.get("low_water", 0.9)
+            )
+        return _page_cache
@@ -0,0 +1,182 @@
+"""
+页面差异重处理 - 报告更新后只重新识别内容变化或新增的页面
+
+发布方重新发布研报时通常只更正个别页面或更换封面，整篇重新识别代价很高。
+PDF结果的 'page_hashes' 按页记录内容哈希：页面尺寸/旋转、解压后的内容流，以及页面引用的
+图片与 XObject 的原始数据（不含 xref 编号，插入页面导致编号变化不影响哈希）；内容流不可读时退回低分辨率栅格哈希。
+结果库清单记录文档名与模式，同名文档以同一模式重新处理时取最近一次的结果，
+哈希相同的页面（可在文档中任意位置，如新增封面后整体后移）直接复用其 texts/figures/tables，
+页码改写为新位置，图表文件复制到本次任务目录；引用的文件已被回收时该页照常重新识别。
+上一版本从结果库流式读取：先只取其页面哈希与预筛记录（存在时才整篇计算本次的页面哈希），
+再只保留哈希相同页面的 texts/figures/tables 条目，不把整篇上一版本结果读入内存。
+没有上一版本时页面哈希在逐页处理时计算，写入结果供下次比对。
+"""
+
+import hashlib
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import fitz
+from loguru import logger
+
+from .config import PAGE_DIFF_CONFIG
+from .page_spill import ITEM_FIELDS
+from .result_store import get_result_store
+
+
+def page_content_hash(page) -> str:
+    """页面内容哈希（内容流与所引用资源的数据；不可读时为栅格哈希）"""
+    digest = hashlib.sha256()
+    rect = page.rect
+    digest.update(f"{rect.width:.2f}x{rect.height:.2f}r{page.rotation}".encode('ascii'))
+    try:
+        doc = page.parent
+        digest.update(page.read_contents())
+        xrefs = {item[0] for item in page.get_images(full=True)} | {item[0] for item in page.get_xobjects()}
+        for xref in sorted(xrefs):
+            digest.update(doc.xref_stream_raw(xref) or b'')
+        for font in page.get_fonts(full=True):
+            # (xref, ext, type, basefont, name, encoding, ...)：字体变化会改变渲染出的字形
+            digest.update(f"{font[3]}/{font[4]}/{font[5]}".encode('utf-8'))
+    except Exception as e:
+        logger.debug(f"页面内容流不可读，使用栅格哈希: 第{page.number + 1}页: {e}")
+        pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5), alpha=False)
+        digest.update(b'raster:' + pix.samples)
+    return digest.hexdigest()[:32]
+
+
+def page_hashes(pdf) -> List[str]:
+    """整篇每页的内容哈希（下标为页码-1）"""
+    return [page_content_hash(pdf[number]) for number in range(pdf.page_count)]
+
+
+def find_previous(name: str, mode: str) -> Optional[str]:
+    """同名文档以同一模式处理的最近一次结果在结果库中的id，未启用或没有时返回None"""
+    if not PAGE_DIFF_CONFIG.get("enabled", False):
+        return None
+    store = get_result_store()
+    if store is None:
+        return None
+    entry = store.latest(name=name, mode=mode)
+    return entry['id'] if entry else None
+
+
+class PreviousResult:
+    """上一版本结果中可复用的页面（只保留哈希出现在本次文档中的页面）"""
+
+    def __init__(self, doc_id: str, hashes: List[str], previous_hashes: List[str],
+                 skipped: Optional[List[Dict]] = None):
+        """
+        Args:
+            doc_id: 上一版本在结果库中的id
+            hashes: 本次文档各页的内容哈希
+            previous_hashes: 上一版本各页的内容哈希
+            skipped: 上一版本预筛跳过的页面 [{'page', 'kind'}]
+        """
+        self.doc_id = doc_id
+        self.hashes = hashes
+        wanted: Set[str] = set(hashes)
+        # 哈希 -> 上一版本页码（内容重复的页面取第一次出现）
+        self._pages: Dict[str, int] = {}
+        for number, page_hash in enumerate(previous_hashes, 1):
+            if page_hash in wanted and page_hash not in self._pages:
+                self._pages[page_hash] = number
+        self._items = {number: {field: [] for field in ITEM_FIELDS} for number in self._pages.values()}
+        self._skipped = {entry['page']: entry['kind'] for entry in skipped or [] if entry.get('page') in self._items}
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def add(self, field: str, item):
+        """收集上一版本的一个条目，只保留可复用页面上的条目"""
+        if isinstance(item, dict) and item.get('page') in self._items:
+            self._items[item['page']][field].append(item)
+
+    def reuse(self, page_hash: str, page_num: int, output_path: Path) -> Optional[Dict]:
+        """
+        复用哈希相同的页面结果
+
+        Args:
+            page_hash: 本次该页的内容哈希
+            page_num: 本次页码（从0开始）
+            output_path: 本次任务目录，图表文件复制到这里
+
+        Returns:
+            与 _process_single_page 相同格式的页面结果，另含 'skipped'（上一版本预筛跳过的类型或None）；
+            没有可复用的页面或引用的文件已不存在时返回None
+        """
+        number = self._pages.get(page_hash)
+        if number is None:
+            return None
+        items = self._items[number]
+        page_result = {'status': 'success', 'texts': [], 'figures': [], 'tables': [],
+                       'cache_hit': False, 'skipped': self._skipped.get(number)}
+        copied: Dict[str, str] = {}
+        for field in ITEM_FIELDS:
+            for item in items[field]:
+                item = {**item, 'page': page_num + 1}
+                source = item.get('path')
+                if source:
+                    if source not in copied:
+                        target = _copy_artifact(source, output_path, page_num)
+                        if target is None:
+                            return None
+                        copied[source] = target
+                    item['path'] = copied[source]
+                page_result[field].append(item)
+        return page_result
+
+
+def _copy_artifact(source: str, output_path: Path, page_num: int) -> Optional[str]:
+    """把上一版本的图表文件复制到本次任务目录，源文件不存在时返回None"""
+    src = Path(source)
+    if not src.is_file():
+        return None
+    target = Path(output_path) / f"reused_{page_num + 1}_{src.name}"
+    try:
+        shutil.copyfile(src, target)
+    except OSError as e:
+        logger.warning(f"复制上一版本图表失败: {src}: {e}")
+        return None
+    return str(target)
+
+
+def load_previous(doc_id: Optional[str], pdf) -> Optional[PreviousResult]:
+    """
+    读取上一版本的页面哈希并建立复用索引
+
+    上一版本带页面哈希时才整篇计算本次文档的页面哈希（PreviousResult.hashes），
+    再次流式读取上一版本，只保留哈希相同页面的条目。
+
+    Returns:
+        复用索引（可复用页面可能为0）；没有上一版本、其结果不含页面哈希或读取失败时返回None
+    """
+    store = get_result_store()
+    if not doc_id or store is None:
+        return None
+    previous_hashes: List[str] = []
+    skipped: List[Dict] = []
+    try:
+        # 第一遍只取页面哈希与预筛记录，逐页条目读过即丢弃
+        for key, value in store.iter_fields(doc_id, arrays=ITEM_FIELDS):
+            if key == 'page_hashes':
+                previous_hashes = value or []
+            elif key == 'page_filter':
+                skipped = (value or {}).get('skipped') or []
+    except Exception as e:
+        logger.warning(f"读取上一版本结果失败: {doc_id}: {e}")
+        return None
+    if not previous_hashes:
+        return None
+
+    previous = PreviousResult(doc_id, page_hashes(pdf), previous_hashes, skipped)
+    if len(previous):
+        try:
+            for key, value in store.iter_fields(doc_id, arrays=ITEM_FIELDS):
+                if key in ITEM_FIELDS:
+                    previous.add(key, value)
+        except Exception as e:
+            logger.warning(f"读取上一版本结果失败: {doc_id}: {e}")
+            return None
+    return previous
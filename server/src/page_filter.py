@@ -0,0 +1,78 @@
+"""
+空白页/图片页预筛 - 在布局检测与OCR之前跳过无需识别的页面
+
+研报中的分隔页、空白背页只有页码或完全空白，整版封面图没有可识别的正文，
+逐页渲染 + 布局检测 + OCR 且无文本时还会升级到直扫与高清直扫。预筛每页只做：
+1. 文字层检查：字符数不少于 min_text_chars 的页面直接视为正文页，不渲染
+2. 长边 thumbnail_size 的灰度缩略图：墨迹比例（与背景差异明显的像素）、灰度标准差、Canny边缘密度
+   - blank：三项都接近零（只有页码、扫描噪点的页面同样判为空白）
+   - image_only：单张图片覆盖大部分页面、墨迹多但边缘稀疏（照片类；扫描的正文页边缘密集，不会误判）
+其余页面为 content，正常处理。阈值偏保守，拿不准的页面一律按正文页处理。
+"""
+
+from typing import Dict, Optional
+
+import cv2
+import fitz
+import numpy as np
+
+from .config import PAGE_FILTER_CONFIG
+
+CONTENT, BLANK, IMAGE_ONLY = 'content', 'blank', 'image_only'
+
+
+def _largest_image(page) -> Dict:
+    """覆盖页面面积最大的图片 {'xref', 'coverage'}（覆盖率为与页面交集面积占比）"""
+    best = {'xref': None, 'coverage': 0.0}
+    area = page.rect.width * page.rect.height
+    for item in page.get_images(full=True):
+        for rect in page.get_image_rects(item[0]):
+            rect = rect & page.rect
+            coverage = (rect.width * rect.height / area) if area and not rect.is_empty else 0.0
+            if coverage > best['coverage']:
+                best = {'xref': item[0], 'coverage': coverage}
+    return best
+
+
+def classify_page(page, config: Optional[Dict] = None) -> Dict:
+    """
+    预筛单页
+
+    Args:
+        page: fitz 页面
+        config: 阈值配置，默认 PAGE_FILTER_CONFIG
+
+    Returns:
+        {'kind': 'content' | 'blank' | 'image_only', 'text_chars', 'ink_ratio', 'std', 'edge_density',
+         'image_coverage', 'image_xref', 'thumbnail_pixels'}
+    """
+    config = config or PAGE_FILTER_CONFIG
+    text_chars = len(''.join(page.get_text("text").split()))
+    result = {
+        'kind': CONTENT, 'text_chars': text_chars, 'ink_ratio': None, 'std': None,
+        'edge_density': None, 'image_coverage': 0.0, 'image_xref': None, 'thumbnail_pixels': 0
+    }
+    if text_chars >= config["min_text_chars"]:
+        return result
+
+    zoom = config["thumbnail_size"] / max(page.rect.width, page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    background = float(np.median(gray))
+    ink_ratio = float(np.mean(np.abs(gray.astype(np.int16) - background) > 40))
+    std = float(gray.std())
+    edge_density = float(np.count_nonzero(cv2.Canny(gray, 50, 150))) / gray.size
+    result.update(ink_ratio=ink_ratio, std=std, edge_density=edge_density, thumbnail_pixels=int(gray.size))
+
+    if (ink_ratio < config["blank_ink_ratio"] and edge_density < config["blank_edge_density"]
+            and std < config["blank_std"]):
+        result['kind'] = BLANK
+        return result
+
+    if text_chars == 0:
+        image = _largest_image(page)
+        result.update(image_coverage=image['coverage'], image_xref=image['xref'])
+        if (image['coverage'] >= config["image_coverage"] and ink_ratio >= config["image_min_ink_ratio"]
+                and edge_density < config["image_max_edge_density"]):
+            result['kind'] = IMAGE_ONLY
+    return result
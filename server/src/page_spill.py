@@ -0,0 +1,226 @@
+"""
+逐页结果落盘 - 大文档流式处理时不在内存中累积整篇的 texts/figures/tables
+
+处理时每页结果追加为 pages.jsonl 的一行 {'page', 'texts', 'figures', 'tables'}（写在任务输出目录，
+随图表产物一起保留）。流式处理的结果字典只含汇总字段，原 texts/figures/tables 的位置是
+'spill': {'path', 'pages', 'texts', 'figures', 'tables'}。
+iter_result_json 逐页读回该文件、按块生成与普通结果完全相同的JSON（可按 fields 选择字段），
+写入结果库与HTTP响应都逐块输出，内存占用只取决于单页结果大小，与页数无关。
+同一页可在之后的处理轮次（如整篇兜底直扫）再次追加记录；文件按页码递增的轮次（runs）记录，
+按页合并文本时逐轮归并，每页只输出一次且按页码排序，与普通结果的 page_text 一致。
+"""
+
+import heapq
+import json
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import STREAMING_CONFIG
+
+SPILL_NAME = "pages.jsonl"
+ITEM_FIELDS = ('texts', 'figures', 'tables')
+
+
+def _json_default(value: Any):
+    """numpy标量/数组、Path 等非JSON类型"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class PageSpill:
+    """逐页结果写入器（上下文管理器）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'wb')
+        self.counts = {'pages': 0, 'texts': 0, 'figures': 0, 'tables': 0}
+        self.has_text = False
+        # 页码递增的处理轮次数（页码回退时开始新一轮）
+        self.runs = 0
+        self._last_page: Optional[int] = None
+
+    def append(self, page: int, texts: Iterable[Dict] = (), figures: Iterable[Dict] = (),
+               tables: Iterable[Dict] = ()):
+        """追加一页结果（同一页可多次追加，如整篇兜底直扫补充的文本）"""
+        record = {'page': page, 'texts': list(texts), 'figures': list(figures), 'tables': list(tables)}
+        line = json.dumps(record, ensure_ascii=False, default=_json_default) + "\n"
+        self._file.write(line.encode('utf-8'))
+        if self._last_page is None or page < self._last_page:
+            self.runs += 1
+        self._last_page = page
+        self.counts['pages'] += 1
+        for field in ITEM_FIELDS:
+            self.counts[field] += len(record[field])
+        if not self.has_text:
+            self.has_text = any((t.get('text') or '').strip() for t in record['texts'])
+
+    def info(self) -> Dict:
+        """结果字典中的 'spill' 字段"""
+        return {'path': str(self.path), **self.counts, 'runs': self.runs}
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def is_spilled(result: Any) -> bool:
+    """结果是否为逐页落盘的流式结果"""
+    return isinstance(result, dict) and isinstance(result.get('spill'), dict)
+
+
+def spill_available(result: Any) -> bool:
+    """流式结果的落盘文件是否仍存在（输出目录可能已被回收）"""
+    return is_spilled(result) and Path(result['spill']['path']).is_file()
+
+
+def read_pages(path) -> Iterator[Dict]:
+    """逐行读回落盘文件中的页面记录"""
+    with open(path, 'rb') as f:
+        for raw in f:
+            if raw.strip():
+                yield json.loads(raw)
+
+
+def iter_pages(result: Dict) -> Iterator[Dict]:
+    """逐页读回流式结果"""
+    return read_pages(result['spill']['path'])
+
+
+def iter_items(path, field: str) -> Iterator[Dict]:
+    """逐条读回落盘文件中某个字段（texts/figures/tables）的条目"""
+    for record in read_pages(path):
+        yield from record.get(field) or []
+
+
+def _iter_run(path, run: int) -> Iterator[Dict]:
+    """落盘文件中第 run 轮（从0开始，页码递增）的页面记录"""
+    current, last_page = -1, None
+    for record in read_pages(path):
+        if last_page is None or record['page'] < last_page:
+            current += 1
+        last_page = record['page']
+        if current == run:
+            yield record
+        elif current > run:
+            break
+
+
+def _count_runs(path) -> int:
+    runs, last_page = 0, None
+    for record in read_pages(path):
+        if last_page is None or record['page'] < last_page:
+            runs += 1
+        last_page = record['page']
+    return runs
+
+
+def _merged_pages(result: Dict) -> Iterator[Dict]:
+    """按页合并文本（与 response_encoding 的 page_text 相同）：各轮记录按页码归并，同页文本按轮次先后拼接"""
+    path = result['spill']['path']
+    runs = result['spill'].get('runs')
+    if runs is None:
+        runs = _count_runs(path)
+    records = heapq.merge(*(_iter_run(path, run) for run in range(runs)), key=lambda record: record['page'])
+    for page, group in groupby(records, key=lambda record: record['page']):
+        texts = [t['text'] for record in group for t in record.get('texts') or [] if t.get('text')]
+        if texts:
+            yield {'page': page, 'text': "\n".join(texts)}
+
+
+def _fields(result: Dict, selection: Optional[Dict[str, Optional[List[str]]]]) -> Iterator[Tuple[str, Optional[List[str]]]]:
+    """要输出的 (字段, 子字段)：未选择时按结果字典的顺序，'spill' 处展开为 texts/figures/tables"""
+    if selection is None:
+        for key in result:
+            if key == 'spill':
+                for field in ITEM_FIELDS:
+                    yield field, None
+            else:
+                yield key, None
+        return
+    if 'status' in result:
+        yield 'status', None
+    for name, subfields in selection.items():
+        if name == 'status' or name == 'spill':
+            continue
+        if name in ITEM_FIELDS or name in ('page_text', 'text') or name in result:
+            yield name, subfields
+
+
+def iter_result_json(result: Dict, selection: Optional[Dict[str, Optional[List[str]]]] = None,
+                     separators: Tuple[str, str] = (',', ':'), chunk_bytes: Optional[int] = None) -> Iterator[bytes]:
+    """
+    增量生成流式结果的JSON（UTF-8字节块）
+
+    Args:
+        result: 流式结果字典（含 'spill'）
+        selection: 字段选择（response_encoding.parse_fields 的结果），None 时输出完整结果
+        separators: 同 json.dumps
+        chunk_bytes: 每块大小，默认 STREAMING_CONFIG["chunk_bytes"]
+    """
+    chunk_bytes = chunk_bytes or STREAMING_CONFIG.get("chunk_bytes", 256 * 1024)
+    item_sep, key_sep = separators
+
+    def dumps(value) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=separators, default=_json_default)
+
+    def value_parts(name: str, subfields: Optional[List[str]]) -> Iterator[str]:
+        if name in ITEM_FIELDS:
+            yield '['
+            first = True
+            for record in iter_pages(result):
+                for item in record.get(name) or []:
+                    if subfields is not None and isinstance(item, dict):
+                        item = {k: item.get(k) for k in subfields}
+                    yield dumps(item) if first else item_sep + dumps(item)
+                    first = False
+            yield ']'
+        elif name == 'page_text':
+            yield '['
+            for i, page in enumerate(_merged_pages(result)):
+                yield dumps(page) if i == 0 else item_sep + dumps(page)
+            yield ']'
+        elif name == 'text':
+            yield '"'
+            for i, page in enumerate(_merged_pages(result)):
+                # JSON字符串内容按页拼接，页间以换行分隔
+                yield dumps(page['text'])[1:-1] if i == 0 else '\\n' + dumps(page['text'])[1:-1]
+            yield '"'
+        else:
+            value = result[name]
+            if subfields is not None and isinstance(value, list):
+                value = [{k: item.get(k) for k in subfields} if isinstance(item, dict) else item for item in value]
+            yield dumps(value)
+
+    def parts() -> Iterator[str]:
+        yield '{'
+        for i, (name, subfields) in enumerate(_fields(result, selection)):
+            yield (item_sep if i else '') + dumps(name) + key_sep
+            yield from value_parts(name, subfields)
+        yield '}'
+
+    buffer: List[str] = []
+    size = 0
+    for part in parts():
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_bytes:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def load_result(result: Dict) -> Dict:
+    """把流式结果读回为普通结果字典（整篇载入内存，仅用于小文档或必须整体返回的场合）"""
+    if not is_spilled(result):
+        return result
+    return json.loads(b''.join(iter_result_json(result)))
@@ -5,16 +5,30 @@ PDF处理器 - 集成PDF解析、图像处理和内容提取功能
 import os
 import json
 import time
-import pickle
 import fitz
+import numpy as np
 from PIL import Image
 from loguru import logger
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from uuid import uuid4
 
-from .config import OUTPUT_DIR, PICKLES_DIR, IMAGE_CONFIG, PROMPTS, REMOTE_OCR_CONFIG
+from .config import (
+    IMAGE_CONFIG, ADAPTIVE_RESOLUTION_CONFIG, PAGE_FILTER_CONFIG, STREAMING_CONFIG, PAGE_DIFF_CONFIG, PROMPTS,
+    REMOTE_OCR_CONFIG
+)
 from .ocr_engine import OCREngine
+from .recognition_memo import PageRecognitionMemo
+from .page_cache import get_page_cache
+from .workspace import JobWorkspace
+from .metrics import stage
+from .result_store import get_result_store
+from .embedded_images import EmbeddedImageExtractor, page_to_pixel_scale
+from .adaptive_resolution import choose_page_resolution
+from .page_filter import classify_page, BLANK, IMAGE_ONLY
+from .page_spill import PageSpill, SPILL_NAME, is_spilled, iter_items
+from .processing_profile import ProcessingProfile, get_profile
+from .page_diff import find_previous, load_previous, page_content_hash
 try:
     from .llm_processor import LLMProcessor
 except Exception:
@@ -39,40 +53,40 @@ class PDFProcessor:
         
         # 服务器端只负责OCR，禁用所有LLM以避免延迟
         self.llm_processor = None
-        self.mode = "快速"
-        # 基础分辨率（可根据模式覆盖）
-        self.target_resolution = IMAGE_CONFIG["target_resolution"]
-        self.high_resolution = IMAGE_CONFIG["high_resolution"]
+        # 未显式传入 profile 时使用的默认配置档（分辨率、阈值等随配置档逐次传递，不保存在实例上）
+        self.profile = get_profile()
         
         # 服务端禁用远程OCR客户端，避免循环调用
         self.remote_client = None
 
+    @property
+    def mode(self) -> str:
+        return self.profile.mode
+    
     def set_mode(self, mode: str):
-        """设置解析模式：快速/精细"""
-        if mode not in ("快速", "精细"):
-            return
-        self.mode = mode
-        # 调整页面渲染分辨率
-        if mode == "快速":
-            self.target_resolution = max(960, int(IMAGE_CONFIG["target_resolution"] * 0.75))
-            self.high_resolution = max(1400, int(IMAGE_CONFIG["high_resolution"] * 0.8))
-        else:  # 精细
-            self.target_resolution = max(IMAGE_CONFIG["target_resolution"], 1536)
-            self.high_resolution = max(IMAGE_CONFIG["high_resolution"], 2200)
-        # 传递给OCR引擎
+        """设置默认解析模式：快速/精细（只影响未显式传入 profile 的调用；并发任务应逐次传入 profile）"""
         try:
-            if hasattr(self, 'ocr_engine') and hasattr(self.ocr_engine, 'set_mode'):
-                self.ocr_engine.set_mode(mode)
-        except Exception:
+            self.profile = get_profile(mode)
+        except ValueError:
             pass
         
-    def process_pdf(self, pdf_path: str, output_name: str = None) -> Dict:
+    def process_pdf(self, pdf_path: str, output_name: str = None,
+                    progress_callback: Optional[Callable[[Dict], None]] = None,
+                    streaming: bool = False, profile: Optional[ProcessingProfile] = None) -> Dict:
         """
         处理PDF文件
         
         Args:
             pdf_path: PDF文件路径
             output_name: 输出名称，如果为None则使用文件名
+            progress_callback: 进度回调（可选），每页完成后以 {'stage', 'pages_done', 'total_pages', 'page_result'} 调用，
+                               page_result 为该页的 texts/figures/tables，供流式接口逐页下发
+            streaming: 允许大文档流式处理（页数达到 STREAMING_CONFIG["min_pages"] 时生效）：
+                       逐页结果落盘，返回的结果以 'spill' 代替 texts/figures/tables（见 page_spill），
+                       调用方需能处理这种结果
+            profile: 本次处理的配置档（分辨率、布局/识别阈值等），默认 self.profile
+            
+        结果库中有同名文档以同一模式处理的上一版本时，内容未变化的页面直接复用其结果（见 page_diff）。
             
         Returns:
             处理结果字典
@@ -100,16 +114,19 @@ class PDFProcessor:
                     return {'status': 'error', 'message': str(e)}
         
         # 本地OCR处理
+        profile = profile or self.profile
         try:
-            # 创建输出目录
-            output_path = OUTPUT_DIR / output_name
-            output_path.mkdir(exist_ok=True)
-            
-            # 处理PDF
-            result = self._process_pdf_pages(pdf_path, output_path, output_name)
-            
-            # 清理临时文件
-            self._cleanup_temp_files(output_path)
+            # 每个任务独立的工作目录，结束时只保留结果引用的图表裁剪
+            with JobWorkspace(output_name) as workspace:
+                result = self._process_pdf_pages(pdf_path, workspace.path, workspace.name, progress_callback,
+                                                 workspace if streaming else None, profile,
+                                                 find_previous(output_name, profile.mode))
+                if result.get('status') == 'success':
+                    if not is_spilled(result):
+                        workspace.keep_items(result['figures'] + result['tables'])
+                    result['output_path'] = str(workspace.output_dir)
+                    # 保存到结果库（文档名与模式供下次更新时查找上一版本）
+                    self._save_result(result, workspace.name, {'name': output_name, 'mode': profile.mode})
             
             return result
             
@@ -117,22 +134,78 @@ class PDFProcessor:
             logger.error(f"PDF处理失败: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def _process_pdf_pages(self, pdf_path: str, output_path: Path, output_name: str) -> Dict:
-        """处理PDF的每一页"""
+    def _process_pdf_pages(self, pdf_path: str, output_path: Path, output_name: str,
+                           progress_callback: Optional[Callable[[Dict], None]] = None,
+                           workspace: Optional[JobWorkspace] = None,
+                           profile: Optional[ProcessingProfile] = None,
+                           previous_id: Optional[str] = None) -> Dict:
+        """
+        处理PDF的每一页（提供 workspace 且页数达到阈值时按页窗口流式处理，逐页结果落盘；
+        previous_id 为结果库中上一版本的id，内容哈希未变化的页面复用其结果）
+        """
+        profile = profile or self.profile
+        spill = None
         try:
             with fitz.open(pdf_path) as pdf:
                 total_pages = pdf.page_count
                 all_texts = []
                 all_figures = []
                 all_tables = []
+                # 流式处理：每页结果写入落盘文件后清空，上面三个列表只保存当前页
+                spill = self._open_spill(workspace, total_pages)
+                window_pages = max(1, int(STREAMING_CONFIG.get("window_pages", 16)))
+                # 页面识别备忘录：同页同分辨率只渲染/直扫一次，各回退路径共享
+                memo = PageRecognitionMemo()
+                # 嵌入图片提取器：图表优先无损导出原始图片，整篇按xref/摘要去重
+                images = None
+                if IMAGE_CONFIG.get("embedded_images", True):
+                    images = EmbeddedImageExtractor(
+                        pdf, output_path, min_iou=IMAGE_CONFIG.get("embedded_min_iou", 0.7)
+                    )
+                cache_hits = 0
+                # 预筛跳过的页面（空白页、图片页）
+                skipped_pages: Dict[int, str] = {}
+                # 页面内容哈希，与上一版本比对后只识别变化或新增的页面：
+                # 有上一版本时整篇预先计算；否则逐页处理时计算，写入结果供下一版本比对
+                diff_enabled = PAGE_DIFF_CONFIG.get("enabled", False)
+                previous = load_previous(previous_id, pdf) if diff_enabled and previous_id else None
+                hashes = list(previous.hashes) if previous is not None else ([] if diff_enabled else None)
+                reused_pages = 0
+                if previous is not None:
+                    logger.info(f"上一版本 {previous.doc_id} 中有 {len(previous)} 个内容相同的页面可复用")
                 
                 logger.info(f"开始处理PDF: {pdf_path}, 共{total_pages}页")
+                self._report_progress(progress_callback, {
+                    'stage': 'pages', 'pages_done': 0, 'total_pages': total_pages
+                })
                 
                 for page_num in range(total_pages):
                     page = pdf[page_num]
+                    page_start = (len(all_texts), len(all_figures), len(all_tables))
                     
-                    # 处理单页
-                    page_result = self._process_single_page(page, page_num, output_path)
+                    # 内容未变化的页面直接复用上一版本的结果
+                    page_result = None
+                    if previous is not None:
+                        page_result = previous.reuse(hashes[page_num], page_num, output_path)
+                    elif hashes is not None:
+                        hashes.append(page_content_hash(page))
+                    if page_result is not None:
+                        reused_pages += 1
+                        if page_result['skipped']:
+                            skipped_pages[page_num] = page_result['skipped']
+                    else:
+                        # 预筛：空白页直接跳过，图片页只导出图片、跳过识别
+                        skip_kind = self._prefilter_page(page, memo)
+                        if skip_kind:
+                            skipped_pages[page_num] = skip_kind
+                            page_result = self._skipped_page_result(page, page_num, skip_kind, images)
+                        else:
+                            # 处理单页
+                            page_result = self._process_single_page(
+                                page, page_num, output_path, memo, images, profile
+                            )
+                    if page_result.get('cache_hit'):
+                        cache_hits += 1
                     
                     # 无论状态如何，都尝试提取文本
                     if page_result['status'] == 'success':
@@ -141,14 +214,10 @@ class PDFProcessor:
                         all_tables.extend(page_result['tables'])
                     else:
                         # 静默处理失败页面
-                        # 强制提取文本，即使处理失败
+                        # 强制提取文本，即使处理失败（L1：标准分辨率直扫，已直扫过则复用）
                         try:
-                            # 生成标准分辨率图像
-                            standard_image_path = self._generate_page_image(
-                                page, page_num, output_path, IMAGE_CONFIG["target_resolution"]
-                            )
-                            # 直接OCR整个页面（返回为列表[{text, bbox, ...}]）
-                            direct_texts = self.ocr_engine.extract_text_direct(standard_image_path)
+                            resolution = memo.resolution(page_num, lambda: profile.target_resolution)
+                            direct_texts = self._direct_scan(page, page_num, output_path, resolution, memo, profile)
                             if direct_texts:
                                 merged_text = "\n".join([t.get('text', '') for t in direct_texts if t.get('text')])
                                 if merged_text.strip():
@@ -167,45 +236,113 @@ class PDFProcessor:
                         except Exception as e:
                             logger.error(f"第{page_num + 1}页强制提取出错: {e}")
                     
-                    # 进度更新（减少日志输出）
+                    page_items = {
+                        'texts': all_texts[page_start[0]:],
+                        'figures': all_figures[page_start[1]:],
+                        'tables': all_tables[page_start[2]:]
+                    }
+                    if spill is not None:
+                        # 图表产物先移入输出目录，落盘的是最终路径
+                        workspace.keep_items(page_items['figures'] + page_items['tables'])
+                        spill.append(page_num + 1, **page_items)
+                        all_texts.clear()
+                        all_figures.clear()
+                        all_tables.clear()
+                    
+                    # 进度更新（附带本页结果，减少日志输出）
+                    self._report_progress(progress_callback, {
+                        'stage': 'pages', 'pages_done': page_num + 1, 'total_pages': total_pages,
+                        'page_result': {'page': page_num + 1, **page_items}
+                    })
+                    if spill is not None and (page_num + 1) % window_pages == 0:
+                        self._release_window(memo, page_num + 1)
                     progress = (page_num + 1) / total_pages * 100
                     if progress % 20 == 0 or progress == 100:  # 只在20%、40%、60%、80%、100%时输出
                         logger.info(f"处理进度: {progress:.1f}%")
 
-                # 兜底策略：若整篇未提取到任何文本，逐页以高分辨率直接OCR一次
-                if not any((t.get('text') or '').strip() for t in all_texts):
+                # 兜底策略（L2）：若整篇未提取到任何文本，逐页以高分辨率直接OCR一次（已高清直扫过的页复用结果）
+                has_text = spill.has_text if spill is not None else any(
+                    (t.get('text') or '').strip() for t in all_texts
+                )
+                if not has_text:
                     logger.warning("整篇未提取到文本，执行兜底直扫(高分辨率)...")
+                    self._report_progress(progress_callback, {'stage': 'fallback'})
                     for page_num in range(total_pages):
+                        if page_num in skipped_pages:
+                            continue
                         page = pdf[page_num]
                         try:
-                            direct_img_path = self._generate_page_image(
-                                page, page_num, output_path, IMAGE_CONFIG["high_resolution"]
+                            direct_texts = self._direct_scan(
+                                page, page_num, output_path, profile.high_resolution, memo, profile
                             )
-                            direct_texts = self.ocr_engine.extract_text_direct(direct_img_path)
                             if direct_texts:
                                 merged = "\n".join([t['text'] for t in direct_texts if t.get('text')])
                                 if merged.strip():
-                                    all_texts.append({
+                                    text_item = {
                                         'page': page_num + 1,
                                         'text': merged,
                                         'bbox': None,
                                         'category': 'text',
                                         'confidence': 0.7
-                                    })
+                                    }
+                                    if spill is not None:
+                                        spill.append(page_num + 1, texts=[text_item])
+                                    else:
+                                        all_texts.append(text_item)
                         except Exception as e:
                             logger.error(f"兜底直扫失败(第{page_num+1}页): {e}")
+                        if spill is not None and (page_num + 1) % window_pages == 0:
+                            self._release_window(memo, page_num + 1)
                 
-                # 生成摘要和关键词
-                summary_result = self._generate_summary(all_texts)
+                ocr_passes = memo.pass_counts()
+                max_passes = max((p['total'] for p in ocr_passes), default=0)
+                logger.info(f"OCR识别次数统计: 共{sum(p['total'] for p in ocr_passes)}次，单页最多{max_passes}次")
+                page_cache_stats = {
+                    'hits': cache_hits,
+                    'misses': total_pages - cache_hits,
+                    'hit_ratio': round(cache_hits / total_pages, 4) if total_pages else 0.0
+                }
+                if cache_hits:
+                    logger.info(f"页面缓存命中 {cache_hits}/{total_pages} 页")
+                page_filter_stats = {
+                    'blank': sum(1 for kind in skipped_pages.values() if kind == BLANK),
+                    'image_only': sum(1 for kind in skipped_pages.values() if kind == IMAGE_ONLY),
+                    'skipped': [{'page': n + 1, 'kind': kind} for n, kind in sorted(skipped_pages.items())]
+                }
+                if skipped_pages:
+                    logger.info(
+                        f"预筛跳过 {len(skipped_pages)}/{total_pages} 页"
+                        f"（空白 {page_filter_stats['blank']}，图片 {page_filter_stats['image_only']}）"
+                    )
+                logger.info(f"渲染像素: {memo.pixels_rendered / 1e6:.1f}MP（{total_pages}页）")
+                if previous is not None:
+                    logger.info(f"按页差异重处理: 复用 {reused_pages} 页，重新识别 {total_pages - reused_pages} 页")
+                if images and (images.stats['extracted'] or images.stats['reused']):
+                    logger.info(
+                        f"嵌入图片直接导出 {images.stats['extracted']} 张（复用 {images.stats['reused']} 次，"
+                        f"{images.stats['bytes'] / 1024:.0f}KB）"
+                    )
+                
+                # 生成摘要和关键词（流式处理时从落盘文件逐条读回文本）
+                if spill is not None:
+                    spill.close()
+                    workspace.keep(spill.path)
+                    logger.info(
+                        f"流式处理完成: {spill.counts['texts']} 个文本区域、{spill.counts['figures']} 个图、"
+                        f"{spill.counts['tables']} 个表已落盘（{spill.path.stat().st_size / 1024 / 1024:.1f}MB）"
+                    )
+                    items = {'spill': spill.info()}
+                    summary_result = self._generate_summary(iter_items(spill.path, 'texts'))
+                else:
+                    items = {'texts': all_texts, 'figures': all_figures, 'tables': all_tables}
+                    summary_result = self._generate_summary(all_texts)
                 
                 # 保存结果
                 result = {
                     'status': 'success',
                     'output_path': str(output_path),
                     'total_pages': total_pages,
-                    'texts': all_texts,
-                    'figures': all_figures,
-                    'tables': all_tables,
+                    **items,
                     'summary': summary_result.get('summary', ''),
                     'keywords': summary_result.get('keywords', []),
                     'hybrid_summary': summary_result.get('hybrid_summary', ''),
@@ -214,36 +351,103 @@ class PDFProcessor:
                     'categories': summary_result.get('categories', []),
                     'category_descriptions': summary_result.get('category_descriptions', {}),
                     'category_confidence': summary_result.get('category_confidence', 0.0),
-                    'tags': summary_result.get('tags', [])
+                    'tags': summary_result.get('tags', []),
+                    'ocr_passes': ocr_passes,
+                    'page_cache': page_cache_stats,
+                    'page_filter': page_filter_stats,
+                    'pixels_rendered': memo.pixels_rendered
                 }
-                
-                # 保存到pickle文件
-                self._save_to_pickle(result, output_name)
+                if hashes is not None:
+                    result['page_hashes'] = hashes
+                    result['page_diff'] = {
+                        'previous': previous.doc_id if previous else None,
+                        'reused': reused_pages,
+                        'recomputed': total_pages - reused_pages
+                    }
                 
                 return result
                 
         except Exception as e:
             logger.error(f"PDF页面处理失败: {e}")
             return {'status': 'error', 'message': str(e)}
+        finally:
+            if spill is not None:
+                spill.close()
+    
+    @staticmethod
+    def _open_spill(workspace: Optional[JobWorkspace], total_pages: int) -> Optional[PageSpill]:
+        """页数达到阈值时在任务输出目录创建逐页落盘文件；不满足流式处理条件时返回None"""
+        if workspace is None or not STREAMING_CONFIG.get("enabled", False):
+            return None
+        if total_pages < STREAMING_CONFIG.get("min_pages", 200):
+            return None
+        logger.info(f"大文档流式处理: 共{total_pages}页，每{STREAMING_CONFIG.get('window_pages', 16)}页释放一次中间结果")
+        return PageSpill(workspace.output_dir / SPILL_NAME)
+    
+    @staticmethod
+    def _release_window(memo: PageRecognitionMemo, before_page: int):
+        """流式处理一个页窗口结束：删除已处理页的渲染图，释放直扫结果与MuPDF资源缓存"""
+        for path in memo.release(before_page):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        fitz.TOOLS.store_shrink(100)
+    
+    @staticmethod
+    def _report_progress(progress_callback: Optional[Callable[[Dict], None]], info: Dict):
+        """回报处理进度，回调异常不影响处理"""
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(info)
+        except Exception as e:
+            logger.warning(f"进度回调失败: {e}")
     
-    def _process_single_page(self, page, page_num: int, output_path: Path) -> Dict:
-        """处理单页PDF"""
+    def _process_single_page(self, page, page_num: int, output_path: Path,
+                             memo: Optional[PageRecognitionMemo] = None,
+                             images: Optional[EmbeddedImageExtractor] = None,
+                             profile: Optional[ProcessingProfile] = None) -> Dict:
+        """处理单页PDF（images 提供时图表优先导出嵌入图片）"""
+        if memo is None:
+            memo = PageRecognitionMemo()
+        profile = profile or self.profile
         try:
             # 获取页面信息
             page_type = 'H' if page.rect.width > page.rect.height else 'S'
+            fine_mode = profile.fine
             
-            # 生成不同分辨率的图像
-            standard_image_path = self._generate_page_image(
-                page, page_num, output_path, self.target_resolution
-            )
-            high_image_path = ""
-            if getattr(self, 'mode', '快速') == '精细':
-                high_image_path = self._generate_page_image(
-                    page, page_num, output_path, self.high_resolution
-                )
+            # 生成该页标准分辨率图像（自适应时按字号选择；高分辨率仅用于区域重渲染）
+            resolution = memo.resolution(page_num, lambda: self._choose_resolution(page, memo, profile))
+            standard_image_path = self._page_image(page, page_num, output_path, resolution, memo)
             
-            # OCR处理
-            ocr_result = self.ocr_engine.process_page(standard_image_path)
+            # 跨文档页面缓存：命中则跳过布局检测与文字识别
+            page_cache = get_page_cache()
+            cache_key = None
+            cached = None
+            if page_cache and standard_image_path:
+                try:
+                    cache_key = page_cache.make_key(standard_image_path, f"{profile.mode}:{resolution}")
+                    cached = page_cache.get(cache_key)
+                except Exception as _e:
+                    logger.warning(f"页面缓存读取失败: 第{page_num + 1}页: {_e}")
+            
+            if cached is not None:
+                ocr_result = {
+                    'text_regions': cached.get('texts', []),
+                    'figure_regions': [{'bbox': bbox} for bbox in cached.get('figures', [])],
+                    'table_regions': [{'bbox': bbox} for bbox in cached.get('tables', [])]
+                }
+            else:
+                # OCR处理（L0 区域识别；区域不足时的L1直扫经备忘录执行）
+                memo.count_region_pass(page_num, resolution)
+                ocr_result = self.ocr_engine.process_page(
+                    standard_image_path,
+                    direct_scan=lambda: self._direct_scan(page, page_num, output_path, resolution, memo, profile),
+                    profile=profile
+                )
+                # 识别置信度偏低的文本区域按高分辨率只重渲染该区域
+                self._escalate_regions(page, page_num, ocr_result['text_regions'], resolution, memo, profile)
             
             # 处理文本区域
             texts = []
@@ -256,26 +460,40 @@ class PDFProcessor:
                     'confidence': text_region['confidence']
                 })
             
-            # 处理图片区域
+            # 区域坐标为标准分辨率图像上的像素坐标
+            scale = page_to_pixel_scale(page, resolution)
+            
+            # 处理图片区域：嵌入图片直接导出；矢量图表快速模式裁剪标准图像，精细模式按高分辨率只渲染该区域
             figures = []
             for fig_region in ocr_result['figure_regions']:
-                figure_path = self._extract_figure(
-                    high_image_path or standard_image_path, fig_region['bbox'], output_path, f"fig_{page_num + 1}"
-                )
+                name = f"fig_{page_num + 1}"
+                figure_path = images.extract_region(page, fig_region['bbox'], scale, name) if images else None
+                source = 'embedded'
+                if figure_path is None:
+                    source = 'render'
+                    if fine_mode:
+                        figure_path = self._render_region(page, fig_region['bbox'], scale, profile.high_resolution,
+                                                          output_path, name, memo)
+                    else:
+                        figure_path = self._extract_figure(standard_image_path, fig_region['bbox'], output_path, name)
                 if figure_path:
                     figures.append({
                         'page': page_num + 1,
                         'path': str(figure_path),
                         'bbox': fig_region['bbox'],
-                        'category': 'figure'
+                        'category': 'figure',
+                        'source': source
                     })
             
             # 处理表格区域
             tables = []
             for table_region in ocr_result['table_regions']:
-                table_path = self._extract_table(
-                    high_image_path or standard_image_path, table_region['bbox'], output_path, f"table_{page_num + 1}"
-                )
+                name = f"table_{page_num + 1}"
+                if fine_mode:
+                    table_path = self._render_region(page, table_region['bbox'], scale, profile.high_resolution,
+                                                     output_path, name, memo)
+                else:
+                    table_path = self._extract_table(standard_image_path, table_region['bbox'], output_path, name)
                 if table_path:
                     tables.append({
                         'page': page_num + 1,
@@ -284,11 +502,11 @@ class PDFProcessor:
                         'category': 'table'
                     })
             
-            # 若未识别到文本，进行一次直扫补救（标准或高分辨率）
-            if not texts:
+            # 若未识别到文本，进行一次直扫补救（快速模式L1，精细模式L2；已直扫过则复用）
+            if not texts and cached is None:
                 try:
-                    fallback_image = high_image_path or standard_image_path
-                    direct_texts = self.ocr_engine.extract_text_direct(fallback_image)
+                    rescue_resolution = profile.high_resolution if fine_mode else resolution
+                    direct_texts = self._direct_scan(page, page_num, output_path, rescue_resolution, memo, profile)
                     if direct_texts:
                         merged = "\n".join([t.get('text', '') for t in direct_texts if t.get('text')])
                         if merged.strip():
@@ -302,12 +520,20 @@ class PDFProcessor:
                             logger.info(f"单页直扫补救提取到文本: 第{page_num + 1}页")
                 except Exception as _e:
                     logger.warning(f"单页直扫补救失败: 第{page_num + 1}页: {_e}")
+            
+            if cache_key and cached is None:
+                page_cache.put(cache_key, {
+                    'texts': [{k: t[k] for k in ('text', 'bbox', 'category', 'confidence')} for t in texts],
+                    'figures': [r['bbox'] for r in ocr_result['figure_regions']],
+                    'tables': [r['bbox'] for r in ocr_result['table_regions']]
+                })
 
             return {
                 'status': 'success',
                 'texts': texts,
                 'figures': figures,
-                'tables': tables
+                'tables': tables,
+                'cache_hit': cached is not None
             }
             
         except Exception as e:
@@ -316,21 +542,130 @@ class PDFProcessor:
                 'status': 'error',
                 'texts': [],
                 'figures': [],
-                'tables': []
+                'tables': [],
+                'cache_hit': False
             }
     
-    def _generate_page_image(self, page, page_num: int, output_path: Path, target_size: int) -> str:
+    def _page_image(self, page, page_num: int, output_path: Path, target_size: int,
+                    memo: PageRecognitionMemo) -> str:
+        """获取页面图像（经备忘录，同页同分辨率只渲染一次）"""
+        return memo.image(
+            page_num, target_size,
+            lambda: self._generate_page_image(page, page_num, output_path, target_size, memo)
+        )
+    
+    def _direct_scan(self, page, page_num: int, output_path: Path, target_size: int,
+                     memo: PageRecognitionMemo, profile: Optional[ProcessingProfile] = None) -> List[Dict]:
+        """整页直扫（经备忘录，同页同分辨率只识别一次）"""
+        def compute():
+            image_path = self._page_image(page, page_num, output_path, target_size, memo)
+            if not image_path:
+                return []
+            return self.ocr_engine.extract_text_direct(image_path, profile=profile or self.profile)
+        return memo.direct(page_num, target_size, compute)
+    
+    def _prefilter_page(self, page, memo: PageRecognitionMemo) -> Optional[str]:
+        """预筛页面，返回跳过类型（blank / image_only）；需要正常处理时返回None"""
+        if not PAGE_FILTER_CONFIG.get("enabled", False):
+            return None
+        try:
+            with stage('render'):
+                verdict = classify_page(page, PAGE_FILTER_CONFIG)
+        except Exception as e:
+            logger.warning(f"页面预筛失败: 第{page.number + 1}页: {e}")
+            return None
+        memo.add_pixels(verdict['thumbnail_pixels'])
+        if verdict['kind'] == BLANK:
+            return BLANK
+        if verdict['kind'] == IMAGE_ONLY and PAGE_FILTER_CONFIG.get("skip_image_only", True):
+            return IMAGE_ONLY
+        return None
+    
+    @staticmethod
+    def _skipped_page_result(page, page_num: int, kind: str,
+                             images: Optional[EmbeddedImageExtractor]) -> Dict:
+        """预筛跳过的页面结果：图片页导出覆盖整页的嵌入图片作为图表"""
+        figures = []
+        if kind == IMAGE_ONLY and images is not None:
+            xref = max(images.placements(page), key=lambda p: p[1].width * p[1].height, default=(None, None))[0]
+            figure_path = images.extract(xref, f"fig_{page_num + 1}") if xref else None
+            if figure_path:
+                figures.append({
+                    'page': page_num + 1,
+                    'path': figure_path,
+                    'bbox': None,
+                    'category': 'figure',
+                    'source': 'embedded'
+                })
+        return {
+            'status': 'success',
+            'texts': [],
+            'figures': figures,
+            'tables': [],
+            'cache_hit': False
+        }
+    
+    def _choose_resolution(self, page, memo: PageRecognitionMemo, profile: ProcessingProfile) -> int:
+        """按低分辨率预览估计的字号选择该页分辨率；未启用自适应时使用配置档的标准分辨率"""
+        config = ADAPTIVE_RESOLUTION_CONFIG
+        if not config.get("enabled", False):
+            return profile.target_resolution
+        try:
+            with stage('render'):
+                choice = choose_page_resolution(
+                    page, profile.target_char_px, config["min_resolution"],
+                    min(config["max_resolution"], profile.high_resolution), config["probe_size"], config["min_chars"]
+                )
+        except Exception as e:
+            logger.warning(f"自适应分辨率估计失败: 第{page.number + 1}页: {e}")
+            return profile.target_resolution
+        memo.add_pixels(choice['probe_pixels'])
+        return choice['resolution']
+    
+    def _escalate_regions(self, page, page_num: int, text_regions: List[Dict], resolution: int,
+                          memo: PageRecognitionMemo, profile: ProcessingProfile):
+        """平均识别置信度低于阈值的文本区域，按 high_resolution 渲染该区域后重新识别，结果更可信时替换"""
+        config = ADAPTIVE_RESOLUTION_CONFIG
+        threshold = config.get("escalate_confidence", 0.0)
+        if not config.get("enabled", False) or profile.high_resolution < resolution * 1.25:
+            return
+        candidates = [r for r in text_regions if r.get('bbox') and r.get('ocr_confidence', 1.0) < threshold]
+        candidates.sort(key=lambda r: r['ocr_confidence'])
+        scale = page_to_pixel_scale(page, resolution)
+        zoom = page_to_pixel_scale(page, profile.high_resolution)
+        crops = 0
+        for region in candidates[:config.get("escalate_max_regions", 8)]:
+            try:
+                x0, y0 = page.rect.x0, page.rect.y0
+                bbox = region['bbox']
+                clip = fitz.Rect(bbox[0] / scale + x0, bbox[1] / scale + y0, bbox[2] / scale + x0, bbox[3] / scale + y0)
+                with stage('render'):
+                    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip & page.rect, alpha=False)
+                memo.add_pixels(pix.width * pix.height)
+                crops += 1
+                # RGB -> BGR
+                image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride // pix.n, pix.n)
+                image = np.ascontiguousarray(image[:, :pix.width, ::-1])
+                text, confidence = self.ocr_engine.recognize_region(image, profile=profile)
+                if text.strip() and confidence > region['ocr_confidence']:
+                    region['text'], region['ocr_confidence'] = text, confidence
+            except Exception as e:
+                logger.warning(f"区域高分辨率重识别失败: 第{page_num + 1}页: {e}")
+        memo.count_region_crops(page_num, profile.high_resolution, crops)
+    
+    @stage('render')
+    def _generate_page_image(self, page, page_num: int, output_path: Path, target_size: int,
+                             memo: Optional[PageRecognitionMemo] = None) -> str:
         """生成页面图像"""
         try:
             # 计算缩放比例
-            if page.rect.width > page.rect.height:
-                scale = target_size / page.rect.width
-            else:
-                scale = target_size / page.rect.height
+            scale = page_to_pixel_scale(page, target_size)
             
             # 生成图像
             matrix = fitz.Matrix(scale, scale)
             pix = page.get_pixmap(matrix=matrix, alpha=False)
+            if memo is not None:
+                memo.add_pixels(pix.width * pix.height)
             
             # 保存图像
             image_path = output_path / f"page_{page_num + 1}_{target_size}.jpg"
@@ -342,6 +677,28 @@ class PDFProcessor:
             logger.error(f"生成页面图像失败: {e}")
             return ""
     
+    @stage('render')
+    def _render_region(self, page, bbox: List[int], scale: float, target_size: int, output_path: Path, name: str,
+                       memo: Optional[PageRecognitionMemo] = None) -> Optional[Path]:
+        """按高分辨率 target_size 只渲染区域（bbox 为按 scale 渲染的标准图像上的像素坐标）"""
+        try:
+            x0, y0 = page.rect.x0, page.rect.y0
+            clip = fitz.Rect(bbox[0] / scale + x0, bbox[1] / scale + y0, bbox[2] / scale + x0, bbox[3] / scale + y0)
+            zoom = page_to_pixel_scale(page, target_size)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip & page.rect, alpha=False)
+            if memo is not None:
+                memo.add_pixels(pix.width * pix.height)
+            
+            region_path = output_path / f"{name}.png"
+            pix.save(str(region_path))
+            
+            return region_path
+            
+        except Exception as e:
+            logger.error(f"渲染区域失败: {e}")
+            return None
+    
+    @stage('crop')
     def _extract_figure(self, image_path: str, bbox: List[int], output_path: Path, name: str) -> Optional[Path]:
         """提取图片区域"""
         try:
@@ -357,6 +714,7 @@ class PDFProcessor:
             logger.error(f"提取图片失败: {e}")
             return None
     
+    @stage('crop')
     def _extract_table(self, image_path: str, bbox: List[int], output_path: Path, name: str) -> Optional[Path]:
         """提取表格区域"""
         try:
@@ -372,13 +730,11 @@ class PDFProcessor:
             logger.error(f"提取表格失败: {e}")
             return None
     
-    def _generate_summary(self, texts: List[Dict]) -> Dict:
+    def _generate_summary(self, texts: Iterable[Dict]) -> Dict:
         """生成内容摘要"""
         try:
-            # 合并所有文本
-            all_text = "\n".join([text['text'] for text in texts])
-            
-            if not all_text.strip():
+            # 是否有文本内容（texts 可为逐条读回的迭代器，不整篇合并）
+            if not any((text.get('text') or '').strip() for text in texts):
                 return {
                     'summary': '文档内容为空',
                     'keywords': [],
@@ -430,40 +786,17 @@ class PDFProcessor:
                 'tags': []
             }
     
-    def _save_to_pickle(self, result: Dict, output_name: str):
-        """保存结果到pickle文件"""
-        try:
-            pickle_path = PICKLES_DIR / output_name
-            pickle_path.mkdir(exist_ok=True)
-            
-            # 保存主要结果
-            with open(pickle_path / "result.pkl", 'wb') as f:
-                pickle.dump(result, f)
-            
-            # 保存文本向量（如果需要）
-            if result['texts']:
-                texts = [text['text'] for text in result['texts']]
-                # 这里可以添加向量化逻辑
-                with open(pickle_path / "texts.pkl", 'wb') as f:
-                    pickle.dump(texts, f)
-            
-            logger.info(f"结果已保存到: {pickle_path}")
-            
-        except Exception as e:
-            logger.error(f"保存pickle文件失败: {e}")
-    
-    def _cleanup_temp_files(self, output_path: Path):
-        """清理临时文件"""
+    @stage('save')
+    def _save_result(self, result: Dict, output_name: str, meta: Optional[Dict] = None):
+        """保存结果到结果库（meta 写入清单条目）"""
+        store = get_result_store()
+        if store is None:
+            return
         try:
-            # 删除临时图像文件
-            for temp_file in output_path.glob("*.jpg"):
-                if "temp" in temp_file.name:
-                    temp_file.unlink()
-            
-            logger.info("临时文件清理完成")
-            
+            entry = store.put(output_name, result, meta)
+            logger.info(f"结果已保存到结果库: {output_name}（{entry['segment']}）")
         except Exception as e:
-            logger.error(f"清理临时文件失败: {e}")
+            logger.error(f"保存结果失败: {e}")
     
     def batch_process(self, pdf_dir: str, output_base_name: str = None) -> List[Dict]:
         """
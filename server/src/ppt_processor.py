@@ -6,7 +6,6 @@ PPT处理器 - 集成PPT/PPTX解析和内容提取功能
 import os
 import json
 import time
-import pickle
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
@@ -27,7 +26,11 @@ except ImportError:
     PPT_AVAILABLE = False
     logger.warning("pywin32库未安装，PPT文件处理功能将不可用")
 
-from .config import OUTPUT_DIR, PICKLES_DIR, PROMPTS
+from .config import PROMPTS
+from .processing_profile import ProcessingProfile
+from .workspace import JobWorkspace
+from .metrics import stage
+from .result_store import get_result_store
 from .ocr_engine import OCREngine
 try:
     from .llm_processor import LLMProcessor
@@ -67,13 +70,15 @@ class PPTProcessor:
         file_ext = Path(file_path).suffix.lower()
         return file_ext in self.supported_formats
     
-    def process_ppt(self, ppt_path: str, output_name: str = None) -> Dict:
+    def process_ppt(self, ppt_path: str, output_name: str = None,
+                    profile: Optional[ProcessingProfile] = None) -> Dict:
         """
         处理PPT文件
         
         Args:
             ppt_path: PPT文件路径
             output_name: 输出名称，如果为None则使用文件名
+            profile: 处理配置档（ProcessingProfile），用于幻灯片图片的OCR；None 时使用引擎的默认配置档
             
         Returns:
             处理结果字典
@@ -88,15 +93,12 @@ class PPTProcessor:
             return {'status': 'error', 'message': f'不支持的文件格式: {Path(ppt_path).suffix}'}
         
         try:
-            # 创建输出目录
-            output_path = OUTPUT_DIR / output_name
-            output_path.mkdir(exist_ok=True)
-            
-            # 处理PPT
-            result = self._process_ppt_content(ppt_path, output_path, output_name)
-            
-            # 清理临时文件
-            self._cleanup_temp_files(output_path)
+            # 每个任务独立的工作目录，结束时只保留结果JSON，删除幻灯片图片等中间文件
+            with JobWorkspace(output_name) as workspace:
+                result = self._process_ppt_content(ppt_path, workspace.path, workspace.name, profile)
+                json_path = workspace.path / f"{workspace.name}_result.json"
+                if json_path.exists():
+                    workspace.keep(json_path)
             
             return result
             
@@ -104,13 +106,14 @@ class PPTProcessor:
             logger.error(f"PPT处理失败: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def _process_ppt_content(self, ppt_path: str, output_path: Path, output_name: str) -> Dict:
+    def _process_ppt_content(self, ppt_path: str, output_path: Path, output_name: str,
+                             profile: Optional[ProcessingProfile] = None) -> Dict:
         """处理PPT内容"""
         try:
             file_ext = Path(ppt_path).suffix.lower()
             
             if file_ext == '.pptx':
-                return self._process_pptx_file(ppt_path, output_path, output_name)
+                return self._process_pptx_file(ppt_path, output_path, output_name, profile)
             elif file_ext == '.ppt':
                 return self._process_ppt_file(ppt_path, output_path, output_name)
             else:
@@ -120,7 +123,8 @@ class PPTProcessor:
             logger.error(f"PPT内容处理失败: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def _process_pptx_file(self, pptx_path: str, output_path: Path, output_name: str) -> Dict:
+    def _process_pptx_file(self, pptx_path: str, output_path: Path, output_name: str,
+                           profile: Optional[ProcessingProfile] = None) -> Dict:
         """处理PPTX文件"""
         try:
             presentation = Presentation(pptx_path)
@@ -140,7 +144,7 @@ class PPTProcessor:
 
                 # 若该页文本过少，尝试对图片进行OCR补充
                 if self.ocr_engine and len(''.join(slide_text).strip()) < 10:
-                    ocr_extra = self._ocr_pptx_slide_images(slide, output_path, slide_num)
+                    ocr_extra = self._ocr_pptx_slide_images(slide, output_path, slide_num, profile)
                     if ocr_extra:
                         slide_texts[-1].extend(ocr_extra)
                         all_texts.extend(ocr_extra)
@@ -172,7 +176,7 @@ class PPTProcessor:
                 'file_format': 'pptx'
             }
             
-            # 保存到pickle文件
+            # 保存结果
             self._save_result(result, output_path, output_name)
             
             logger.info(f"PPTX处理完成: {output_name}")
@@ -243,7 +247,7 @@ class PPTProcessor:
                     'file_format': 'ppt'
                 }
                 
-                # 保存到pickle文件
+                # 保存结果
                 self._save_result(result, output_path, output_name)
                 
                 logger.info(f"PPT处理完成: {output_name}")
@@ -294,7 +298,8 @@ class PPTProcessor:
             logger.error(f"提取幻灯片{slide_num + 1}文本失败: {e}")
             return []
 
-    def _ocr_pptx_slide_images(self, slide, output_path: Path, slide_num: int) -> List[str]:
+    def _ocr_pptx_slide_images(self, slide, output_path: Path, slide_num: int,
+                               profile: Optional[ProcessingProfile] = None) -> List[str]:
         """对幻灯片中的图片形状进行OCR，返回补充文本"""
         texts: List[str] = []
         try:
@@ -310,7 +315,7 @@ class PPTProcessor:
                         with open(img_path, 'wb') as f:
                             f.write(image_blob)
                         if self.ocr_engine:
-                            ocr_items = self.ocr_engine.extract_text_direct(str(img_path))
+                            ocr_items = self.ocr_engine.extract_text_direct(str(img_path), profile=profile)
                             if ocr_items:
                                 merged = "\n".join([t.get('text', '') for t in ocr_items if t.get('text')])
                                 if merged.strip():
@@ -411,17 +416,15 @@ class PPTProcessor:
                 'part_summaries': []
             }
     
+    @stage('save')
     def _save_result(self, result: Dict, output_path: Path, output_name: str):
         """保存处理结果"""
         try:
-            # 保存到pickle文件
-            pickle_path = PICKLES_DIR / f"{output_name}_ppt.pkl"
-            pickle_path.parent.mkdir(exist_ok=True)
-            
-            with open(pickle_path, 'wb') as f:
-                pickle.dump(result, f)
-            
-            logger.info(f"结果已保存到: {pickle_path}")
+            # 保存到结果库
+            store = get_result_store()
+            if store is not None:
+                store.put(output_name, result)
+                logger.info(f"结果已保存到结果库: {output_name}")
             
             # 保存到JSON文件（可选）
             json_path = output_path / f"{output_name}_result.json"
@@ -433,14 +436,6 @@ class PPTProcessor:
         except Exception as e:
             logger.error(f"保存结果失败: {e}")
     
-    def _cleanup_temp_files(self, output_path: Path):
-        """清理临时文件"""
-        try:
-            # 可以在这里添加临时文件清理逻辑
-            pass
-        except Exception as e:
-            logger.error(f"清理临时文件失败: {e}")
-    
     def get_processing_status(self) -> Dict:
         """获取处理状态"""
         return {
@@ -0,0 +1,51 @@
+"""
+处理配置档 - 每个请求不可变的处理参数，显式传递给 PDFProcessor 与 OCREngine
+
+原先 set_mode 改写模块级 LAYOUT_CONFIG["conf_threshold"] 以及共享引擎/处理器的实例属性，
+同一推理进程内并发的快速、精细任务会互相覆盖阈值与分辨率。现在模式只用于选择
+PROCESSING_PROFILES 中的一个配置档，生成冻结的 ProcessingProfile 随调用逐层传入，不修改任何共享状态。
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .config import PROCESSING_PROFILES, WORKER_CONFIG
+
+DEFAULT_MODE = WORKER_CONFIG["default_mode"]
+
+
+@dataclass(frozen=True)
+class ProcessingProfile:
+    """单个请求的处理参数（字段含义见 config.PROCESSING_PROFILES）"""
+    mode: str
+    target_resolution: int
+    high_resolution: int
+    target_char_px: int
+    layout_conf: float
+    layout_iou: float
+    layout_imgsz: int
+    use_angle_cls: bool
+    region_min_conf: float
+    direct_min_conf: float
+    min_text_regions: int
+    fine: bool
+
+
+def available_modes() -> List[str]:
+    return list(PROCESSING_PROFILES)
+
+
+def get_profile(mode: Optional[str] = None) -> ProcessingProfile:
+    """
+    按模式名获取配置档
+
+    Args:
+        mode: PROCESSING_PROFILES 中的名称，None 时为 DEFAULT_MODE
+
+    Raises:
+        ValueError: 未知模式
+    """
+    mode = mode or DEFAULT_MODE
+    if mode not in PROCESSING_PROFILES:
+        raise ValueError(f"未知的处理模式: {mode}（可选: {'、'.join(available_modes())}）")
+    return ProcessingProfile(mode=mode, **PROCESSING_PROFILES[mode])
@@ -0,0 +1,98 @@
+"""
+页面识别备忘录 - 保证同一页在同一分辨率下最多识别一次
+
+统一的升级策略（escalation policy）：
+    L0 区域识别：标准分辨率(target_resolution)下布局检测 + 逐区域OCR，每页一次
+    L1 标准直扫：区域文本不足/单页失败时，标准分辨率整页直扫
+    L2 高清直扫：精细模式下页面仍无文本，或整篇未提取到文本时，高分辨率(high_resolution)整页直扫
+各级直扫结果按 (页码, 分辨率) 记忆，后续任何回退路径命中即复用，不再重复渲染与识别。
+低置信度区域的高分辨率重识别每页计为该分辨率的一次区域识别，重识别的区域数另记在 'crops'。
+启用自适应分辨率时，“标准分辨率”为该页选定的分辨率（同样按页记忆）。
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+
+class PageRecognitionMemo:
+    """单文档范围内的页面渲染/直扫结果缓存，并记录每页OCR次数"""
+
+    def __init__(self):
+        self._images: Dict[Tuple[int, int], str] = {}
+        self._direct: Dict[Tuple[int, int], List[Dict]] = {}
+        self._passes: Dict[int, Dict[str, Dict[int, int]]] = {}
+        self._resolutions: Dict[int, int] = {}
+        self.pixels_rendered = 0
+
+    def _page_passes(self, page_num: int) -> Dict[str, Dict[int, int]]:
+        return self._passes.setdefault(page_num, {'region': {}, 'direct': {}, 'crops': {}})
+
+    def image(self, page_num: int, resolution: int, render: Callable[[], str]) -> str:
+        """获取页面图像路径，同页同分辨率只渲染一次"""
+        key = (page_num, resolution)
+        path = self._images.get(key)
+        if not path:
+            path = render()
+            if path:
+                self._images[key] = path
+        return path
+
+    def resolution(self, page_num: int, choose: Callable[[], int]) -> int:
+        """获取页面的标准分辨率，每页只选择一次"""
+        if page_num not in self._resolutions:
+            self._resolutions[page_num] = choose()
+        return self._resolutions[page_num]
+
+    def add_pixels(self, pixels: int):
+        """累计本文档渲染的像素数（整页、预览与区域渲染）"""
+        self.pixels_rendered += int(pixels)
+
+    def direct(self, page_num: int, resolution: int, compute: Callable[[], List[Dict]]) -> List[Dict]:
+        """获取整页直扫结果，同页同分辨率只识别一次（空结果同样记忆）"""
+        key = (page_num, resolution)
+        if key not in self._direct:
+            passes = self._page_passes(page_num)['direct']
+            passes[resolution] = passes.get(resolution, 0) + 1
+            self._direct[key] = compute() or []
+        return self._direct[key]
+
+    def has_direct(self, page_num: int, resolution: int) -> bool:
+        return (page_num, resolution) in self._direct
+
+    def release(self, before_page: int) -> List[str]:
+        """
+        释放页码小于 before_page 的渲染图像记录、直扫结果与分辨率选择（大文档按页窗口处理时调用）
+
+        OCR次数与渲染像素统计保留。返回释放的图像路径，由调用方删除文件。
+        """
+        paths = [path for (page_num, _), path in self._images.items() if page_num < before_page]
+        self._images = {key: path for key, path in self._images.items() if key[0] >= before_page}
+        self._direct = {key: texts for key, texts in self._direct.items() if key[0] >= before_page}
+        self._resolutions = {page_num: res for page_num, res in self._resolutions.items() if page_num >= before_page}
+        return paths
+
+    def count_region_pass(self, page_num: int, resolution: int):
+        """记录一次区域识别(L0)"""
+        passes = self._page_passes(page_num)['region']
+        passes[resolution] = passes.get(resolution, 0) + 1
+
+    def count_region_crops(self, page_num: int, resolution: int, crops: int):
+        """记录一页低置信度区域的高分辨率重识别：同页同分辨率只计一次区域识别，区域数累计到 'crops'"""
+        if crops <= 0:
+            return
+        passes = self._page_passes(page_num)
+        passes['region'].setdefault(resolution, 1)
+        passes['crops'][resolution] = passes['crops'].get(resolution, 0) + crops
+
+    def pass_counts(self) -> List[Dict]:
+        """每页OCR次数统计，页码从1开始"""
+        stats = []
+        for page_num in sorted(self._passes):
+            passes = self._passes[page_num]
+            stats.append({
+                'page': page_num + 1,
+                'region': {str(res): n for res, n in passes['region'].items()},
+                'direct': {str(res): n for res, n in passes['direct'].items()},
+                'crops': {str(res): n for res, n in passes['crops'].items()},
+                'total': sum(passes['region'].values()) + sum(passes['direct'].values())
+            })
+        return stats
@@ -0,0 +1,166 @@
+"""
+版面区域规整 - 布局检测与文字识别之间的几何处理
+
+布局模型常输出相互重叠或嵌套的文本框，逐框识别会把同一行文字识别两次、
+下游文本重复。normalize_regions 依次：
+1. 同组区域 IoU 超过 overlap_threshold 或被包含时合并为并集，并集扩大后继续与其余区域比较直到不再合并
+   （结果与输入顺序无关）；合并后的类别取面积合计最大的类别（如正文框并入标题框后仍为正文）
+2. 去除被同组区域包含的区域
+3. 同一栏内上下紧邻、左右对齐的同类区域拼接为一个区域
+4. 按栏排序：通栏区域把页面分为上下几段，段内按栏从左到右、栏内从上到下
+文本与标题视为同一组（标题框与正文框重叠时同样是重复识别）。
+"""
+
+from typing import Dict, List, Optional
+
+# 参与重叠合并的分组：同组区域之间去重
+_GROUPS = {'text': 'text', 'title': 'text'}
+
+
+def _group(region: Dict) -> str:
+    return _GROUPS.get(region.get('category'), region.get('category'))
+
+
+def _area(box: List[float]) -> float:
+    return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+
+def _intersection(a: List[float], b: List[float]) -> float:
+    return _area([max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])])
+
+
+def iou(a: List[float], b: List[float]) -> float:
+    inter = _intersection(a, b)
+    union = _area(a) + _area(b) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _union(a: List[float], b: List[float]) -> List[int]:
+    return [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+
+
+def _overlaps(a: List[float], b: List[float], overlap_threshold: float, containment: float) -> bool:
+    inter = _intersection(a, b)
+    if inter <= 0:
+        return False
+    smaller = min(_area(a), _area(b))
+    return iou(a, b) > overlap_threshold or (smaller > 0 and inter / smaller >= containment)
+
+
+def _merged_region(bbox: List[float], members: List[Dict]) -> Dict:
+    """合并后的区域：类别取成员面积合计最大者（相同时取置信度较高的成员），置信度取最高"""
+    areas: Dict[str, float] = {}
+    for member in members:
+        areas[member.get('category')] = areas.get(member.get('category'), 0.0) + _area(member['bbox'])
+    category = max(areas, key=areas.get)
+    base = next(member for member in members if member.get('category') == category)
+    return dict(base, bbox=list(bbox), confidence=max(m.get('confidence', 0.0) for m in members))
+
+
+def _merge_overlapping(regions: List[Dict], overlap_threshold: float, containment: float) -> List[Dict]:
+    """同组区域重叠过多或被包含时合并；并集扩大后重新与已保留的区域比较，直到不再合并"""
+    # 成员按置信度从高到低，类别面积相同时取置信度较高的成员
+    clusters: List[Dict] = []
+    for region in sorted(regions, key=lambda r: r.get('confidence', 0.0), reverse=True):
+        cluster = {'group': _group(region), 'bbox': list(region['bbox']), 'members': [region]}
+        merged = True
+        while merged:
+            merged = False
+            for other in clusters:
+                if other['group'] == cluster['group'] and \
+                        _overlaps(cluster['bbox'], other['bbox'], overlap_threshold, containment):
+                    cluster['bbox'] = _union(other['bbox'], cluster['bbox'])
+                    cluster['members'] = other['members'] + cluster['members']
+                    clusters.remove(other)
+                    merged = True
+                    break
+        clusters.append(cluster)
+    return [_merged_region(c['bbox'], c['members']) for c in clusters]
+
+
+def _join_adjacent(regions: List[Dict], line_height: float) -> List[Dict]:
+    """同类区域上下紧邻（间距不超过半行）且左右基本对齐时拼接"""
+    joined: List[Dict] = []
+    for region in sorted(regions, key=lambda r: (r['bbox'][1], r['bbox'][0])):
+        box = region['bbox']
+        for other in joined:
+            if other['category'] != region['category'] or region['category'] not in ('text', 'title'):
+                continue
+            upper = other['bbox']
+            gap = box[1] - upper[3]
+            overlap = min(upper[2], box[2]) - max(upper[0], box[0])
+            narrower = min(upper[2] - upper[0], box[2] - box[0])
+            limit = 0.5 * min(line_height, upper[3] - upper[1], box[3] - box[1])
+            if -limit <= gap <= limit and narrower > 0 and overlap >= narrower * 0.8:
+                other['bbox'] = _union(upper, box)
+                other['confidence'] = max(other.get('confidence', 0.0), region.get('confidence', 0.0))
+                break
+        else:
+            joined.append(region)
+    return joined
+
+
+def _columns(regions: List[Dict]) -> List[List[Dict]]:
+    """按水平区间重叠把区域聚为栏，栏从左到右、栏内从上到下"""
+    columns: List[Dict] = []
+    for region in sorted(regions, key=lambda r: r['bbox'][0]):
+        x1, _, x2, _ = region['bbox']
+        for column in columns:
+            overlap = min(column['x2'], x2) - max(column['x1'], x1)
+            if overlap > 0.5 * min(x2 - x1, column['x2'] - column['x1']):
+                column['x1'], column['x2'] = min(column['x1'], x1), max(column['x2'], x2)
+                column['regions'].append(region)
+                break
+        else:
+            columns.append({'x1': x1, 'x2': x2, 'regions': [region]})
+    columns.sort(key=lambda c: c['x1'])
+    return [sorted(c['regions'], key=lambda r: r['bbox'][1]) for c in columns]
+
+
+def reading_order(regions: List[Dict], spanning_ratio: float = 0.6) -> List[Dict]:
+    """按栏排序；宽度超过内容宽度 spanning_ratio 的通栏区域（标题、通栏图表）分隔上下段"""
+    if len(regions) <= 1:
+        return list(regions)
+    left = min(r['bbox'][0] for r in regions)
+    right = max(r['bbox'][2] for r in regions)
+    span = max(1, right - left)
+
+    ordered: List[Dict] = []
+    section: List[Dict] = []
+    for region in sorted(regions, key=lambda r: (r['bbox'][1], r['bbox'][0])):
+        if region['bbox'][2] - region['bbox'][0] >= span * spanning_ratio:
+            for column in _columns(section):
+                ordered.extend(column)
+            section = []
+            ordered.append(region)
+        else:
+            section.append(region)
+    for column in _columns(section):
+        ordered.extend(column)
+    return ordered
+
+
+def normalize_regions(regions: List[Dict], overlap_threshold: float = 0.3, containment: float = 0.85,
+                      line_height: Optional[float] = None) -> List[Dict]:
+    """
+    合并重叠/嵌套区域、拼接相邻区域并按阅读顺序排序
+
+    Args:
+        regions: 布局检测结果 [{'bbox': [x1, y1, x2, y2], 'category', 'confidence', ...}]
+        overlap_threshold: 同组区域IoU超过该值时合并（IMAGE_CONFIG["overlap_threshold"]）
+        containment: 较小区域有该比例以上面积落在另一区域内时视为被包含
+        line_height: 拼接相邻区域时的行高估计，默认取文本区域高度的最小值
+
+    Returns:
+        规整后的区域列表（新列表，不修改输入）
+    """
+    valid = [r for r in regions if r.get('bbox') and r['bbox'][2] > r['bbox'][0] and r['bbox'][3] > r['bbox'][1]]
+    if len(valid) <= 1:
+        return [dict(r) for r in valid]
+    merged = _merge_overlapping(valid, overlap_threshold, containment)
+    if line_height is None:
+        heights = [r['bbox'][3] - r['bbox'][1] for r in merged if _group(r) == 'text']
+        line_height = min(heights) if heights else 0
+    if line_height:
+        merged = _join_adjacent(merged, line_height)
+    return reading_order(merged)
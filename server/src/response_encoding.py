@@ -0,0 +1,191 @@
+"""
+响应编码 - 字段选择、msgpack二进制编码与gzip/zstd压缩
+
+长PDF的完整结果包含每个文本区域的bbox/类别/置信度、仅在服务端有意义的图表路径
+以及大量空的LLM占位字段。客户端可以通过 fields= 只取需要的部分，例如：
+    fields=page_text                 每页合并后的文本
+    fields=texts.page,texts.text     文本区域只保留页码与文本
+    fields=total_pages,summary,tables.bbox
+编码按 Accept / Accept-Encoding 协商：msgpack、zstandard 未安装时自动退回 JSON / gzip。
+大文档的流式结果（逐页落盘，见 page_spill）由 encode_result_response 分块生成JSON并逐块压缩下发；
+批量接口的各文件结果同样逐个分块输出（iter_record_json / encode_json_stream）。
+"""
+
+import gzip
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from .config import RESPONSE_CONFIG
+from .page_spill import is_spilled, iter_result_json
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+
+def _merged_page_text(result: Dict) -> List[Dict]:
+    """按页合并文本区域"""
+    pages: Dict[Any, List[str]] = {}
+    for item in result.get('texts') or []:
+        text = item.get('text')
+        if text:
+            pages.setdefault(item.get('page'), []).append(text)
+    return [{'page': page, 'text': "\n".join(texts)}
+            for page, texts in sorted(pages.items(), key=lambda kv: (kv[0] is None, kv[0] or 0))]
+
+
+# 虚拟字段：由完整结果计算得到
+_VIRTUAL_FIELDS = {
+    'page_text': _merged_page_text,
+    'text': lambda result: "\n".join(p['text'] for p in _merged_page_text(result)),
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, Optional[List[str]]]]:
+    """解析 fields 参数：{'字段': None(整个字段) 或 [子字段,...]}；未指定返回None"""
+    if not fields:
+        return None
+    selection: Dict[str, Optional[List[str]]] = {}
+    for token in fields.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        name, _, sub = token.partition('.')
+        if not sub:
+            selection[name] = None
+        elif name not in selection or selection[name] is not None:
+            selection.setdefault(name, []).append(sub)
+    return selection or None
+
+
+def select_fields(result: Any, fields: Optional[str]) -> Any:
+    """
+    按 fields 选择结果字段；'status' 总是保留以便客户端判断成败
+
+    列表字段可用 '字段.子字段' 只保留元素中的部分键（如 texts.text）。
+    """
+    selection = parse_fields(fields)
+    if selection is None or not isinstance(result, dict):
+        return result
+    selected = {'status': result['status']} if 'status' in result else {}
+    for name, subfields in selection.items():
+        if name in _VIRTUAL_FIELDS:
+            selected[name] = _VIRTUAL_FIELDS[name](result)
+            continue
+        if name not in result:
+            continue
+        value = result[name]
+        if subfields is not None and isinstance(value, list):
+            value = [{k: item.get(k) for k in subfields} if isinstance(item, dict) else item for item in value]
+        selected[name] = value
+    return selected
+
+
+def _accepted_encodings(request: Request) -> List[str]:
+    header = request.headers.get('accept-encoding', '')
+    encodings = []
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            encodings.append(name.lower())
+    return encodings
+
+
+def encode_response(request: Request, payload: Any, status_code: int = 200) -> Response:
+    """
+    按请求协商序列化与压缩
+
+    - Accept 含 application/x-msgpack 或 ?format=msgpack 时使用msgpack（已安装时）
+    - 响应体超过 compress_min_bytes 时按 Accept-Encoding 优先 zstd，其次 gzip
+    """
+    wants_msgpack = (
+        request.query_params.get('format') == 'msgpack'
+        or MSGPACK_MEDIA_TYPE in request.headers.get('accept', '')
+    )
+    if wants_msgpack and MSGPACK_AVAILABLE:
+        body = msgpack.packb(payload, use_bin_type=True, default=str)
+        media_type = MSGPACK_MEDIA_TYPE
+    else:
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        media_type = "application/json"
+
+    headers = {'Vary': 'Accept, Accept-Encoding', 'X-Uncompressed-Length': str(len(body))}
+    if len(body) >= RESPONSE_CONFIG["compress_min_bytes"]:
+        accepted = _accepted_encodings(request)
+        if 'zstd' in accepted and ZSTD_AVAILABLE:
+            body = zstandard.ZstdCompressor(level=RESPONSE_CONFIG["zstd_level"]).compress(body)
+            headers['Content-Encoding'] = 'zstd'
+        elif 'gzip' in accepted:
+            body = gzip.compress(body, compresslevel=RESPONSE_CONFIG["gzip_level"])
+            headers['Content-Encoding'] = 'gzip'
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def iter_record_json(envelope: Dict, result: Any, fields: Optional[str] = None) -> Iterator[bytes]:
+    """
+    {**envelope, 'result': 按 fields 选择后的结果} 的JSON（UTF-8字节块）
+
+    流式结果从落盘文件分块生成，不整篇读入内存；result 为None时只输出 envelope
+    """
+    if result is None:
+        yield json.dumps(envelope, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        return
+    if not is_spilled(result):
+        yield json.dumps({**envelope, 'result': select_fields(result, fields)},
+                         ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        return
+    head = json.dumps(envelope, ensure_ascii=False, separators=(',', ':'), default=str)[:-1]
+    yield (head + (',' if envelope else '') + '"result":').encode('utf-8')
+    yield from iter_result_json(result, parse_fields(fields))
+    yield b'}'
+
+
+def _compress_chunks(pieces: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """按协商的编码逐块压缩"""
+    compressor = None
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=RESPONSE_CONFIG["zstd_level"]).compressobj()
+    elif encoding == 'gzip':
+        compressor = zlib.compressobj(RESPONSE_CONFIG["gzip_level"], zlib.DEFLATED, 31)
+    for piece in pieces:
+        data = compressor.compress(piece) if compressor else piece
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+
+def encode_json_stream(request: Request, pieces: Iterable[bytes]) -> StreamingResponse:
+    """分块生成的JSON响应（不支持msgpack），按 Accept-Encoding 逐块压缩"""
+    accepted = _accepted_encodings(request)
+    encoding = 'zstd' if 'zstd' in accepted and ZSTD_AVAILABLE else 'gzip' if 'gzip' in accepted else None
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return StreamingResponse(_compress_chunks(pieces, encoding), media_type="application/json", headers=headers)
+
+
+def encode_result_response(request: Request, envelope: Dict, result: Any, fields: Optional[str] = None) -> Response:
+    """
+    返回 {**envelope, 'result': 按 fields 选择后的结果}
+
+    普通结果同 encode_response；流式结果从落盘文件分块生成JSON（不支持msgpack，始终为JSON），
+    按 Accept-Encoding 逐块压缩，内存占用与页数无关。
+    """
+    if not is_spilled(result):
+        return encode_response(request, {**envelope, 'result': select_fields(result, fields)})
+    return encode_json_stream(request, iter_record_json(envelope, result, fields))
@@ -0,0 +1,103 @@
+"""
+文档结果缓存 - 以上传内容的SHA-256 + 处理类型 + 模式为键
+
+- ResultCache：带TTL的磁盘结果缓存，容量按条数/字节LRU淘汰
+- SingleFlight：并发的相同请求只计算一次，其余请求等待同一结果
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .config import RESULT_CACHE_CONFIG
+from .page_cache import PageCache
+
+
+def make_result_key(sha256: str, kind: str, mode: Optional[str]) -> str:
+    """结果缓存键：内容哈希 + 处理类型(pdf/ppt/office) + 处理模式（不使用模式的类型为None）"""
+    return f"{sha256}-{kind}-{mode}" if mode else f"{sha256}-{kind}"
+
+
+class ResultCache(PageCache):
+    """带过期时间的文档结果缓存"""
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = 24 * 3600,
+                 max_entries: int = 2000, max_bytes: int = 2 * 1024 * 1024 * 1024,
+                 low_water: float = 1.0):
+        super().__init__(cache_dir, max_entries=max_entries, max_bytes=max_bytes, low_water=low_water)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = super().get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.get('created', 0) > self.ttl_seconds:
+            self.delete(key)
+            return None
+        return entry.get('result')
+
+    def put(self, key: str, result: Dict):
+        super().put(key, {'created': time.time(), 'result': result})
+
+
+class _LeaderCancelled(Exception):
+    """领头调用被取消（如其客户端断开），等待者应重新发起计算"""
+
+
+class SingleFlight:
+    """单飞：同一键的并发调用共享一次计算（仅在事件循环线程内使用）"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def inflight_count(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或等待同一键的计算
+
+        只共享计算结果与普通异常；领头调用被取消时不把取消传给等待者，
+        清除该键后由一个等待者成为新的领头重新计算
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except Exception as e:
+            self._inflight.pop(key, None)
+            future.set_exception(e)
+            # 标记异常已被读取，避免无等待者时告警
+            future.exception()
+            raise
+        except BaseException:
+            self._inflight.pop(key, None)
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        else:
+            self._inflight.pop(key, None)
+            future.set_result(result)
+            return result
+
+
+def create_result_cache() -> Optional[ResultCache]:
+    """按配置创建结果缓存，未启用时返回None"""
+    if not RESULT_CACHE_CONFIG.get("enabled", False):
+        return None
+    return ResultCache(
+        RESULT_CACHE_CONFIG["cache_dir"],
+        ttl_seconds=RESULT_CACHE_CONFIG.get("ttl_seconds", 24 * 3600),
+        max_entries=RESULT_CACHE_CONFIG.get("max_entries", 2000),
+        max_bytes=RESULT_CACHE_CONFIG.get("max_bytes", 2 * 1024 * 1024 * 1024),
+        low_water=RESULT_CACHE_CONFIG.get("low_water", 0.9)
+    )
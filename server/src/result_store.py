@@ -0,0 +1,462 @@
+"""
+结果库 - 取代逐文档 pickle 的追加写入结果存储
+
+目录布局（RESULT_STORE_CONFIG["root"]）:
+    manifest.jsonl          清单，每行 {id, hash, pages, segment, offset, length, size, codec, time}，
+                            以及写入时附带的元数据（如PDF结果的文档名 name 与模式 mode，供 latest 查找上一版本）
+    seg-<pid>-<n>.jsonl.zst 数据段：每个文档一行JSON，单独压缩为一个zstd帧后追加
+每个写入进程只追加自己的数据段（文件名含pid），偏移由写入方维护，多个推理进程写入无需加锁；
+清单行以单次追加写入，读取方按偏移增量加载。同一id多次写入时以清单中最后一条为准。
+各帧首尾相接仍是合法的zstd流，整段解压即为JSONL（zstdcat 可直接查看）。
+读取时数据段以 mmap 打开，按清单中的偏移/长度只解压所需文档；iter_results/iter_batches
+按数据段顺序读取，供重建索引、重新向量化、统计等批处理使用。iter_fields 流式解压并逐个产出
+顶层字段（列表字段可逐元素产出），只需部分内容时不在内存中组装整篇结果。
+zstandard 未安装时使用 gzip（多成员gzip同样可整段解压）。
+大文档的流式结果（逐页落盘，见 page_spill）写入时逐页读回、分块压缩，不在内存中组装整篇JSON；
+读出的是与普通结果相同的完整文档。
+"""
+
+import codecs
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from .config import RESULT_STORE_CONFIG
+from .page_spill import is_spilled, iter_result_json
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+_EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def _json_default(value: Any):
+    """numpy标量/数组、Path 等非JSON类型"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def _page_count(result: Dict) -> Optional[int]:
+    for key in ('total_pages', 'total_slides'):
+        if isinstance(result.get(key), int):
+            return result[key]
+    return None
+
+
+class ResultStore:
+    """追加写入、按需解压的文档结果库"""
+
+    def __init__(self, root: str, codec: str = 'zstd', level: int = 3, segment_max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if codec == 'zstd' and not ZSTD_AVAILABLE:
+            logger.warning("zstandard 未安装，结果库使用 gzip 压缩")
+            codec = 'gzip'
+        if codec not in _EXTENSIONS:
+            raise ValueError(f"不支持的压缩格式: {codec}")
+        self.codec = codec
+        self.level = level
+        self.segment_max_bytes = segment_max_bytes
+        self._manifest = self.root / MANIFEST_NAME
+        self._entries: Dict[str, Dict] = {}
+        self._manifest_offset = 0
+        self._segment: Optional[Path] = None
+        self._segment_size = 0
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._lock = threading.Lock()
+        with self._lock:
+            self._refresh()
+
+    # ---- 清单 ----
+
+    def _refresh(self):
+        """加载清单中尚未读取的条目（调用方持有锁）"""
+        try:
+            if self._manifest.stat().st_size <= self._manifest_offset:
+                return
+        except OSError:
+            return
+        with open(self._manifest, 'rb') as f:
+            f.seek(self._manifest_offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # 其他进程正在写入的行，下次再读
+                self._manifest_offset += len(raw)
+                try:
+                    entry = json.loads(raw)
+                    self._entries[entry['id']] = entry
+                except (ValueError, KeyError) as e:
+                    logger.debug(f"跳过损坏的结果库清单条目: {e}")
+
+    def entries(self) -> List[Dict]:
+        """当前有效的清单条目（每个id一条）"""
+        with self._lock:
+            self._refresh()
+            return [dict(entry) for entry in self._entries.values()]
+
+    def entry(self, doc_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(doc_id)
+            return dict(entry) if entry else None
+
+    def latest(self, **fields) -> Optional[Dict]:
+        """清单中各字段都匹配的条目里最近写入的一条，没有时返回None"""
+        with self._lock:
+            self._refresh()
+            matched = [(entry['time'], index, entry) for index, entry in enumerate(self._entries.values())
+                       if all(entry.get(key) == value for key, value in fields.items())]
+        return dict(max(matched, key=lambda item: item[:2])[2]) if matched else None
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self.entry(doc_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    # ---- 写入 ----
+
+    @staticmethod
+    def encode(result: Dict) -> Tuple[bytes, str]:
+        """结果序列化为一行JSON，返回 (字节, sha256)"""
+        raw = (json.dumps(result, ensure_ascii=False, default=_json_default) + "\n").encode('utf-8')
+        return raw, hashlib.sha256(raw).hexdigest()
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return gzip.compress(raw, compresslevel=min(9, max(1, self.level)))
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("读取zstd数据段需要安装 zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _writable_segment(self, length: int) -> Path:
+        """本进程的当前数据段，超过大小上限时换新段（调用方持有锁）"""
+        if self._segment is None or self._segment_size + length > self.segment_max_bytes:
+            number = 0
+            while True:
+                path = self.root / f"seg-{os.getpid()}-{number:04d}{_EXTENSIONS[self.codec]}"
+                if not path.exists():
+                    break
+                number += 1
+            self._segment, self._segment_size = path, 0
+        return self._segment
+
+    def _compressobj(self):
+        """分块压缩器：输出单个zstd帧或单个gzip成员"""
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compressobj()
+        return zlib.compressobj(min(9, max(1, self.level)), zlib.DEFLATED, 31)
+
+    def _append_stream(self, segment: Path, result: Dict) -> Tuple[int, int, str]:
+        """流式结果逐块序列化、压缩并追加到数据段，返回 (压缩长度, 原始长度, sha256)（调用方持有锁）"""
+        compressor = self._compressobj()
+        digest = hashlib.sha256()
+        length = size = 0
+        with open(segment, 'ab') as f:
+            start = f.tell()
+            try:
+                for chunk in iter_result_json(result, separators=(', ', ': ')):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    data = compressor.compress(chunk)
+                    f.write(data)
+                    length += len(data)
+                data = compressor.compress(b"\n") + compressor.flush()
+                digest.update(b"\n")
+                f.write(data)
+            except Exception:
+                # 写入中途失败时截掉不完整的帧，保持后续条目的偏移正确
+                f.truncate(start)
+                raise
+        return length + len(data), size + 1, digest.hexdigest()
+
+    def put(self, doc_id: str, result: Dict, meta: Optional[Dict] = None) -> Dict:
+        """追加一个文档的结果，返回清单条目（流式结果逐页读回写入，存储为完整文档）；meta 写入清单条目"""
+        streamed = is_spilled(result)
+        if not streamed:
+            raw, digest = self.encode(result)
+            frame = self._compress(raw)
+        with self._lock:
+            if streamed:
+                # 压缩后长度未知：按已写入的大小判断是否换段，写入后再记账
+                segment = self._writable_segment(0)
+                length, size, digest = self._append_stream(segment, result)
+            else:
+                segment = self._writable_segment(len(frame))
+                with open(segment, 'ab') as f:
+                    f.write(frame)
+                length, size = len(frame), len(raw)
+            entry = {
+                'id': doc_id,
+                'hash': digest,
+                'pages': _page_count(result),
+                'segment': segment.name,
+                'offset': self._segment_size,
+                'length': length,
+                'size': size,
+                'codec': self.codec,
+                'time': round(time.time(), 3),
+                **(meta or {})
+            }
+            self._segment_size += length
+            with open(self._manifest, 'ab') as f:
+                f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8'))
+            self._entries[doc_id] = entry
+        return entry
+
+    # ---- 读取 ----
+
+    def _frame(self, entry: Dict) -> bytes:
+        """从 mmap 的数据段中取出条目对应的压缩帧（调用方持有锁）"""
+        end = entry['offset'] + entry['length']
+        mapped = self._maps.get(entry['segment'])
+        if mapped is None or len(mapped) < end:
+            # 数据段仍在被写入方追加，长度不足时重新映射
+            if mapped is not None:
+                mapped.close()
+            with open(self.root / entry['segment'], 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[entry['segment']] = mapped
+        return mapped[entry['offset']:end]
+
+    def _load(self, entry: Dict) -> Dict:
+        with self._lock:
+            frame = self._frame(entry)
+        return json.loads(self._decompress(entry['codec'], frame))
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        """读取单个文档的结果，不存在时返回None"""
+        entry = self.entry(doc_id)
+        return self._load(entry) if entry else None
+
+    def _iter_raw(self, entry: Dict, chunk_bytes: int = 64 * 1024) -> Iterator[bytes]:
+        """按块读取并解压条目对应的帧，产出解压后的字节块"""
+        if entry['codec'] == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("读取zstd数据段需要安装 zstandard")
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            decompressor = zlib.decompressobj(31)
+        remaining = entry['length']
+        with open(self.root / entry['segment'], 'rb') as f:
+            f.seek(entry['offset'])
+            while remaining > 0:
+                data = f.read(min(chunk_bytes, remaining))
+                if not data:
+                    raise EOFError(f"数据段不完整: {entry['segment']}")
+                remaining -= len(data)
+                out = decompressor.decompress(data)
+                if out:
+                    yield out
+
+    def iter_fields(self, doc_id: str, arrays: Iterable[str] = ()) -> Iterator[Tuple[str, Any]]:
+        """
+        流式读取单个文档的顶层字段，逐个产出 (字段名, 值)；文档不存在时不产出
+
+        Args:
+            arrays: 逐元素产出的列表字段（如 texts/figures/tables），对这些字段产出 (字段名, 元素)，
+                调用方丢弃不需要的元素即可，内存中只保留当前元素
+        """
+        entry = self.entry(doc_id)
+        if entry is None:
+            return
+        yield from _JsonObjectScanner(self._iter_raw(entry)).fields(set(arrays))
+
+    def iter_results(self, ids: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Dict]]:
+        """按数据段与偏移顺序逐个产出 (id, 结果)；ids 指定时只读取这些文档"""
+        entries = self.entries()
+        if ids is not None:
+            wanted = set(ids)
+            entries = [entry for entry in entries if entry['id'] in wanted]
+        entries.sort(key=lambda entry: (entry['segment'], entry['offset']))
+        for entry in entries:
+            try:
+                yield entry['id'], self._load(entry)
+            except Exception as e:
+                logger.error(f"读取结果失败: {entry['id']}: {e}")
+
+    def iter_batches(self, batch_size: int = 64, ids: Optional[Iterable[str]] = None) -> Iterator[List[Tuple[str, Dict]]]:
+        """按批产出 [(id, 结果), ...]"""
+        batch = []
+        for item in self.iter_results(ids):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+class _JsonObjectScanner:
+    """从UTF-8字节块流中增量解析一个顶层JSON对象（字段值以 json.JSONDecoder.raw_decode 逐个解析）"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, at_least: int = 1) -> bool:
+        """再读入至少 at_least 个字符（已到结尾时返回False）"""
+        if self._eof:
+            return False
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        added = 0
+        while added < at_least:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                tail = self._text.decode(b'', final=True)
+                self._buf += tail
+                return added + len(tail) > 0
+            text = self._text.decode(chunk)
+            self._buf += text
+            added += len(text)
+        return True
+
+    def _peek(self) -> str:
+        """跳过空白后的下一个字符，结尾时为空串"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"结果JSON格式错误: 期望 {chars!r}，实际 {char!r}")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """解析下一个完整的JSON值；值跨越缓冲区末尾时成倍读入更多内容后重试"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill(max(len(self._buf) - self._pos, 1)):
+                    raise
+                continue
+            # 数字恰好止于缓冲区末尾时可能被截断，读入更多后重新解析
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def fields(self, arrays: set) -> Iterator[Tuple[str, Any]]:
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key in arrays and self._peek() == '[':
+                self._pos += 1
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield key, self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                yield key, self._value()
+            if self._expect(',}') == '}':
+                return
+
+
+def migrate_pickles(pickles_dir: str, store: ResultStore, delete: bool = False) -> Dict[str, int]:
+    """
+    把旧的逐文档 pickle 导入结果库
+
+    识别 <name>/result.pkl（PDF、Office）与 <name>_ppt.pkl（PPT）；id 为 <name>。
+    结果库中已有相同内容（哈希一致）的文档跳过，可重复执行。pickle 只应来自本服务自己写出的文件。
+
+    Args:
+        pickles_dir: pickle 目录（默认 PICKLES_DIR）
+        store: 目标结果库
+        delete: 导入成功后删除原 pickle
+
+    Returns:
+        {'migrated', 'skipped', 'failed'}
+    """
+    root = Path(pickles_dir)
+    sources = [(path.parent.name, path, path.parent) for path in sorted(root.glob("*/result.pkl"))]
+    sources += [(path.name[:-len("_ppt.pkl")], path, path) for path in sorted(root.glob("*_ppt.pkl"))]
+    stats = {'migrated': 0, 'skipped': 0, 'failed': 0}
+    for doc_id, path, owner in sources:
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            existing = store.entry(doc_id)
+            if existing and existing['hash'] == store.encode(result)[1]:
+                stats['skipped'] += 1
+            else:
+                store.put(doc_id, result)
+                stats['migrated'] += 1
+            if delete:
+                if owner.is_dir():
+                    shutil.rmtree(owner, ignore_errors=True)
+                else:
+                    owner.unlink()
+        except Exception as e:
+            stats['failed'] += 1
+            logger.error(f"迁移pickle失败: {path}: {e}")
+    return stats
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> Optional[ResultStore]:
+    """获取进程内共享的结果库，未启用时返回None"""
+    global _store
+    if not RESULT_STORE_CONFIG.get("enabled", False):
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore(
+                RESULT_STORE_CONFIG["root"],
+                codec=RESULT_STORE_CONFIG.get("codec", "zstd"),
+                level=RESULT_STORE_CONFIG.get("level", 3),
+                segment_max_bytes=RESULT_STORE_CONFIG.get("segment_max_bytes", 256 * 1024 * 1024)
+            )
+        return _store
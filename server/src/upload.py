@@ -0,0 +1,243 @@
+"""
+上传处理 - 分块流式落盘、边写边计算SHA-256、超过大小上限提前拒绝
+
+请求体先经 UploadLimitMiddleware 按 Content-Length / 实际字节数限流，
+再由 spool_upload 以固定大小的块复制到工作目录（可选 tmpfs），
+单请求的内存峰值与文件大小无关。
+批量接口上传的 zip/tar 归档由 extract_archive 逐成员流式解压，受文件数与解压后总大小限制。
+"""
+
+import hashlib
+import os
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from loguru import logger
+
+from .config import UPLOAD_CONFIG
+
+
+def get_spool_dir() -> str:
+    """上传文件落盘目录：启用 tmpfs 且 /dev/shm 可用时使用内存盘"""
+    spool_dir = UPLOAD_CONFIG.get("spool_dir")
+    if not spool_dir and UPLOAD_CONFIG.get("use_tmpfs") and Path("/dev/shm").is_dir():
+        spool_dir = "/dev/shm/ocr_uploads"
+    if not spool_dir:
+        return tempfile.gettempdir()
+    Path(spool_dir).mkdir(parents=True, exist_ok=True)
+    return spool_dir
+
+
+async def spool_upload(file: UploadFile, suffix: str = '', max_bytes: Optional[int] = None) -> Dict:
+    """
+    将上传文件分块写入临时文件，同时计算SHA-256
+
+    Args:
+        file: 上传文件
+        suffix: 临时文件扩展名
+        max_bytes: 大小上限，默认取 UPLOAD_CONFIG["max_bytes"]
+
+    Returns:
+        {'path': 临时文件路径, 'sha256': 内容哈希, 'size': 字节数}
+    """
+    max_bytes = max_bytes or UPLOAD_CONFIG["max_bytes"]
+    chunk_size = UPLOAD_CONFIG.get("chunk_size", 1024 * 1024)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=get_spool_dir())
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"上传文件超过大小上限 {max_bytes} 字节")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        raise
+    return {'path': path, 'sha256': digest.hexdigest(), 'size': size}
+
+
+def _spool_stream(stream: BinaryIO, suffix: str, max_bytes: int) -> Dict:
+    """同步版本的分块落盘（归档成员解压使用）"""
+    chunk_size = UPLOAD_CONFIG.get("chunk_size", 1024 * 1024)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=get_spool_dir())
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"归档解压后超过大小上限 {max_bytes} 字节")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        raise
+    return {'path': path, 'sha256': digest.hexdigest(), 'size': size}
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    """未设置UTF-8标志的zip成员名按GBK还原（Windows压缩的中文文件名）"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('gbk')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _is_skipped_member(name: str) -> bool:
+    """跳过目录、隐藏文件与macOS元数据"""
+    parts = Path(name).parts
+    return not parts or parts[0] == '__MACOSX' or Path(name).name.startswith('.')
+
+
+def is_archive(filename: str) -> bool:
+    lower = (filename or '').lower()
+    return lower.endswith(('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz'))
+
+
+def extract_archive(archive_path: str, filename: str, max_files: int, max_bytes: int) -> List[Dict]:
+    """
+    将zip/tar归档中的文件逐个分块落盘
+
+    Args:
+        archive_path: 已落盘的归档文件路径
+        filename: 归档原始文件名（用于判断格式）
+        max_files: 成员文件数上限
+        max_bytes: 解压后总大小上限
+
+    Returns:
+        [{'filename': 成员文件名, 'path', 'sha256', 'size'}, ...]
+    """
+    entries: List[Dict] = []
+    remaining = max_bytes
+
+    def add(name: str, stream: BinaryIO):
+        nonlocal remaining
+        if len(entries) >= max_files:
+            raise HTTPException(status_code=413, detail=f"归档文件数超过上限 {max_files}")
+        info = _spool_stream(stream, Path(name).suffix.lower(), remaining)
+        remaining -= info['size']
+        entries.append({'filename': Path(name).name, **info})
+
+    try:
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(archive_path) as archive:
+                for info in archive.infolist():
+                    name = _zip_member_name(info)
+                    if info.is_dir() or _is_skipped_member(name):
+                        continue
+                    with archive.open(info) as stream:
+                        add(name, stream)
+        else:
+            with tarfile.open(archive_path, 'r:*') as archive:
+                for member in archive:
+                    if not member.isfile() or _is_skipped_member(member.name):
+                        continue
+                    stream = archive.extractfile(member)
+                    if stream is not None:
+                        with stream:
+                            add(member.name, stream)
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        cleanup_spooled(entries)
+        raise HTTPException(status_code=400, detail=f"无法解析归档文件 {filename}: {e}")
+    except BaseException:
+        cleanup_spooled(entries)
+        raise
+    return entries
+
+
+def cleanup_spooled(entries: List[Dict]):
+    """删除已落盘的文件"""
+    for entry in entries:
+        try:
+            os.unlink(entry['path'])
+        except OSError:
+            pass
+
+
+class _BodyTooLarge(HTTPException):
+    """请求体超限；继承HTTPException，使请求体解析过程中抛出时仍返回413而非400"""
+
+    def __init__(self, max_body_bytes: int):
+        super().__init__(status_code=413, detail=f"请求体超过大小上限 {max_body_bytes} 字节")
+
+
+class UploadLimitMiddleware:
+    """ASGI中间件：在解析multipart之前按请求体大小拒绝超限上传（413）"""
+
+    def __init__(self, app, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > self.max_body_bytes
+            except ValueError:
+                too_large = False
+            if too_large:
+                await self._reject(send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise _BodyTooLarge(self.max_body_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            logger.warning(f"拒绝超限上传: {scope.get('path')} 已接收 {received} 字节")
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send):
+        body = f'{{"detail":"请求体超过大小上限 {self.max_body_bytes} 字节"}}'.encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,183 @@
+"""
+任务工作目录 - 每个任务独立目录、处理结束只保留显式登记的产物、按时间与容量回收
+
+同名文件的并发任务各自使用 "<名称>-<随机后缀>" 目录，不会互相覆盖；
+页面渲染等中间文件可放在 tmpfs，结果引用的图表裁剪等通过 keep() 登记并移回 OUTPUT_DIR，
+其余文件在任务结束时删除。collect_garbage 按最后修改时间删除 output/、pickles/ 中
+过期或超出容量的条目，避免长期运行后目录无限增长。
+"""
+
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from loguru import logger
+
+from .config import OUTPUT_DIR, PICKLES_DIR, WORKSPACE_CONFIG
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def unique_name(output_name: str) -> str:
+    """输出名称加随机后缀，避免同名文件的任务互相覆盖"""
+    base = _UNSAFE_CHARS.sub('_', output_name or '').strip('._') or 'job'
+    return f"{base[:80]}-{uuid4().hex[:8]}"
+
+
+def _tmpfs_root() -> Optional[Path]:
+    """启用 tmpfs 且 /dev/shm 可用时返回中间文件根目录"""
+    if not WORKSPACE_CONFIG.get("use_tmpfs") or not Path("/dev/shm").is_dir():
+        return None
+    return Path(WORKSPACE_CONFIG.get("tmpfs_dir") or "/dev/shm/ocr_work")
+
+
+class JobWorkspace:
+    """单个任务的工作目录（上下文管理器，退出时删除未保留的文件）"""
+
+    def __init__(self, output_name: str):
+        self.name = unique_name(output_name)
+        self.output_dir = OUTPUT_DIR / self.name
+        scratch_root = _tmpfs_root()
+        self.path = scratch_root / self.name if scratch_root else self.output_dir
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._kept = set()
+
+    def keep(self, path) -> str:
+        """登记需要保留的产物，返回其最终路径（位于 OUTPUT_DIR 下）"""
+        src = Path(path)
+        if self.path == self.output_dir:
+            self._kept.add(src.name)
+            return str(src)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        dst = self.output_dir / src.name
+        if dst.exists() and not src.exists():
+            return str(dst)  # 多个条目引用同一文件（如去重后的嵌入图片）
+        shutil.move(str(src), str(dst))
+        return str(dst)
+
+    def keep_items(self, items: Iterable[Dict]):
+        """保留结果条目（figures/tables）引用的文件并更新其路径"""
+        for item in items:
+            if isinstance(item, dict) and item.get('path'):
+                try:
+                    item['path'] = self.keep(item['path'])
+                except OSError as e:
+                    logger.warning(f"保留产物失败: {item['path']}: {e}")
+
+    def close(self):
+        """删除未保留的中间文件；没有保留任何产物时删除整个目录"""
+        if self.path != self.output_dir:
+            shutil.rmtree(self.path, ignore_errors=True)
+            return
+        try:
+            for child in self.path.iterdir():
+                if child.name in self._kept:
+                    continue
+                if child.is_dir():
+                    shutil.rmtree(child, ignore_errors=True)
+                else:
+                    child.unlink()
+            if not self._kept:
+                self.path.rmdir()
+        except OSError as e:
+            logger.warning(f"清理工作目录失败: {self.path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _entry_stats(path: Path) -> Tuple[int, float]:
+    """条目（文件或目录树）的总大小与最后修改时间"""
+    stat = path.stat()
+    if not path.is_dir():
+        return stat.st_size, stat.st_mtime
+    size, mtime = 0, stat.st_mtime
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                file_stat = os.stat(os.path.join(dirpath, filename))
+            except OSError:
+                continue
+            size += file_stat.st_size
+            mtime = max(mtime, file_stat.st_mtime)
+    return size, mtime
+
+
+def _remove(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink()
+
+
+def collect_garbage(roots: Optional[List[Path]] = None, max_age_seconds: Optional[float] = None,
+                    max_bytes: Optional[int] = None, min_age_seconds: Optional[float] = None,
+                    now: Optional[float] = None) -> Dict:
+    """
+    回收输出目录中的过期条目
+
+    每个根目录的顶层条目（任务目录或文件）作为一个单位：超过 max_age_seconds 的删除；
+    剩余总大小仍超过 max_bytes 时按最旧优先删除。短于 min_age_seconds 的条目
+    可能属于处理中的任务，始终保留。
+
+    Args:
+        roots: 要回收的目录，默认 OUTPUT_DIR、PICKLES_DIR 与 tmpfs 工作目录
+        max_age_seconds: 保留时间，默认取 WORKSPACE_CONFIG["gc_max_age_days"]
+        max_bytes: 每个目录的容量上限，默认取 WORKSPACE_CONFIG["gc_max_bytes"]
+        min_age_seconds: 最短保留时间，默认取 WORKSPACE_CONFIG["gc_min_age_seconds"]
+
+    Returns:
+        {'removed': 删除条目数, 'freed_bytes': 释放字节数, 'remaining_bytes': 剩余字节数}
+    """
+    if roots is None:
+        roots = [OUTPUT_DIR, PICKLES_DIR]
+        if _tmpfs_root() is not None:
+            roots.append(_tmpfs_root())
+    if max_age_seconds is None:
+        max_age_seconds = WORKSPACE_CONFIG["gc_max_age_days"] * 86400
+    if max_bytes is None:
+        max_bytes = WORKSPACE_CONFIG["gc_max_bytes"]
+    if min_age_seconds is None:
+        min_age_seconds = WORKSPACE_CONFIG.get("gc_min_age_seconds", 3600)
+    now = time.time() if now is None else now
+
+    stats = {'removed': 0, 'freed_bytes': 0, 'remaining_bytes': 0}
+    for root in roots:
+        root = Path(root)
+        if not root.is_dir():
+            continue
+        entries = []
+        for path in root.iterdir():
+            try:
+                size, mtime = _entry_stats(path)
+            except OSError:
+                continue
+            entries.append((mtime, size, path))
+        entries.sort(key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            age = now - mtime
+            if age < min_age_seconds:
+                break
+            if age <= max_age_seconds and total <= max_bytes:
+                break
+            try:
+                _remove(path)
+            except OSError as e:
+                logger.warning(f"回收失败: {path}: {e}")
+                continue
+            total -= size
+            stats['removed'] += 1
+            stats['freed_bytes'] += size
+        stats['remaining_bytes'] += total
+
+    if stats['removed']:
+        logger.info(f"输出目录回收: 删除 {stats['removed']} 项，释放 {stats['freed_bytes'] / 1024 / 1024:.1f} MB")
+    return stats
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+测试按页自适应分辨率：按字号选择分辨率、文字过少取最低分辨率、扫描页走灰度预览
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+fitz = pytest.importorskip("fitz")
+adaptive_resolution = pytest.importorskip("src.adaptive_resolution")
+
+
+def _text_page(doc, size, lines=None):
+    page = doc.new_page(width=595, height=842)
+    for line in range(lines or int(700 / (size * 1.5))):
+        page.insert_text((40, 60 + line * size * 1.5), "Revenue grew steadily while margins expanded", fontsize=size)
+    return page
+
+
+def _choose(page):
+    return adaptive_resolution.choose_page_resolution(page, 9, 768, 2048, probe_size=640, min_chars=80)
+
+
+def test_resolution_follows_font_size():
+    doc = fitz.open()
+    for size in (24, 10, 6):
+        _text_page(doc, size)
+    _text_page(doc, 10, lines=1)
+    large, body, small, sparse = list(doc)
+
+    assert _choose(large)['resolution'] == 768
+    assert _choose(body)['resolution'] == 960
+    assert _choose(small)['resolution'] == 1600
+    assert _choose(sparse) == {'resolution': 768, 'glyph_pt': None, 'source': 'text_layer', 'probe_pixels': 0}
+
+
+def test_scanned_page_uses_gray_probe():
+    source = fitz.open()
+    _text_page(source, 10)
+    doc = fitz.open()
+    doc.new_page(width=595, height=842).insert_image(fitz.Rect(0, 0, 595, 842), pixmap=source[0].get_pixmap(dpi=150))
+
+    choice = _choose(doc[0])
+
+    assert choice['source'] == 'probe' and choice['probe_pixels'] > 0
+    assert 768 <= choice['resolution'] <= 1152
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+测试准入控制：超出并发与队列上限时返回429，Retry-After 随排队深度增长
+"""
+
+import sys
+import os
+import asyncio
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+admission = pytest.importorskip("src.admission")
+
+
+def test_admission_queue_limit_and_retry_after():
+    """1个槽位 + 2个排队：第4个任务被拒绝，Retry-After按平均处理时间估算"""
+    async def scenario():
+        controller = admission.AdmissionController(max_inflight=1, max_queue=2, initial_service_seconds=10)
+        tickets = [controller.admit() for _ in range(3)]
+        await controller.start(tickets[0])
+        assert controller.stats()['in_flight'] == 1
+        assert controller.stats()['queue_depth'] == 2
+
+        with pytest.raises(admission.HTTPException) as exc:
+            controller.admit()
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers['Retry-After']) == 30
+        assert controller.stats()['rejected'] == 1
+
+        # 未占用槽位即完成（缓存命中）的任务直接离开队列
+        controller.release(tickets[2])
+
+        # 批量请求整体准入：放不下整批时429，超过总容量时413
+        with pytest.raises(admission.HTTPException) as exc:
+            controller.admit_batch(2)
+        assert exc.value.status_code == 429
+        with pytest.raises(admission.HTTPException) as exc:
+            controller.admit_batch(4)
+        assert exc.value.status_code == 413
+        batch = controller.admit_batch(1)
+        assert len(batch) == 1 and controller.stats()['queue_depth'] == 2
+        controller.release(batch[0])
+        controller.release(tickets[0])
+        await controller.start(tickets[1])
+        assert controller.stats()['in_flight'] == 1
+        assert controller.stats()['queue_depth'] == 0
+        controller.release(tickets[1])
+        stats = controller.stats()
+        assert stats['in_flight'] == 0 and stats['completed'] == 2
+        assert not controller.saturated()
+
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+测试批量接口 /batch：大文档的流式结果逐个文件分块输出（不整篇读回），
+已上传的文件按哈希引用、引用的文件已被淘汰时返回404
+"""
+
+import sys
+import os
+import asyncio
+import hashlib
+import json
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+page_spill = pytest.importorskip("src.page_spill")
+httpx = pytest.importorskip("httpx")
+
+
+class SpillingPool:
+    """替身推理进程池：PDF返回逐页落盘的流式结果，图片返回普通结果"""
+
+    def __init__(self, spill_dir):
+        self.spill_dir = spill_dir
+        self.calls = []
+
+    async def run(self, kind, args, progress=None, stages=None):
+        self.calls.append((kind, args['filename']))
+        if kind == 'image':
+            return {'status': 'success', 'texts': [{'page': 1, 'text': args['filename']}]}
+        path = self.spill_dir / f"{args['filename']}.jsonl"
+        with page_spill.PageSpill(path) as spill:
+            for number in (1, 2):
+                spill.append(number, texts=[{'page': number, 'text': f"{args['filename']}-{number}"}])
+        return {'status': 'success', 'total_pages': 2, 'spill': spill.info()}
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    remote_ocr_server = pytest.importorskip("remote_ocr_server")
+    job_store = pytest.importorskip("src.job_store")
+    blob_store = pytest.importorskip("src.blob_store")
+    state = remote_ocr_server.app.state
+    monkeypatch.setattr(state, "inference_pool", SpillingPool(tmp_path), raising=False)
+    monkeypatch.setattr(state, "job_store", job_store.JobStore(), raising=False)
+    monkeypatch.setattr(state, "result_cache", None, raising=False)
+    monkeypatch.setattr(state, "blob_store", blob_store.BlobStore(str(tmp_path / "blobs")), raising=False)
+    monkeypatch.setattr(state, "admission", None, raising=False)
+    return remote_ocr_server
+
+
+def _post(server, **kwargs):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/batch", **kwargs)
+
+    return asyncio.run(scenario())
+
+
+def test_batch_streams_spilled_results(server, monkeypatch):
+    """含流式结果的批量响应逐个文件从落盘文件分块生成，内容与完整结果一致"""
+    monkeypatch.setattr(page_spill, "load_result", lambda result: pytest.fail("批量响应不应整篇读回结果"))
+    files = [('files', ('a.pdf', b'%PDF-a')), ('files', ('b.png', b'png')), ('files', ('c.txt', b'x'))]
+    response = _post(server, files=files, params={'fields': 'page_text,texts.text'})
+    assert response.status_code == 200
+
+    body = response.json()
+    assert (body['status'], body['total'], body['succeeded'], body['failed']) == ('success', 3, 2, 1)
+    records = {r['filename']: r for r in body['results']}
+    assert records['c.txt']['status'] == 'error'
+    assert records['a.pdf']['result']['page_text'] == [{'page': 1, 'text': 'a.pdf-1'}, {'page': 2, 'text': 'a.pdf-2'}]
+    assert records['a.pdf']['result']['texts'] == [{'text': 'a.pdf-1'}, {'text': 'a.pdf-2'}]
+    assert records['b.png']['result']['texts'] == [{'text': 'b.png'}]
+
+    lines = _post(server, files=files[:2], params={'stream': 'true'}).content.splitlines()
+    records = [json.loads(line) for line in lines if line]
+    assert [r['type'] for r in records] == ['file', 'file', 'summary']
+    pdf = next(r for r in records if r.get('filename') == 'a.pdf')
+    assert [t['text'] for t in pdf['result']['texts']] == ['a.pdf-1', 'a.pdf-2']
+
+
+def test_batch_accepts_blob_references(server):
+    """已上传的文件只传哈希与文件名；引用的文件不存在时整批返回404"""
+    store = server.app.state.blob_store
+    sha256 = hashlib.sha256(b'%PDF-blob').hexdigest()
+    spooled = store.cache_dir / "upload.pdf"
+    spooled.write_bytes(b'%PDF-blob')
+    store.adopt({'path': str(spooled), 'sha256': sha256, 'size': 9})
+
+    response = _post(server, data={'blobs': [sha256], 'filenames': ['report.pdf']},
+                     files=[('files', ('d.png', b'png'))])
+    assert response.status_code == 200
+    assert sorted(r['filename'] for r in response.json()['results']) == ['d.png', 'report.pdf']
+    assert ('pdf', 'report.pdf') in server.app.state.inference_pool.calls
+
+    missing = _post(server, data={'blobs': [sha256, 'f' * 64], 'filenames': ['report.pdf', 'gone.pdf']})
+    assert missing.status_code == 404
+    assert server.app.state.job_store.counts() == {}
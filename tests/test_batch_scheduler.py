@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+测试识别微批调度器：并发提交的切片被合并为批次，结果按原顺序返回
+"""
+
+import sys
+import os
+import threading
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+batch_scheduler = pytest.importorskip("src.batch_scheduler")
+
+
+def test_concurrent_requests_are_batched():
+    """多个线程的切片合并识别，每个线程拿回自己的结果"""
+    batch_sizes = []
+
+    def recognize(images):
+        batch_sizes.append(len(images))
+        return [(f"t{image}", 0.9) for image in images]
+
+    batcher = batch_scheduler.RecognitionBatcher(recognize, max_batch_size=16, max_wait_ms=50)
+    results = {}
+
+    def worker(n):
+        results[n] = batcher.recognize([n * 10 + i for i in range(4)])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for n in range(4):
+        assert results[n] == [(f"t{n * 10 + i}", 0.9) for i in range(4)]
+    assert sum(batch_sizes) == 16
+    assert max(batch_sizes) <= 16
+    assert len(batch_sizes) < 16
+
+    stats = batcher.stats()
+    assert stats['items'] == 16
+    assert 0 < stats['avg_batch_fill'] <= 1
+
+
+def test_batch_failure_propagates():
+    """批量识别异常传递给所有等待者"""
+    def recognize(images):
+        raise RuntimeError("rec failed")
+
+    batcher = batch_scheduler.RecognitionBatcher(recognize, max_batch_size=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="rec failed"):
+        batcher.recognize([1, 2])
+
+
+def test_keys_are_batched_separately():
+    """不同识别参数（key）的切片不合并到同一次识别调用"""
+    calls = []
+
+    def recognize(images, key=None):
+        calls.append((key, sorted(images)))
+        return [(f"{key}:{image}", 0.9) for image in images]
+
+    batcher = batch_scheduler.RecognitionBatcher(recognize, max_batch_size=16, max_wait_ms=50)
+    results = {}
+
+    def worker(key, images):
+        results[key] = batcher.recognize(images, key=key)
+
+    submitted = {True: [1, 2], False: [3, 4], None: [5]}
+    threads = [threading.Thread(target=worker, args=item) for item in submitted.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results[True] == [("True:1", 0.9), ("True:2", 0.9)]
+    assert results[False] == [("False:3", 0.9), ("False:4", 0.9)]
+    assert results[None] == [("None:5", 0.9)]
+    # 每次识别调用只包含同一 key 的切片
+    assert all(set(images) <= set(submitted[key]) for key, images in calls)
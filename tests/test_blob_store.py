@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+测试按内容哈希保存的上传文件：流式写入校验哈希、普通上传登记后可按哈希取回
+"""
+
+import sys
+import os
+import asyncio
+import hashlib
+import threading
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+blob_store = pytest.importorskip("src.blob_store")
+
+
+async def _chunks(data, size=4):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_put_stream_verifies_hash(tmp_path):
+    """内容与哈希一致才保存，不一致时返回400且不留下文件"""
+    store = blob_store.BlobStore(str(tmp_path / "blobs"))
+    data = b"%PDF-1.4 report"
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    with pytest.raises(blob_store.HTTPException) as exc:
+        asyncio.run(store.put_stream("0" * 64, _chunks(data), max_bytes=1024))
+    assert exc.value.status_code == 400
+    assert store.size("0" * 64) is None
+
+    assert asyncio.run(store.put_stream(sha256, _chunks(data), max_bytes=1024)) == len(data)
+    assert store.size(sha256) == len(data)
+    assert store.stats()['entries'] == 1
+
+
+def test_put_stream_writes_off_event_loop(tmp_path, monkeypatch):
+    """写盘与提交（目录锁、淘汰扫描）在线程池中执行，不占用事件循环线程"""
+    store = blob_store.BlobStore(str(tmp_path / "blobs"))
+    data = b"x" * 100
+    sha256 = hashlib.sha256(data).hexdigest()
+    monkeypatch.setitem(blob_store.UPLOAD_CONFIG, "chunk_size", 32)
+    threads = {'write': set(), 'commit': set()}
+    write_chunk, commit = blob_store._write_chunk, store._commit
+
+    def record_write(out, digest, chunk):
+        threads['write'].add(threading.get_ident())
+        write_chunk(out, digest, chunk)
+
+    def record_commit(key, tmp):
+        threads['commit'].add(threading.get_ident())
+        return commit(key, tmp)
+
+    monkeypatch.setattr(blob_store, "_write_chunk", record_write)
+    monkeypatch.setattr(store, "_commit", record_commit)
+
+    async def scenario():
+        size = await store.put_stream(sha256, _chunks(data, size=10), max_bytes=1024)
+        return size, threading.get_ident()
+
+    size, loop_thread = asyncio.run(scenario())
+    assert size == len(data) and store.size(sha256) == len(data)
+    assert threads['write'] and threads['commit']
+    assert loop_thread not in threads['write'] | threads['commit']
+    with open(store._path(sha256), 'rb') as f:
+        assert f.read() == data
+
+
+def test_adopt_and_materialize(tmp_path):
+    """普通上传的文件登记后，任务取得独立副本，删除副本不影响已保存文件"""
+    store = blob_store.BlobStore(str(tmp_path / "blobs"))
+    spooled = tmp_path / "upload.pdf"
+    spooled.write_bytes(b"content")
+    sha256 = hashlib.sha256(b"content").hexdigest()
+    store.adopt({'path': str(spooled), 'sha256': sha256, 'size': 7})
+
+    upload = store.materialize(sha256, '.pdf')
+    assert upload['sha256'] == sha256 and upload['path'].endswith('.pdf')
+    with open(upload['path'], 'rb') as f:
+        assert f.read() == b"content"
+    os.unlink(upload['path'])
+    assert store.size(sha256) == 7
+    assert store.materialize("f" * 64) is None
+    with pytest.raises(blob_store.HTTPException):
+        store.validate("not-a-hash")
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+测试块级回退布局分割：字符连成段落块、双栏不跨栏合并、识别表格与图表
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+block_layout = pytest.importorskip("src.block_layout")
+
+
+def _page():
+    """双栏正文 + 表格 + 柱状图"""
+    page = np.full((1024, 724), 255, dtype=np.uint8)
+    for column_x in (40, 380):
+        for paragraph in range(3):
+            for line in range(5):
+                y = 100 + paragraph * 110 + line * 16
+                cv2.putText(page, "revenue growth margin outlook", (column_x, y),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.45, 0, 1, cv2.LINE_AA)
+    for r in range(6):
+        cv2.line(page, (40, 480 + r * 24), (680, 480 + r * 24), 0, 1)
+    for c in range(6):
+        cv2.line(page, (40 + c * 128, 480), (40 + c * 128, 600), 0, 1)
+    cv2.line(page, (40, 900), (360, 900), 0, 2)
+    for i in range(8):
+        cv2.rectangle(page, (52 + i * 38, 900 - 20 * (i + 2)), (72 + i * 38, 900), 90, -1)
+    return page
+
+
+def test_segment_blocks_groups_characters_into_blocks():
+    regions = block_layout.segment_blocks(_page())
+    categories = [r['category'] for r in regions]
+
+    assert len(regions) <= 12
+    assert categories.count('table') == 1
+    assert categories.count('figure') == 1
+    texts = [r['bbox'] for r in regions if r['category'] == 'text']
+    assert len(texts) == 6
+    # 正文块不跨越两栏之间的空白
+    assert all(x2 < 380 or x1 > 360 for x1, _, x2, _ in texts)
+
+
+def test_segment_blocks_blank_page():
+    assert block_layout.segment_blocks(np.full((200, 150), 255, dtype=np.uint8)) == []
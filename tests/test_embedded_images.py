@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+测试PDF嵌入图片直接导出：区域匹配放置位置、按xref/摘要去重、矢量区域不匹配
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+fitz = pytest.importorskip("fitz")
+embedded_images = pytest.importorskip("src.embedded_images")
+
+
+def _png(color, size=(200, 300)):
+    return cv2.imencode('.png', np.full(size + (3,), color, dtype=np.uint8))[1].tobytes()
+
+
+def test_extract_region_exports_original_image_once(tmp_path):
+    chart = _png((0, 128, 255))
+    doc = fitz.open()
+    for _ in range(2):
+        page = doc.new_page(width=600, height=800)
+        page.insert_image(fitz.Rect(50, 100, 350, 300), stream=chart)
+        page.draw_rect(fitz.Rect(50, 400, 350, 600), fill=(0, 0, 1))
+
+    images = embedded_images.EmbeddedImageExtractor(doc, tmp_path)
+    scale = embedded_images.page_to_pixel_scale(doc[0], 1024)
+    figure = [int(v * scale) for v in (52, 102, 348, 298)]
+    vector = [int(v * scale) for v in (50, 400, 350, 600)]
+
+    first = images.extract_region(doc[0], figure, scale, "fig_1")
+    second = images.extract_region(doc[1], figure, scale, "fig_2")
+
+    assert first == second and first.endswith('.png')
+    assert cv2.imread(first).shape[:2] == (200, 300)
+    assert images.extract_region(doc[0], vector, scale, "fig_1") is None
+    assert images.stats['extracted'] == 1 and images.stats['reused'] == 1
+    assert len(list(tmp_path.iterdir())) == 1
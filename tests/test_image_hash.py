@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+测试图片感知哈希：BK树按汉明半径查找、缩放后的近似重复图片识别、全库索引
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+image_hash = pytest.importorskip("src.image_hash")
+
+
+def _chart(seed, size=(240, 320)):
+    rng = np.random.RandomState(seed)
+    image = np.full(size + (3,), 255, dtype=np.uint8)
+    for i in range(6):
+        height = int(rng.randint(20, size[0] - 20))
+        cv2.rectangle(image, (20 + i * 48, size[0] - height), (50 + i * 48, size[0] - 10),
+                      tuple(int(c) for c in rng.randint(0, 200, 3)), -1)
+    return image
+
+
+def test_bk_tree_radius_search():
+    tree = image_hash.BKTree()
+    for value in (0b0000, 0b0001, 0b0011, 0b1111, 0b11110000):
+        tree.add(value, bin(value))
+
+    assert [v for _, v in tree.find(0b0000, 1)] == ['0b0', '0b1']
+    assert sorted(d for d, _ in tree.find(0b0000, 2)) == [0, 1, 2]
+    assert tree.find(0b0000, 0) == [(0, '0b0')]
+    assert len(tree) == 5
+
+
+def test_resized_duplicate_found_and_corpus_index(tmp_path):
+    """缩放+重新压缩的图表判为重复，不同图表保留；全库索引跨批次识别"""
+    chart = _chart(1)
+    cv2.imwrite(str(tmp_path / "a_fig.png"), chart)
+    cv2.imwrite(str(tmp_path / "b_fig.jpg"), cv2.resize(chart, (200, 150)), [cv2.IMWRITE_JPEG_QUALITY, 70])
+    cv2.imwrite(str(tmp_path / "c_fig.png"), _chart(2))
+    paths = sorted(str(p) for p in tmp_path.iterdir())
+    radius = image_hash.similarity_to_radius(0.8)
+
+    duplicates = image_hash.find_similar_images(paths, radius)
+    assert list(duplicates) == [str(tmp_path / "b_fig.jpg")]
+    assert duplicates[str(tmp_path / "b_fig.jpg")]['duplicate_of'] == str(tmp_path / "a_fig.png")
+
+    index = image_hash.ImageHashIndex(str(tmp_path / "index" / "hashes.jsonl"))
+    assert image_hash.find_similar_images(paths[:1], radius, index=index) == {}
+    # 另一进程打开同一索引文件，能识别此前登记的图片
+    reopened = image_hash.ImageHashIndex(str(tmp_path / "index" / "hashes.jsonl"))
+    match = image_hash.find_similar_images(paths[1:2], radius, index=reopened)[paths[1]]
+    assert match['corpus'] and match['duplicate_of'] == paths[0]
+
+
+def test_in_document_copies_of_corpus_image(tmp_path):
+    """与全库图片相似的图片也登记到本批的BK树，本批内它的后续副本按本地重复识别（可删除）"""
+    chart = _chart(3)
+    corpus_dir, doc_dir = tmp_path / "corpus", tmp_path / "doc"
+    corpus_dir.mkdir()
+    doc_dir.mkdir()
+    cv2.imwrite(str(corpus_dir / "earlier.png"), chart)
+    cv2.imwrite(str(doc_dir / "a_fig.png"), chart)
+    cv2.imwrite(str(doc_dir / "b_fig.jpg"), cv2.resize(chart, (200, 150)), [cv2.IMWRITE_JPEG_QUALITY, 70])
+    cv2.imwrite(str(doc_dir / "c_fig.png"), _chart(4))
+    radius = image_hash.similarity_to_radius(0.8)
+    index = image_hash.ImageHashIndex(str(tmp_path / "index" / "hashes.jsonl"))
+    image_hash.find_similar_images([str(corpus_dir / "earlier.png")], radius, index=index)
+
+    paths = sorted(str(p) for p in doc_dir.iterdir())
+    duplicates = image_hash.find_similar_images(paths, radius, index=index)
+    assert sorted(duplicates) == paths[:2]
+    assert duplicates[paths[0]] == {'duplicate_of': str(corpus_dir / "earlier.png"),
+                                    'distance': duplicates[paths[0]]['distance'], 'corpus': True}
+    assert duplicates[paths[1]]['duplicate_of'] == paths[0]
+    assert duplicates[paths[1]]['corpus'] is False
+    # 与全库相似的图片不再登记，本批新图片登记到全库索引
+    assert len(index) == 2
+
+
+def test_duplicate_chain_points_to_kept_original(monkeypatch, tmp_path):
+    """本批内的重复同样登记：与已删除副本相近、与原图超出半径的图片仍指向保留的原图"""
+    hashes = {'a': 0b0000, 'b': 0b0011, 'c': 0b1111}
+    monkeypatch.setattr(image_hash, "image_hash", lambda path, method='phash': hashes[path])
+
+    duplicates = image_hash.find_similar_images(['a', 'b', 'c'], radius=2)
+    assert duplicates['b'] == {'duplicate_of': 'a', 'distance': 2, 'corpus': False}
+    assert duplicates['c'] == {'duplicate_of': 'a', 'distance': 2, 'corpus': False}
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+测试推理进程池（纯CPU模式，使用不加载模型的替身处理器）
+"""
+
+import sys
+import os
+import threading
+import time
+import types
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+inference_pool = pytest.importorskip("src.inference_pool")
+
+
+def build_dummy_processors(use_gpu):
+    """替身处理器：记录所在进程，不加载任何模型"""
+    return {'pid': os.getpid(), 'use_gpu': use_gpu}
+
+
+def run_dummy_task(processors, kind, args, progress=None):
+    if kind == 'fail':
+        raise ValueError("boom")
+    if kind == 'pages':
+        for i in range(3):
+            progress({'stage': 'pages', 'pages_done': i + 1, 'total_pages': 3})
+    return {'kind': kind, 'pid': processors['pid'], 'use_gpu': processors['use_gpu'], 'echo': args.get('x')}
+
+
+def test_pool_runs_tasks_in_worker_processes():
+    """任务在独立推理进程中执行并回传结果"""
+    pool = inference_pool.InferencePool(
+        num_workers=2, use_gpu=False,
+        factory="test_inference_pool:build_dummy_processors",
+        runner="test_inference_pool:run_dummy_task"
+    )
+    pool.start()
+    try:
+        assert pool.wait_ready(60)
+        futures = [pool.submit('pdf', {'x': i}) for i in range(6)]
+        results = [f.result(30) for f in futures]
+
+        assert [r['echo'] for r in results] == list(range(6))
+        assert all(r['pid'] != os.getpid() for r in results)
+        assert all(r['use_gpu'] is False for r in results)
+
+        events = []
+        pool.submit('pages', {}, on_progress=events.append).result(30)
+        assert events[0]['stage'] == 'processing'
+        assert events[-1] == {'stage': 'pages', 'pages_done': 3, 'total_pages': 3}
+
+        with pytest.raises(RuntimeError, match="boom"):
+            pool.submit('fail', {}).result(30)
+        assert pool.stats()['ready'] == 2
+    finally:
+        pool.shutdown()
+
+
+class SharedEngine:
+    """替身引擎：推理在引擎锁内执行，记录同时处理的任务数以及推理是否被并发进入"""
+
+    def __init__(self):
+        self._infer_lock = threading.RLock()
+        self._counter_lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.inferring = 0
+        self.overlapped = False
+
+    def infer(self):
+        with self._infer_lock:
+            with self._counter_lock:
+                self.inferring += 1
+                self.overlapped = self.overlapped or self.inferring > 1
+            time.sleep(0.02)
+            with self._counter_lock:
+                self.inferring -= 1
+
+
+def build_shared_engine(use_gpu):
+    return {'engine': SharedEngine()}
+
+
+def run_engine_task(processors, kind, args, progress=None):
+    """推理前后各有一段锁外处理（如渲染、后处理），并发任务可在此重叠"""
+    engine = processors['engine']
+    with engine._counter_lock:
+        engine.active += 1
+        engine.peak = max(engine.peak, engine.active)
+    time.sleep(0.05)
+    engine.infer()
+    time.sleep(0.05)
+    with engine._counter_lock:
+        engine.active -= 1
+    return {'pid': os.getpid(), 'engine': id(engine), 'peak': engine.peak, 'overlapped': engine.overlapped}
+
+
+@pytest.mark.parametrize("task_threads, expected_peak", [(None, 1), (2, 2)])
+def test_task_threads_share_one_engine(task_threads, expected_peak):
+    """默认每个推理进程一次只处理一个任务；显式启用 task_threads 后任务并发共享同一引擎，推理仍串行"""
+    kwargs = {} if task_threads is None else {'task_threads': task_threads}
+    pool = inference_pool.InferencePool(
+        num_workers=1, use_gpu=False,
+        factory="test_inference_pool:build_shared_engine",
+        runner="test_inference_pool:run_engine_task",
+        **kwargs
+    )
+    pool.start()
+    try:
+        assert pool.wait_ready(60)
+        results = [f.result(30) for f in [pool.submit('pdf', {}) for _ in range(4)]]
+        assert len({(r['pid'], r['engine']) for r in results}) == 1
+        assert max(r['peak'] for r in results) == expected_peak
+        assert not any(r['overlapped'] for r in results)
+    finally:
+        pool.shutdown()
+
+
+class StubEngine:
+    """替身OCR引擎：记录预热参数并报告固定耗时"""
+
+    def __init__(self, use_gpu=False):
+        self.use_gpu = use_gpu
+        self.startup_timings = {'paddleocr': 0.5, 'layout_model': 0.25}
+        self.warmup_calls = []
+
+    def warmup(self, shapes=None, iterations=1):
+        self.warmup_calls.append((shapes, iterations))
+        return {f"{height}x{width}": 0.01 for height, width in shapes}
+
+
+def test_warmup_records_engine_timings(monkeypatch):
+    """build_processors 按 STARTUP_CONFIG 预热引擎，并把引擎报告的各尺寸耗时记入启动耗时"""
+    config = pytest.importorskip("src.config")
+    monkeypatch.setitem(config.STARTUP_CONFIG, "warmup", True)
+    monkeypatch.setitem(config.STARTUP_CONFIG, "warmup_shapes", [[48, 320], [1024, 768]])
+    monkeypatch.setitem(config.STARTUP_CONFIG, "warmup_iterations", 2)
+    stubs = {
+        'src.ocr_engine': {'OCREngine': StubEngine},
+        'src.pdf_processor': {'PDFProcessor': lambda ocr_engine: ('pdf', ocr_engine)},
+        'src.ppt_processor': {'PPTProcessor': lambda ocr_engine: ('ppt', ocr_engine)},
+        'src.office_processor': {'OfficeProcessor': lambda use_gpu: ('office', use_gpu)},
+    }
+    for name, attrs in stubs.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        monkeypatch.setitem(sys.modules, name, module)
+
+    processors = inference_pool.build_processors(use_gpu=False)
+    engine = processors['engine']
+    assert engine.warmup_calls == [([[48, 320], [1024, 768]], 2)]
+    startup = processors['startup']
+    assert startup['warmup_shapes'] == {'48x320': 0.01, '1024x768': 0.01}
+    assert startup['paddleocr'] == 0.5 and startup['layout_model'] == 0.25
+    for key in ('imports', 'engine', 'processors', 'warmup', 'total'):
+        assert startup[key] >= 0
+
+    # 关闭预热或引擎预热失败时不记录，也不影响进程启动
+    monkeypatch.setitem(config.STARTUP_CONFIG, "warmup", False)
+    assert inference_pool.warmup({'engine': engine}) == {}
+    monkeypatch.setitem(config.STARTUP_CONFIG, "warmup", True)
+    engine.warmup = lambda shapes, iterations: 1 / 0
+    assert inference_pool.warmup({'engine': engine}) == {}
+
+
+def test_synthetic_page_shape():
+    """合成页面尺寸与请求一致，含深色文字行且不是纯白"""
+    ocr_engine = pytest.importorskip("src.ocr_engine")
+    page = ocr_engine.OCREngine._synthetic_page(1024, 768)
+    assert page.shape == (1024, 768, 3)
+    assert page.min() < 100 and page.max() == 255
+    assert ocr_engine.OCREngine._synthetic_page(48, 320).shape == (48, 320, 3)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+测试异步任务接口与任务存储：/jobs 提交、状态查询、结果获取（运行中返回202），
+结果只以缓存键引用或受字节上限约束，同步接口的任务完成即移除
+"""
+
+import sys
+import os
+import asyncio
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+job_store = pytest.importorskip("src.job_store")
+httpx = pytest.importorskip("httpx")
+
+
+class StubPool:
+    """替身推理进程池：任务等待 release 事件后返回固定结果"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def run(self, kind, args, progress=None, stages=None):
+        self.calls += 1
+        progress({'stage': 'processing', 'pages_done': 0, 'total_pages': 2})
+        await self.release.wait()
+        return {'status': 'success', 'total_pages': 2,
+                'texts': [{'page': 1, 'text': args['filename']}], 'figures': [], 'tables': []}
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    """不启动推理进程的服务：替身进程池 + 新的任务存储，结果缓存按用例设置"""
+    remote_ocr_server = pytest.importorskip("remote_ocr_server")
+    result_cache = pytest.importorskip("src.result_cache")
+    state = remote_ocr_server.app.state
+    monkeypatch.setattr(state, "inference_pool", StubPool(), raising=False)
+    monkeypatch.setattr(state, "job_store", job_store.JobStore(), raising=False)
+    monkeypatch.setattr(state, "result_cache", result_cache.ResultCache(str(tmp_path / "results")), raising=False)
+    monkeypatch.setattr(state, "blob_store", None, raising=False)
+    monkeypatch.setattr(state, "admission", None, raising=False)
+    return remote_ocr_server
+
+
+def _client(server):
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def test_job_api_status_and_result(server):
+    """运行中获取结果返回202，完成后从结果缓存读取（任务存储内存中不保留结果）"""
+    state = server.app.state
+
+    async def scenario():
+        state.inference_pool.release = asyncio.Event()
+        async with _client(server) as client:
+            response = await client.post("/jobs", files={'file': ('report.pdf', b'%PDF-stub')})
+            assert response.status_code == 202
+            job_id = response.json()['job_id']
+            await asyncio.sleep(0.05)
+
+            status = (await client.get(f"/jobs/{job_id}")).json()
+            assert status['status'] == 'running'
+            assert status['total_pages'] == 2
+            pending = await client.get(f"/jobs/{job_id}/result")
+            assert pending.status_code == 202
+            assert pending.json()['status'] == 'running'
+
+            state.inference_pool.release.set()
+            await server._job_tasks[job_id]
+
+            status = (await client.get(f"/jobs/{job_id}")).json()
+            assert status['status'] == 'success' and status['progress'] == 1.0
+            done = await client.get(f"/jobs/{job_id}/result")
+            assert done.status_code == 200
+            assert done.json()['result']['texts'][0]['text'] == 'report.pdf'
+            assert state.job_store.result(job_id) is None
+            assert state.job_store.result_key(job_id) is not None
+
+            assert (await client.get("/jobs/missing")).status_code == 404
+
+    asyncio.run(scenario())
+
+
+def test_sync_endpoint_does_not_retain_job(server):
+    """同步接口返回结果后任务不留在任务存储中"""
+    state = server.app.state
+
+    async def scenario():
+        state.inference_pool.release = asyncio.Event()
+        state.inference_pool.release.set()
+        async with _client(server) as client:
+            response = await client.post("/ocr/pdf", files={'file': ('sync.pdf', b'%PDF-sync')})
+        assert response.status_code == 200
+        assert response.json()['result']['texts'][0]['text'] == 'sync.pdf'
+
+    asyncio.run(scenario())
+    assert state.job_store.counts() == {}
+    assert state.job_store.result_bytes() == 0
+
+
+def test_job_store_result_byte_limit():
+    """没有缓存键的结果按字节上限保留，超出时丢弃最早完成的结果但保留任务状态"""
+    store = job_store.JobStore(max_result_bytes=200)
+    result = {'status': 'success', 'texts': ['x' * 100]}
+    first = store.create('image', 'a.png')
+    second = store.create('image', 'b.png')
+    store.finish(first, result=result)
+    store.finish(second, result=result)
+    assert store.result_bytes() <= 200
+
+    assert store.result(first) is None
+    assert store.get(first)['result_expired'] is True
+    assert store.get(first)['status'] == 'success'
+    assert store.result(second) == result
+
+    referenced = store.create('pdf', 'c.pdf')
+    final = store.finish(referenced, result=result, result_key='key')
+    assert final['result'] == result
+    assert store.result(referenced) is None and store.result_key(referenced) == 'key'
+
+    transient = store.create('pdf', 'd.pdf')
+    assert store.finish(transient, result=result, retain=False)['status'] == 'success'
+    assert store.get(transient) is None
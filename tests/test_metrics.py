@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+测试运行指标：嵌套阶段只统计自身耗时、任务指标按接口与模式记录
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+metrics = pytest.importorskip("src.metrics")
+
+
+def test_nested_stages_record_self_time():
+    """直扫中的渲染计入render，不重复计入recognition；不在收集范围内时不计时"""
+    with metrics.stage('render'):
+        pass
+
+    with metrics.collect_stages() as stages:
+        with metrics.stage('recognition'):
+            with metrics.stage('render'):
+                time.sleep(0.05)
+            time.sleep(0.01)
+
+    assert set(stages) == {'recognition', 'render'}
+    assert stages['render'] >= 0.05
+    assert stages['recognition'] < 0.05
+
+
+def test_server_metrics_exposition():
+    """任务耗时、阶段耗时、页数与错误按标签输出"""
+    pytest.importorskip("prometheus_client")
+    server_metrics = metrics.ServerMetrics()
+    result = {'status': 'success', 'total_pages': 12, 'page_cache': {'hits': 3}}
+    server_metrics.observe_job('/ocr/pdf', 'pdf', '快速', 2.5, result, {'render': 0.4, 'queue_wait': 1.0})
+    server_metrics.observe_job('/batch', 'ppt', '快速', 0.1, error=True)
+
+    body = server_metrics.render({'in_flight': 2, 'queue_depth': 5}).body.decode('utf-8')
+
+    assert 'ocr_pages_processed_total{endpoint="/ocr/pdf",mode="快速"} 12.0' in body
+    assert 'ocr_stage_duration_seconds_count{endpoint="/ocr/pdf",mode="快速",stage="queue_wait"} 1.0' in body
+    assert 'ocr_cache_hits_total{cache="page"} 3.0' in body
+    assert 'ocr_errors_total{endpoint="/batch",kind="ppt"} 1.0' in body
+    assert 'ocr_queue_depth 5.0' in body
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+测试页面缓存：读写与损坏条目、多个实例（进程）共享目录时容量上限对整个缓存生效、按修改时间LRU淘汰
+"""
+
+import sys
+import os
+import json
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+page_cache = pytest.importorskip("src.page_cache")
+
+
+def _key(n):
+    return f"{n:02d}" + "0" * 62
+
+
+def _files(root):
+    return sorted(p.stem for p in root.glob("??/*.json"))
+
+
+def test_put_get_and_corrupt_entry(tmp_path):
+    cache = page_cache.PageCache(str(tmp_path))
+    cache.put(_key(1), {'texts': [{'text': "营业收入"}]})
+    assert cache.get(_key(1)) == {'texts': [{'text': "营业收入"}]}
+    assert cache.get(_key(2)) is None
+
+    # 同一键覆盖写入不重复记账
+    cache.put(_key(1), {'texts': []})
+    assert cache.stats()['entries'] == 1
+
+    # 损坏的条目视为未命中并删除
+    (tmp_path / _key(1)[:2] / f"{_key(1)}.json").write_text("{", encoding='utf-8')
+    assert cache.get(_key(1)) is None
+    assert _files(tmp_path) == [] and cache.stats()['entries'] == 0
+
+
+def test_limits_apply_across_instances(tmp_path):
+    """两个实例（模拟两个推理进程）交替写入同一目录，总条数不超过上限，最旧的先淘汰"""
+    first = page_cache.PageCache(str(tmp_path), max_entries=4, low_water=0.5)
+    second = page_cache.PageCache(str(tmp_path), max_entries=4, low_water=0.5)
+    for n in range(4):
+        (first if n % 2 else second).put(_key(n), {'n': n})
+        os.utime(tmp_path / _key(n)[:2] / f"{_key(n)}.json", (1000 + n, 1000 + n))
+    # 最近读取的条目不被淘汰
+    assert first.get(_key(0)) == {'n': 0}
+
+    second.put(_key(4), {'n': 4})
+    assert _files(tmp_path) == [_key(0), _key(4)]
+    assert first.stats() == second.stats() == {'entries': 2, 'bytes': sum(
+        p.stat().st_size for p in tmp_path.glob("??/*.json"))}
+
+
+def test_byte_limit_and_rebuilt_usage(tmp_path):
+    cache = page_cache.PageCache(str(tmp_path), max_bytes=200, low_water=1.0)
+    for n in range(10):
+        cache.put(_key(n), {'text': "x" * 30})
+    assert cache.stats()['bytes'] <= 200
+    assert len(_files(tmp_path)) == cache.stats()['entries'] < 10
+
+    # 记账文件丢失时按目录重建
+    os.unlink(tmp_path / page_cache.USAGE_NAME)
+    reopened = page_cache.PageCache(str(tmp_path), max_bytes=200)
+    assert reopened.stats()['entries'] == len(_files(tmp_path))
+    assert json.loads((tmp_path / page_cache.USAGE_NAME).read_text())['bytes'] <= 200
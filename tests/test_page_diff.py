@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+测试按页差异重处理：页面内容哈希不受插入页影响、复用上一版本页面结果、按文档名与模式查找上一版本、
+从结果库流式读取上一版本时只保留可复用页面的条目
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+fitz = pytest.importorskip("fitz")
+page_diff = pytest.importorskip("src.page_diff")
+result_store = pytest.importorskip("src.result_store")
+
+
+def _pdf(labels):
+    doc = fitz.open()
+    for label in labels:
+        page = doc.new_page(width=595, height=842)
+        for line in range(20):
+            page.insert_text((40, 60 + line * 16), f"{label} revenue grew steadily line {line}", fontsize=10)
+    return doc
+
+
+def test_hashes_follow_content_not_position():
+    with _pdf(["A", "B", "C"]) as old, _pdf(["Cover", "A", "B2", "C"]) as new:
+        old_hashes, new_hashes = page_diff.page_hashes(old), page_diff.page_hashes(new)
+    assert len(set(old_hashes)) == 3
+    assert new_hashes[1] == old_hashes[0] and new_hashes[3] == old_hashes[2]
+    assert new_hashes[2] != old_hashes[1] and new_hashes[0] not in old_hashes
+
+
+def test_reuse_rewrites_pages_and_copies_artifacts(tmp_path):
+    figure = tmp_path / "fig_2.png"
+    figure.write_bytes(b"png")
+    previous = {
+        'texts': [{'page': 1, 'text': "封面"}, {'page': 2, 'text': "正文"}, {'page': 3, 'text': "附注"}],
+        'figures': [{'page': 2, 'path': str(figure), 'bbox': [1, 2, 3, 4]},
+                    {'page': 3, 'path': str(tmp_path / "gone.png"), 'bbox': None}],
+    }
+    output = tmp_path / "job"
+    output.mkdir()
+    reusable = page_diff.PreviousResult("doc-1", ["new", "h2", "h3"], ["h1", "h2", "h3"],
+                                        [{'page': 1, 'kind': 'blank'}])
+    for field, items in previous.items():
+        for item in items:
+            reusable.add(field, item)
+    assert len(reusable) == 2
+
+    page = reusable.reuse("h2", 4, output)
+    assert page['texts'] == [{'page': 5, 'text': "正文"}] and page['skipped'] is None
+    assert page['figures'][0]['page'] == 5 and open(page['figures'][0]['path'], 'rb').read() == b"png"
+    assert os.path.dirname(page['figures'][0]['path']) == str(output)
+    # 引用的图表文件已被回收：该页需要重新识别
+    assert reusable.reuse("h3", 0, output) is None
+    assert reusable.reuse("h1", 0, output) is None and reusable.reuse("new", 0, output) is None
+
+
+def test_latest_entry_by_name_and_mode(tmp_path):
+    store = result_store.ResultStore(str(tmp_path), codec='gzip')
+    store.put("rep-1", {'total_pages': 1}, {'name': "rep.pdf", 'mode': "快速"})
+    store.put("rep-2", {'total_pages': 2}, {'name': "rep.pdf", 'mode': "精细"})
+    store.put("rep-3", {'total_pages': 3}, {'name': "rep.pdf", 'mode': "快速"})
+    store.put("other", {'total_pages': 4})
+
+    assert store.latest(name="rep.pdf", mode="快速")['id'] == "rep-3"
+    assert store.latest(name="rep.pdf", mode="精细")['id'] == "rep-2"
+    assert store.latest(name="missing.pdf", mode="快速") is None
+    store.close()
+
+
+def test_load_previous_streams_only_reusable_pages(tmp_path, monkeypatch):
+    """上一版本从结果库流式读取，只保留哈希相同页面的条目；没有页面哈希时不计算本次哈希"""
+    store = result_store.ResultStore(str(tmp_path), codec='gzip')
+    monkeypatch.setattr(page_diff, "get_result_store", lambda: store)
+    with _pdf(["A", "B", "C"]) as old:
+        old_hashes = page_diff.page_hashes(old)
+    store.put("rep-1", {
+        'total_pages': 3,
+        'texts': [{'page': n, 'text': f"第{n}页"} for n in (1, 2, 3)],
+        'figures': [], 'tables': [{'page': 2, 'cells': []}],
+        'page_hashes': old_hashes,
+        'page_filter': {'skipped': [{'page': 3, 'kind': 'blank'}]}
+    })
+    store.put("rep-0", {'total_pages': 3, 'texts': []})
+
+    with _pdf(["Cover", "A", "B2", "C"]) as new:
+        previous = page_diff.load_previous("rep-1", new)
+        assert previous.hashes == page_diff.page_hashes(new)
+        assert len(previous) == 2
+        assert previous.reuse(previous.hashes[1], 1, tmp_path)['texts'] == [{'page': 2, 'text': "第1页"}]
+        assert previous.reuse(previous.hashes[3], 3, tmp_path)['skipped'] == 'blank'
+        # 第2页（B）内容已变化，其条目没有被读入
+        assert sorted(previous._items) == [1, 3]
+
+        def no_hashing(pdf):
+            raise AssertionError("上一版本没有页面哈希时不应计算本次哈希")
+
+        monkeypatch.setattr(page_diff, "page_hashes", no_hashing)
+        assert page_diff.load_previous("rep-0", new) is None
+        assert page_diff.load_previous("missing", new) is None
+    store.close()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+测试空白页/图片页预筛：空白与只有页码的页面、整版照片、正文页与扫描正文页
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+fitz = pytest.importorskip("fitz")
+page_filter = pytest.importorskip("src.page_filter")
+
+
+def _photo():
+    rng = np.random.RandomState(0)
+    y, x = np.mgrid[0:1200, 0:850]
+    image = np.dstack([(x / 850 * 200).astype(np.uint8), (y / 1200 * 180).astype(np.uint8),
+                       np.full((1200, 850), 120, np.uint8)])
+    for _ in range(8):
+        cv2.circle(image, (int(rng.randint(0, 850)), int(rng.randint(0, 1200))), int(rng.randint(40, 200)),
+                   tuple(int(c) for c in rng.randint(0, 255, 3)), -1)
+    return cv2.imencode('.jpg', cv2.GaussianBlur(image, (31, 31), 0))[1].tobytes()
+
+
+def _document():
+    source = fitz.open()
+    text_page = source.new_page(width=595, height=842)
+    for line in range(40):
+        text_page.insert_text((40, 60 + line * 15), "Revenue grew steadily while margins expanded", fontsize=10)
+
+    doc = fitz.open()
+    doc.new_page(width=595, height=842)
+    doc.new_page(width=595, height=842).insert_text((280, 820), "12", fontsize=9)
+    doc.new_page(width=595, height=842).insert_image(fitz.Rect(0, 0, 595, 842), stream=_photo())
+    doc.insert_pdf(source)
+    doc.new_page(width=595, height=842).insert_image(fitz.Rect(0, 0, 595, 842), pixmap=source[0].get_pixmap(dpi=150))
+    return doc
+
+
+def test_classify_pages():
+    kinds = [page_filter.classify_page(page)['kind'] for page in _document()]
+
+    assert kinds == ['blank', 'blank', 'image_only', 'content', 'content']
+
+
+def test_text_layer_skips_thumbnail():
+    verdict = page_filter.classify_page(_document()[3])
+
+    assert verdict['text_chars'] >= 20 and verdict['thumbnail_pixels'] == 0
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+测试逐页结果落盘：增量组装的JSON与整篇结果一致、字段选择、结果库分块写入流式结果
+"""
+
+import sys
+import os
+import json
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+page_spill = pytest.importorskip("src.page_spill")
+result_store = pytest.importorskip("src.result_store")
+
+
+def _spilled(tmp_path):
+    """三页的流式结果与对应的整篇结果（第2页无内容，第3页有图）"""
+    pages = [
+        {'texts': [{'page': 1, 'text': "营业收入\"同比\"增长"}, {'page': 1, 'text': "毛利率提升"}], 'figures': [], 'tables': []},
+        {'texts': [], 'figures': [], 'tables': []},
+        {'texts': [{'page': 3, 'text': "现金流改善"}], 'figures': [{'page': 3, 'bbox': [1, 2, 3, 4], 'path': "fig.png"}],
+         'tables': [{'page': 3, 'bbox': [5, 6, 7, 8]}]},
+    ]
+    with page_spill.PageSpill(tmp_path / page_spill.SPILL_NAME) as spill:
+        for number, page in enumerate(pages, 1):
+            spill.append(number, **page)
+    items = {field: [item for page in pages for item in page[field]] for field in page_spill.ITEM_FIELDS}
+    result = {'status': 'success', 'total_pages': 3, 'spill': spill.info(), 'summary': ''}
+    full = {'status': 'success', 'total_pages': 3, **items, 'summary': ''}
+    return result, full
+
+
+def test_assembled_json_matches_full_result(tmp_path):
+    result, full = _spilled(tmp_path)
+    assert result['spill']['texts'] == 3 and result['spill']['figures'] == 1
+
+    assembled = json.loads(b''.join(page_spill.iter_result_json(result, chunk_bytes=16)))
+    assert assembled == full
+    assert list(assembled) == list(full)
+    assert page_spill.load_result(result) == full
+
+
+def test_field_selection_matches_select_fields(tmp_path):
+    response_encoding = pytest.importorskip("src.response_encoding")
+    result, full = _spilled(tmp_path)
+
+    fields = "page_text,text,texts.text,figures.bbox,total_pages,missing"
+    selection = response_encoding.parse_fields(fields)
+    assembled = json.loads(b''.join(page_spill.iter_result_json(result, selection)))
+    assert assembled == response_encoding.select_fields(full, fields)
+
+
+def test_result_store_writes_spilled_result(tmp_path):
+    result, full = _spilled(tmp_path)
+    store = result_store.ResultStore(str(tmp_path / "results"), codec='gzip')
+
+    entry = store.put("doc", result)
+    store.put("other", {'status': 'success', 'total_pages': 1})
+    assert store.get("doc") == full
+    assert entry['hash'] == store.encode(full)[1] and entry['pages'] == 3
+    assert store.get("other")['total_pages'] == 1
+    store.close()
+
+
+def test_page_text_merges_records_appended_later(tmp_path):
+    """兜底直扫为已落盘的页面追加第二条记录时，page_text 每页只输出一次，顺序与普通结果一致"""
+    response_encoding = pytest.importorskip("src.response_encoding")
+    records = [
+        (1, [{'page': 1, 'text': "封面"}]),
+        (2, []),
+        (3, [{'page': 3, 'text': "正文"}]),
+        # 第二轮（兜底直扫）：第1、3页补充文本，第2页首次有文本
+        (1, [{'page': 1, 'text': "封面补充"}]),
+        (2, [{'page': 2, 'text': "扫描文本"}]),
+        (3, [{'page': 3, 'text': "正文补充"}]),
+    ]
+    with page_spill.PageSpill(tmp_path / page_spill.SPILL_NAME) as spill:
+        for number, texts in records:
+            spill.append(number, texts=texts)
+    assert spill.runs == 2
+    result = {'status': 'success', 'total_pages': 3, 'spill': spill.info()}
+    full = {'status': 'success', 'total_pages': 3, 'texts': [t for _, texts in records for t in texts],
+            'figures': [], 'tables': []}
+
+    fields = "page_text,text,texts"
+    selection = response_encoding.parse_fields(fields)
+    assembled = json.loads(b''.join(page_spill.iter_result_json(result, selection)))
+    assert assembled == response_encoding.select_fields(full, fields)
+    assert [p['page'] for p in assembled['page_text']] == [1, 2, 3]
+    assert assembled['page_text'][0]['text'] == "封面\n封面补充"
+
+    # 没有记录轮次的旧结果扫描文件得到相同结果
+    del result['spill']['runs']
+    assert json.loads(b''.join(page_spill.iter_result_json(result, selection))) == assembled
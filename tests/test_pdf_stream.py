@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+测试流式PDF接口 /ocr/pdf/stream 与客户端 iter_pdf_pages：页记录按顺序下发，
+未逐页转发的页在结束前补发，最后一条汇总记录携带除逐页内容外的完整结果
+"""
+
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+
+# 添加server目录与客户端模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'client', 'src', 'pdf_ocr_module'))
+
+httpx = pytest.importorskip("httpx")
+
+
+def _page(number):
+    return {'page': number, 'texts': [{'page': number, 'text': f"第{number}页"}], 'figures': [], 'tables': []}
+
+
+class StreamingPool:
+    """替身推理进程池：逐页上报第1、2页，第3页只出现在最终结果中（如复用上一版本的页）"""
+
+    async def run(self, kind, args, progress=None, stages=None):
+        for number in (1, 2):
+            await asyncio.sleep(0.01)
+            progress({'stage': 'processing', 'pages_done': number, 'total_pages': 3, 'page_result': _page(number)})
+        return {
+            'status': 'success', 'total_pages': 3, 'summary': '全文摘要',
+            'texts': [item for number in (1, 2, 3) for item in _page(number)['texts']],
+            'figures': [], 'tables': []
+        }
+
+
+@pytest.fixture
+def server(monkeypatch):
+    remote_ocr_server = pytest.importorskip("remote_ocr_server")
+    job_store = pytest.importorskip("src.job_store")
+    state = remote_ocr_server.app.state
+    monkeypatch.setattr(state, "inference_pool", StreamingPool(), raising=False)
+    monkeypatch.setattr(state, "job_store", job_store.JobStore(), raising=False)
+    monkeypatch.setattr(state, "result_cache", None, raising=False)
+    monkeypatch.setattr(state, "blob_store", None, raising=False)
+    monkeypatch.setattr(state, "admission", None, raising=False)
+    return remote_ocr_server
+
+
+def _stream_body(server) -> bytes:
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/ocr/pdf/stream", files={'file': ('report.pdf', b'%PDF-stream')})
+            assert response.status_code == 200
+            assert response.headers['content-type'].startswith('application/x-ndjson')
+            return response.content
+
+    return asyncio.run(scenario())
+
+
+def test_stream_pages_in_order_then_summary(server):
+    """页记录按页码顺序，汇总记录含总页数与摘要且不重复逐页内容"""
+    records = [json.loads(line) for line in _stream_body(server).splitlines() if line]
+
+    assert [r['type'] for r in records] == ['page', 'page', 'page', 'summary']
+    assert [r['page'] for r in records[:3]] == [1, 2, 3]
+    assert records[2]['texts'] == [{'page': 3, 'text': '第3页'}]
+    summary = records[-1]
+    assert summary['status'] == 'success' and summary['total_pages'] == 3 and summary['summary'] == '全文摘要'
+    assert summary['filename'] == 'report.pdf'
+    assert 'texts' not in summary
+    assert server.app.state.job_store.counts() == {}
+
+
+def test_client_iter_pdf_pages(server, monkeypatch, tmp_path):
+    """客户端逐行解析服务端的NDJSON流，按顺序产出页记录与汇总记录"""
+    remote_ocr_client = pytest.importorskip("remote_ocr_client")
+    body = _stream_body(server)
+
+    class StreamResponse:
+        status_code = 200
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def iter_lines(self):
+            return iter(body.splitlines())
+
+    pdf_path = tmp_path / "report.pdf"
+    pdf_path.write_bytes(b'%PDF-stream')
+    client = remote_ocr_client.RemoteOCRClient("http://test", use_blobs=False)
+    posted = []
+    monkeypatch.setattr(client, "_post_file", lambda endpoint, *args, **kwargs: posted.append(endpoint) or StreamResponse())
+
+    records = list(client.iter_pdf_pages(str(pdf_path), "report.pdf"))
+    assert posted == ["/ocr/pdf/stream"]
+    assert [r.get('page') for r in records] == [1, 2, 3, None]
+    assert records[-1]['type'] == 'summary' and records[-1]['total_pages'] == 3
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+测试处理配置档：按模式取得不可变配置档，取用不修改全局配置
+"""
+
+import sys
+import os
+import dataclasses
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+processing_profile = pytest.importorskip("src.processing_profile")
+config = pytest.importorskip("src.config")
+
+
+def test_profiles_are_immutable_and_isolated():
+    layout_before = dict(config.LAYOUT_CONFIG)
+    fast = processing_profile.get_profile("快速")
+    fine = processing_profile.get_profile("精细")
+
+    assert processing_profile.get_profile().mode == config.WORKER_CONFIG["default_mode"]
+    assert fine.fine and not fast.fine
+    assert fine.target_resolution > fast.target_resolution
+    assert fine.layout_conf < fast.layout_conf
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        fast.layout_conf = 0.1
+    # 取用其他配置档不影响已取得的配置档，也不改写模块级配置
+    assert processing_profile.get_profile("快速").layout_conf == fast.layout_conf
+    assert config.LAYOUT_CONFIG == layout_before
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError, match="未知的处理模式"):
+        processing_profile.get_profile("极速")
+    assert set(processing_profile.available_modes()) == set(config.PROCESSING_PROFILES)
+
+
+def test_default_profile_matches_previous_defaults():
+    """默认模式与引入配置档之前的参数一致，快速模式需显式指定"""
+    default = processing_profile.get_profile()
+    assert default.mode == "标准"
+    assert default.target_resolution == config.IMAGE_CONFIG["target_resolution"]
+    assert default.high_resolution == config.IMAGE_CONFIG["high_resolution"]
+    assert default.layout_conf == config.LAYOUT_CONFIG["conf_threshold"]
+    assert default.layout_imgsz == 1024 and default.use_angle_cls
+    assert processing_profile.get_profile("快速") != default
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+测试页面识别备忘录：同一页同一分辨率最多识别一次
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+recognition_memo = pytest.importorskip("src.recognition_memo")
+
+
+def test_direct_scan_runs_once_per_resolution():
+    """同页同分辨率的直扫只执行一次，空结果也会被记忆"""
+    memo = recognition_memo.PageRecognitionMemo()
+    calls = []
+
+    def scan():
+        calls.append(1)
+        return []
+
+    for _ in range(3):
+        assert memo.direct(0, 1024, scan) == []
+    memo.direct(0, 2560, scan)
+
+    assert len(calls) == 2
+    assert memo.has_direct(0, 1024)
+    assert not memo.has_direct(1, 1024)
+
+
+def test_page_image_rendered_once():
+    """同页同分辨率只渲染一次"""
+    memo = recognition_memo.PageRecognitionMemo()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return "/tmp/page_1_1024.jpg"
+
+    assert memo.image(0, 1024, render) == memo.image(0, 1024, render)
+    assert len(renders) == 1
+
+
+def test_pass_counts():
+    """统计每页区域识别与直扫次数"""
+    memo = recognition_memo.PageRecognitionMemo()
+    memo.count_region_pass(0, 1024)
+    memo.direct(0, 1024, lambda: [{'text': 'a'}])
+    memo.direct(0, 1024, lambda: [{'text': 'a'}])
+
+    stats = memo.pass_counts()
+    assert stats == [{'page': 1, 'region': {'1024': 1}, 'direct': {'1024': 1}, 'crops': {}, 'total': 2}]
+
+
+def test_region_crops_count_one_pass_per_resolution():
+    """同一页多个低置信度区域的高分辨率重识别只计一次该分辨率的区域识别，区域数单独统计"""
+    memo = recognition_memo.PageRecognitionMemo()
+    memo.count_region_pass(0, 1024)
+    memo.count_region_crops(0, 2048, 8)
+    memo.count_region_crops(0, 2048, 2)
+    memo.count_region_crops(1, 2048, 0)
+
+    stats = memo.pass_counts()
+    assert stats == [{'page': 1, 'region': {'1024': 1, '2048': 1}, 'direct': {}, 'crops': {'2048': 10}, 'total': 2}]
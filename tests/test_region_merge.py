@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+测试识别前的区域规整：重叠/嵌套去重、相邻行拼接、按栏排序
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+region_merge = pytest.importorskip("src.region_merge")
+
+
+def _region(bbox, category='text', confidence=0.9):
+    return {'bbox': bbox, 'category': category, 'confidence': confidence}
+
+
+def test_overlapping_and_nested_boxes_are_merged():
+    """重叠文本框合并为并集，嵌套文本框去除；图片内的文本框保留"""
+    regions = [
+        _region([100, 100, 400, 200], confidence=0.9),
+        _region([110, 105, 410, 205], confidence=0.6),
+        _region([150, 120, 300, 140], confidence=0.5),
+        _region([500, 100, 700, 300], category='figure'),
+        _region([520, 120, 600, 140], confidence=0.4),
+    ]
+
+    result = region_merge.normalize_regions(regions, overlap_threshold=0.3)
+
+    texts = [r['bbox'] for r in result if r['category'] == 'text']
+    assert [100, 100, 410, 205] in texts
+    assert [520, 120, 600, 140] in texts
+    assert len(texts) == 2
+    assert regions[0]['bbox'] == [100, 100, 400, 200]
+
+
+def test_adjacent_lines_joined_and_columns_ordered():
+    """同栏上下紧邻的行拼接；阅读顺序为 标题 -> 左栏 -> 右栏"""
+    regions = [
+        _region([420, 100, 760, 120]),
+        _region([40, 100, 380, 120]),
+        _region([40, 124, 380, 144]),
+        _region([40, 300, 380, 320]),
+        _region([40, 40, 760, 70], category='title'),
+    ]
+
+    result = region_merge.normalize_regions(regions)
+
+    assert [r['bbox'] for r in result] == [
+        [40, 40, 760, 70],
+        [40, 100, 380, 144],
+        [40, 300, 380, 320],
+        [420, 100, 760, 120],
+    ]
+
+
+def test_merge_repeats_until_stable_and_keeps_dominant_label():
+    """并集扩大后与先前保留的区域重新比较，结果与输入顺序无关；合并后的类别取面积较大者"""
+    regions = [
+        _region([0, 0, 100, 100], confidence=0.9),
+        _region([200, 0, 300, 100], confidence=0.8),
+        _region([50, 0, 250, 100], confidence=0.5),
+    ]
+    for order in (regions, regions[::-1], [regions[2], regions[0], regions[1]]):
+        result = region_merge.normalize_regions(order, overlap_threshold=0.15)
+        assert [r['bbox'] for r in result] == [[0, 0, 300, 100]]
+
+    title = _region([100, 100, 400, 130], category='title', confidence=0.95)
+    paragraph = _region([100, 100, 400, 300], confidence=0.8)
+    result = region_merge.normalize_regions([title, paragraph])
+    assert len(result) == 1
+    assert result[0]['category'] == 'text'
+    assert result[0]['bbox'] == [100, 100, 400, 300] and result[0]['confidence'] == 0.95
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+测试远程OCR客户端的请求重试：按哈希引用的文件已被服务器淘汰时改为表单上传，批量请求遇到429时整批重试
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加客户端模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'client', 'src', 'pdf_ocr_module'))
+
+remote_ocr_client = pytest.importorskip("remote_ocr_client")
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, payload=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """按顺序返回预设的响应并记录每次POST是否带文件"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, data=None, files=None, **kwargs):
+        parts = files.values() if isinstance(files, dict) else [part for _, part in files or []]
+        self.posts.append({'url': url, 'data': dict(data or {}), 'multipart': files is not None,
+                           'bodies': [part[1].read() for part in parts]})
+        return self.responses.pop(0)
+
+
+def _client(tmp_path, responses, sha256="ab" * 32):
+    client = remote_ocr_client.RemoteOCRClient("http://test", busy_retries=2, max_retry_wait=0)
+    client.session = FakeSession(responses)
+    client.ensure_blob = lambda file_path: sha256
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b'%PDF-test')
+    return client, str(path)
+
+
+def test_post_file_falls_back_to_upload_when_blob_evicted(tmp_path):
+    """HEAD 之后 blob 被淘汰（404）时以表单重新上传，不计入繁忙重试次数"""
+    client, path = _client(tmp_path, [FakeResponse(404), FakeResponse(429, {'Retry-After': '0'}), FakeResponse(200)])
+
+    response = client._post_file("/ocr/pdf", path, "report.pdf", 'application/pdf', data={'mode': '精细'})
+    assert response.status_code == 200
+    posts = client.session.posts
+    assert [p['multipart'] for p in posts] == [False, True, True]
+    assert posts[0]['data']['blob'] == "ab" * 32
+    assert posts[1]['data'] == {'mode': '精细'}
+
+
+def test_process_batch_retries_when_busy(tmp_path):
+    """整批被拒绝（429）时按 Retry-After 等待后重新上传全部文件"""
+    results = [{'filename': 'report.pdf', 'status': 'success', 'result': {}}]
+    client, path = _client(tmp_path, [FakeResponse(429, {'Retry-After': '0'}),
+                                      FakeResponse(200, payload={'status': 'success', 'results': results})])
+    client.use_blobs = False
+
+    assert client.process_batch([path]) == results
+    posts = client.session.posts
+    assert len(posts) == 2
+    assert posts[0]['bodies'] == posts[1]['bodies'] == [b'%PDF-test']
+
+
+def test_process_batch_sends_blob_references(tmp_path):
+    """服务器已有的文件只传哈希；引用的文件被淘汰（404）时整批改为上传，不计入繁忙重试"""
+    results = [{'filename': 'report.pdf', 'status': 'success', 'result': {}}]
+    client, path = _client(tmp_path, [FakeResponse(200, payload={'status': 'success', 'results': results})])
+    assert client.process_batch([path]) == results
+    post = client.session.posts[0]
+    assert post['data'] == {'blobs': ["ab" * 32], 'filenames': ['report.pdf']}
+    assert post['bodies'] == []
+
+    client, path = _client(tmp_path, [FakeResponse(404), FakeResponse(429, {'Retry-After': '0'}),
+                                      FakeResponse(200, payload={'status': 'success', 'results': results})])
+    assert client.process_batch([path]) == results
+    posts = client.session.posts
+    assert [p['bodies'] for p in posts] == [[], [b'%PDF-test'], [b'%PDF-test']]
+    assert posts[1]['data'] == {'blobs': [], 'filenames': []}
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+测试结果字段选择：虚拟字段按页合并文本，列表字段可只保留部分键
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+response_encoding = pytest.importorskip("src.response_encoding")
+
+RESULT = {
+    'status': 'success',
+    'total_pages': 2,
+    'texts': [
+        {'page': 1, 'text': '标题', 'bbox': [0, 0, 10, 10], 'category': 'title', 'confidence': 0.9},
+        {'page': 2, 'text': '正文', 'bbox': [0, 0, 10, 10], 'category': 'text', 'confidence': 0.9},
+        {'page': 1, 'text': '摘要', 'bbox': [0, 20, 10, 30], 'category': 'text', 'confidence': 0.8},
+    ],
+    'figures': [{'page': 1, 'path': '/srv/fig_1.png', 'bbox': [1, 2, 3, 4], 'category': 'figure'}],
+    'summary': ''
+}
+
+
+def test_select_fields_projection():
+    """未指定fields返回原结果；列表字段按子字段裁剪，status总是保留"""
+    assert response_encoding.select_fields(RESULT, None) is RESULT
+
+    selected = response_encoding.select_fields(RESULT, "texts.page,texts.text,figures.bbox,missing")
+    assert set(selected) == {'status', 'texts', 'figures'}
+    assert selected['texts'][0] == {'page': 1, 'text': '标题'}
+    assert selected['figures'] == [{'bbox': [1, 2, 3, 4]}]
+
+
+def test_select_fields_page_text():
+    """page_text 按页合并文本，text 为全文"""
+    selected = response_encoding.select_fields(RESULT, "page_text,text,total_pages")
+    assert selected['page_text'] == [{'page': 1, 'text': '标题\n摘要'}, {'page': 2, 'text': '正文'}]
+    assert selected['text'] == '标题\n摘要\n正文'
+    assert selected['total_pages'] == 2
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+测试文档结果缓存与单飞去重
+"""
+
+import sys
+import os
+import asyncio
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+result_cache = pytest.importorskip("src.result_cache")
+
+
+def test_result_cache_ttl(tmp_path):
+    """过期条目不再返回"""
+    cache = result_cache.ResultCache(str(tmp_path), ttl_seconds=60)
+    key = result_cache.make_result_key("ab" * 32, "pdf", "快速")
+    cache.put(key, {'status': 'success', 'texts': []})
+    assert cache.get(key) == {'status': 'success', 'texts': []}
+
+    cache.ttl_seconds = -1
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_result_key_without_mode():
+    """不使用模式的类型（Office）缓存键不含模式"""
+    assert result_cache.make_result_key("ab" * 32, "office", None) == f"{'ab' * 32}-office"
+    assert result_cache.make_result_key("ab" * 32, "pdf", "标准") == f"{'ab' * 32}-pdf-标准"
+
+
+def test_result_cache_lru_eviction(tmp_path):
+    """超出条数上限时淘汰最久未使用的条目"""
+    cache = result_cache.ResultCache(str(tmp_path), max_entries=2)
+    keys = [result_cache.make_result_key(f"{i:064x}", "pdf", "快速") for i in range(3)]
+    cache.put(keys[0], {'n': 0})
+    cache.put(keys[1], {'n': 1})
+    cache.get(keys[0])
+    cache.put(keys[2], {'n': 2})
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == {'n': 0}
+    assert cache.get(keys[2]) == {'n': 2}
+
+
+def test_configured_caches_evict_below_limit(tmp_path, monkeypatch):
+    """结果缓存与文件存储按配置的 low_water 淘汰到上限以下，缓存满后不必每次写入都扫描目录"""
+    blob_store = pytest.importorskip("src.blob_store")
+    monkeypatch.setitem(result_cache.RESULT_CACHE_CONFIG, "cache_dir", str(tmp_path / "results"))
+    monkeypatch.setitem(result_cache.RESULT_CACHE_CONFIG, "max_entries", 10)
+    monkeypatch.setitem(blob_store.BLOB_CONFIG, "blob_dir", str(tmp_path / "blobs"))
+    cache = result_cache.create_result_cache()
+    assert cache.low_water == result_cache.RESULT_CACHE_CONFIG["low_water"] < 1
+    assert blob_store.create_blob_store().low_water == blob_store.BLOB_CONFIG["low_water"] < 1
+
+    for i in range(11):
+        cache.put(result_cache.make_result_key(f"{i:064x}", "pdf", "标准"), {'n': i})
+    assert cache.stats()['entries'] == 9
+
+
+def test_single_flight_deduplicates_concurrent_calls():
+    """并发的相同请求只计算一次"""
+    flight = result_cache.SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'status': 'success'}
+
+    async def main():
+        return await asyncio.gather(*[flight.do("k", compute) for _ in range(5)])
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r == {'status': 'success'} for r in results)
+    assert flight.inflight_count() == 0
+
+
+def test_single_flight_leader_cancel_does_not_fail_followers():
+    """领头请求被取消时等待者重新计算；普通异常仍共享给等待者"""
+    flight = result_cache.SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'status': 'success'}
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad pdf")
+
+    async def main():
+        leader = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("k", compute)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        results = await asyncio.gather(*followers)
+
+        shared = await asyncio.gather(flight.do("e", failing), flight.do("e", failing), return_exceptions=True)
+        return results, shared
+
+    results, shared = asyncio.run(main())
+    assert results == [{'status': 'success'}] * 2
+    assert len(calls) == 2
+    assert all(isinstance(e, ValueError) for e in shared)
+    assert flight.inflight_count() == 0
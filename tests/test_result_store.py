@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+测试结果库：追加写入与按需读取、其他实例增量加载清单、整段解压为JSONL、pickle迁移
+"""
+
+import sys
+import os
+import gzip
+import json
+import pickle
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+result_store = pytest.importorskip("src.result_store")
+
+
+def _result(n):
+    return {'status': 'success', 'total_pages': n, 'texts': [{'page': p + 1, 'text': f"第{p + 1}页"} for p in range(n)]}
+
+
+def test_put_get_and_iterate(tmp_path):
+    store = result_store.ResultStore(str(tmp_path), codec='gzip', segment_max_bytes=200)
+    for n in range(1, 5):
+        store.put(f"doc{n}", _result(n))
+    store.put("doc2", _result(7))
+
+    reader = result_store.ResultStore(str(tmp_path), codec='gzip')
+    assert len(reader) == 4
+    assert reader.get("doc2")['total_pages'] == 7
+    assert reader.entry("doc3")['pages'] == 3
+    assert reader.get("missing") is None
+    assert sorted(doc_id for batch in reader.iter_batches(batch_size=3) for doc_id, _ in batch) == \
+        ["doc1", "doc2", "doc3", "doc4"]
+
+    # 写入方追加后，读取方增量加载清单并重新映射数据段
+    store.put("doc5", _result(5))
+    assert reader.get("doc5")['texts'][4]['text'] == "第5页"
+
+    # 数据段整段解压即为JSONL
+    segments = sorted(tmp_path.glob("seg-*.jsonl.gz"))
+    assert len(segments) > 1
+    lines = [json.loads(line) for segment in segments for line in gzip.decompress(segment.read_bytes()).splitlines()]
+    assert len(lines) == 6
+    reader.close()
+
+
+def test_migrate_pickles(tmp_path):
+    pickles = tmp_path / "pickles"
+    (pickles / "report-1").mkdir(parents=True)
+    (pickles / "report-1" / "result.pkl").write_bytes(pickle.dumps(_result(2)))
+    (pickles / "deck_ppt.pkl").write_bytes(pickle.dumps({'total_slides': 3}))
+    store = result_store.ResultStore(str(tmp_path / "results"), codec='gzip')
+
+    assert result_store.migrate_pickles(str(pickles), store) == {'migrated': 2, 'skipped': 0, 'failed': 0}
+    assert result_store.migrate_pickles(str(pickles), store, delete=True) == {'migrated': 0, 'skipped': 2, 'failed': 0}
+    assert store.get("report-1") == _result(2)
+    assert store.entry("deck")['pages'] == 3
+    assert list(pickles.iterdir()) == []
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+测试批量上传的归档解压：成员逐个落盘并计算哈希，超出文件数上限时拒绝且不残留临时文件
+"""
+
+import sys
+import os
+import hashlib
+import zipfile
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+upload = pytest.importorskip("src.upload")
+
+
+def _make_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+
+def test_extract_archive_spools_members(tmp_path):
+    """跳过目录与macOS元数据，成员哈希与内容一致"""
+    archive_path = tmp_path / "batch.zip"
+    _make_zip(archive_path, {'reports/a.pdf': b'%PDF-a', 'b.docx': b'docx', '__MACOSX/._a.pdf': b'meta'})
+
+    entries = upload.extract_archive(str(archive_path), "batch.zip", max_files=10, max_bytes=1024)
+    try:
+        assert sorted(e['filename'] for e in entries) == ['a.pdf', 'b.docx']
+        for entry in entries:
+            with open(entry['path'], 'rb') as f:
+                data = f.read()
+            assert entry['sha256'] == hashlib.sha256(data).hexdigest()
+            assert entry['size'] == len(data)
+    finally:
+        upload.cleanup_spooled(entries)
+
+
+def test_extract_archive_limits(tmp_path):
+    """超出文件数或解压后大小上限时返回413，已落盘的成员被清理"""
+    archive_path = tmp_path / "batch.zip"
+    _make_zip(archive_path, {'a.pdf': b'x' * 100, 'b.pdf': b'y' * 100})
+
+    spool_dir = tmp_path / "spool"
+    upload.UPLOAD_CONFIG["spool_dir"] = str(spool_dir)
+    try:
+        with pytest.raises(upload.HTTPException) as exc:
+            upload.extract_archive(str(archive_path), "batch.zip", max_files=1, max_bytes=1024)
+        assert exc.value.status_code == 413
+
+        with pytest.raises(upload.HTTPException) as exc:
+            upload.extract_archive(str(archive_path), "batch.zip", max_files=10, max_bytes=150)
+        assert exc.value.status_code == 413
+        assert list(spool_dir.iterdir()) == []
+    finally:
+        upload.UPLOAD_CONFIG["spool_dir"] = None
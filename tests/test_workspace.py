@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+测试任务工作目录：同名任务互不覆盖、结束时只保留登记的产物、按时间与容量回收
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# 添加server目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+workspace = pytest.importorskip("src.workspace")
+
+
+def test_workspace_keeps_only_registered_files(tmp_path, monkeypatch):
+    """同名任务使用不同目录；页面渲染删除，图表裁剪保留"""
+    monkeypatch.setattr(workspace, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setitem(workspace.WORKSPACE_CONFIG, "use_tmpfs", False)
+
+    with workspace.JobWorkspace("季度报告") as first, workspace.JobWorkspace("季度报告") as second:
+        assert first.path != second.path
+        (first.path / "page_1_1024.jpg").write_bytes(b"render")
+        (first.path / "fig_1.png").write_bytes(b"figure")
+        items = [{'path': str(first.path / "fig_1.png")}]
+        first.keep_items(items)
+        (second.path / "page_1_1024.jpg").write_bytes(b"render")
+
+    assert sorted(p.name for p in first.output_dir.iterdir()) == ["fig_1.png"]
+    assert items[0]['path'] == str(first.output_dir / "fig_1.png")
+    assert not second.output_dir.exists()
+
+
+def test_collect_garbage_by_age_and_size(tmp_path):
+    """过期条目删除；超出容量时最旧优先删除；处理中的新条目保留"""
+    now = time.time()
+    for name, age_days, size in (("old", 10, 10), ("mid", 3, 60), ("new", 1, 60), ("active", 0, 60)):
+        entry = tmp_path / name
+        entry.mkdir()
+        (entry / "data.bin").write_bytes(b"x" * size)
+        mtime = now - age_days * 86400
+        os.utime(entry / "data.bin", (mtime, mtime))
+        os.utime(entry, (mtime, mtime))
+
+    stats = workspace.collect_garbage([tmp_path], max_age_seconds=7 * 86400, max_bytes=130,
+                                      min_age_seconds=3600, now=now)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["active", "new"]
+    assert stats['removed'] == 2
+    assert stats['freed_bytes'] == 70